@@ -1,21 +1,55 @@
 import streamlit as st
-from openai import AsyncOpenAI
-from firecrawl import FirecrawlApp
+import hashlib
+import json
 import os
-from dotenv import load_dotenv
-import asyncio
-from src.core import process_cover_letter_request  # Votre fonction mise à jour
-import tempfile
+import re
+from dotenv import find_dotenv, load_dotenv
+from src.clients import create_firecrawl_client, create_openai_client, get_api_key, warm_up_openai_client
+from src.core import process_cover_letter_variants, regenerate_paragraph, stream_cover_letter_request
+from src.events import stream_with_events
+from src.letter import replace_paragraph, split_paragraphs
+from src.runtime import get_runtime
+from src.telemetry import start_metrics_server
+import time
+
+@st.cache_resource(max_entries=2)
+def get_openai_client(api_key):
+    """
+    Client OpenAI partagé par toutes les sessions: son pool de connexions est
+    utilisé depuis la boucle d'événements partagée (src/runtime.py).
+    """
+    client = create_openai_client(api_key)
+    get_runtime().submit(warm_up_openai_client(client))
+    return client
+
+@st.cache_resource(max_entries=2)
+def get_firecrawl_client(api_key):
+    return create_firecrawl_client(api_key)
+
+@st.cache_resource
+def load_environment(env_mtime):
+    """
+    Charge le fichier .env une fois par processus, puis à nouveau seulement
+    si le fichier est modifié (env_mtime fait partie de la clé du cache).
+    """
+    load_dotenv(env_path, override=env_mtime is not None)
+    return env_mtime
+
+env_path = find_dotenv(usecwd=True)
 
 # Load environment variables
 try:
-    load_dotenv()
+    load_environment(os.path.getmtime(env_path) if env_path else None)
 except Exception as e:
     st.error(f"⚠️ Erreur lors du chargement du fichier .env: {str(e)}")
 
+# Métriques Prometheus sur COVER_LETTER_METRICS_PORT (un serveur par processus)
+start_metrics_server()
+
 # Initialize API clients with error handling
-openai_api_key = os.getenv('OPENAI_API_KEY')
-firecrawl_api_key = os.getenv('FIRECRAWL_API_KEY')
+# Les clients sont mis en cache par clé API: changer une clé dans .env crée un nouveau client
+openai_api_key = get_api_key('OPENAI_API_KEY')
+firecrawl_api_key = get_api_key('FIRECRAWL_API_KEY')
 
 # Initialize clients only if API keys are available
 openai_client = None
@@ -24,25 +58,24 @@ firecrawl_client = None
 # Check for API keys and show warnings in the main interface
 api_keys_missing = []
 
-if not openai_api_key or openai_api_key == 'sk-your-openai-key-here':
+if not openai_api_key:
     api_keys_missing.append("OpenAI")
 else:
     try:
-        openai_client = AsyncOpenAI(api_key=openai_api_key)
+        openai_client = get_openai_client(openai_api_key)
     except Exception as e:
         st.error(f"❌ Erreur d'initialisation OpenAI: {str(e)}")
 
-if not firecrawl_api_key or firecrawl_api_key == 'fc-your-firecrawl-key-here':
+if not firecrawl_api_key:
     api_keys_missing.append("Firecrawl")
 else:
     try:
-        firecrawl_client = FirecrawlApp(api_key=firecrawl_api_key)
+        firecrawl_client = get_firecrawl_client(firecrawl_api_key)
     except Exception as e:
         st.error(f"❌ Erreur d'initialisation Firecrawl: {str(e)}")
 
 # CSS personnalisé pour une interface plus claire et sympathique
-def load_custom_css():
-    st.markdown("""
+CUSTOM_CSS = """
     <style>
     /* Variables de couleurs claires et sympathiques */
     :root {
@@ -377,7 +410,286 @@ def load_custom_css():
         }
     }
     </style>
+    """
+
+@st.cache_data
+def minify_css(css):
+    """
+    Retire commentaires et espaces du CSS: le bloc est renvoyé au navigateur à
+    chaque rerun, autant qu'il soit le plus petit possible.
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+def load_custom_css():
+    st.markdown(minify_css(CUSTOM_CSS), unsafe_allow_html=True)
+
+RESULT_KEY = "cover_letter_result"
+VARIANTS_KEY = "cover_letter_variants"
+MAX_VARIANTS = 6
+
+def compute_inputs_hash(resume_file, job_content, **options):
+    """
+    Empreinte des entrées d'une génération (contenu du CV, offre, options).
+    """
+    digest = hashlib.sha256()
+    if resume_file is not None:
+        digest.update(resume_file.getvalue())
+    if isinstance(job_content, str):
+        digest.update(job_content.encode("utf-8"))
+    elif job_content is not None:
+        digest.update(job_content.getvalue())
+    digest.update(json.dumps(options, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+def use_variant(variant):
+    previous = st.session_state.get(RESULT_KEY)
+    st.session_state[RESULT_KEY] = {
+        'inputs_hash': variant['inputs_hash'],
+        'letter': variant['cover_letter'],
+        'edited_letter': None,
+        'stats': {},
+        'options': variant.get('options', {}),
+        'created_at': time.time(),
+        'version': previous['version'] + 1 if previous else 1,
+    }
+
+def render_variants(stored):
+    """
+    Vue de comparaison des versions générées en parallèle.
+    """
+    variants = stored['variants']
+    st.markdown("---")
+    st.markdown("""
+    <div class="section-card">
+        <h2 style="color: #45B7D1; text-align: center;">🧪 Comparaison des versions</h2>
+    </div>
     """, unsafe_allow_html=True)
+    st.caption(f"{len(variants)} versions générées en {stored['elapsed']:.1f} s")
+    
+    for row_start in range(0, len(variants), 3):
+        columns = st.columns(3)
+        for column, (index, variant) in zip(columns, enumerate(variants[row_start:row_start + 3], row_start)):
+            with column:
+                st.markdown(f"**{variant['tone']} · {variant['template']}**")
+                if 'error' in variant:
+                    st.error(f"❌ {variant['error']}")
+                    continue
+                st.caption(f"{len(variant['cover_letter'].split())} mots")
+                st.text_area(
+                    "Lettre",
+                    value=variant['cover_letter'],
+                    height=300,
+                    disabled=True,
+                    label_visibility="collapsed",
+                    key=f"variant_{index}_{variant['inputs_hash']}"
+                )
+                st.button(
+                    "✅ Utiliser cette version",
+                    key=f"use_variant_{index}_{variant['inputs_hash']}",
+                    on_click=use_variant,
+                    args=(variant,),
+                    use_container_width=True
+                )
+
+def save_edited_letter(result, edit_key):
+    result['edited_letter'] = st.session_state[edit_key]
+
+def rewrite_paragraph(result, edit_key, index_key, instructions_key, openai_client):
+    """
+    Réécrit le paragraphe choisi de la lettre affichée (modifications non
+    sauvegardées comprises), sans relancer toute la génération.
+    """
+    letter = st.session_state.get(edit_key) or result['edited_letter'] or result['letter']
+    index = st.session_state[index_key]
+    try:
+        paragraph = get_runtime().run(regenerate_paragraph(
+            letter, index, openai_client,
+            generation_params=result.get('options'),
+            instructions=st.session_state.get(instructions_key, "")
+        ))
+    except Exception as e:
+        result['paragraph_error'] = str(e)
+        return
+    result['edited_letter'] = replace_paragraph(letter, index, paragraph)
+    result['version'] += 1
+    result['paragraph_error'] = None
+    result['rewritten_paragraph'] = index
+
+def render_result(result, inputs_hash, openai_client=None):
+    """
+    Affiche la lettre conservée dans la session (aperçu, édition, analyse,
+    téléchargement). Appelé à chaque rerun: les interactions avec les onglets
+    ne relancent pas la génération.
+    """
+    cover_letter = result['edited_letter'] or result['letter']
+    generation_stats = result['stats']
+    
+    if result['inputs_hash'] != inputs_hash:
+        st.info("ℹ️ Les informations ont changé depuis cette génération. Cliquez sur « Générer » pour mettre à jour la lettre.")
+    
+    # Display results avec interface améliorée
+    st.markdown("---")
+    st.markdown("""
+    <div class="section-card">
+        <h2 style="color: #FF6B6B; text-align: center;">🎉 Votre lettre de motivation</h2>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Create tabs for different views
+    tab1, tab2, tab3, tab4 = st.tabs(["📄 Aperçu", "📝 Édition", "📊 Analyse", "💾 Téléchargement"])
+    
+    with tab1:
+        st.markdown("### 👀 Aperçu de votre lettre")
+        st.markdown(
+            f"""
+            <div style="background: linear-gradient(135deg, #f8f9fa, #e9ecef); 
+                        padding: 2rem; 
+                        border-radius: 15px; 
+                        border-left: 5px solid #FF6B6B;
+                        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+                        margin: 1rem 0;">
+                {cover_letter.replace(chr(10), '<br>')}
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    
+    with tab2:
+        st.markdown("### ✏️ Éditer votre lettre")
+        edit_key = f"edit_letter_{result['inputs_hash']}_{result['version']}"
+        st.text_area(
+            "Vous pouvez modifier votre lettre ici:",
+            value=cover_letter,
+            height=400,
+            key=edit_key
+        )
+        
+        # Le callback s'exécute avant le rerun: tous les onglets affichent la version éditée
+        if st.button("💾 Sauvegarder les modifications", on_click=save_edited_letter, args=(result, edit_key)):
+            st.success("✅ Modifications sauvegardées avec succès!")
+        
+        # Réécriture d'un seul paragraphe: seule la lettre est renvoyée au modèle
+        paragraphs = split_paragraphs(st.session_state.get(edit_key) or cover_letter)
+        if openai_client is not None and paragraphs:
+            st.markdown("#### 🔁 Réécrire un paragraphe")
+            index_key = f"paragraph_index_{result['inputs_hash']}_{len(paragraphs)}"
+            instructions_key = f"paragraph_instructions_{result['inputs_hash']}"
+            st.selectbox(
+                "Paragraphe",
+                range(len(paragraphs)),
+                format_func=lambda index: f"§{index + 1} · {paragraphs[index][:70]}…",
+                key=index_key
+            )
+            st.text_input(
+                "Consignes (optionnel)",
+                placeholder="Ex: plus concis, mentionner ma mobilité...",
+                key=instructions_key
+            )
+            st.button(
+                "🔁 Réécrire ce paragraphe",
+                on_click=rewrite_paragraph,
+                args=(result, edit_key, index_key, instructions_key, openai_client)
+            )
+            rewritten = result.pop('rewritten_paragraph', None)
+            if result.get('paragraph_error'):
+                st.error(f"❌ {result['paragraph_error']}")
+            elif rewritten is not None:
+                st.success(f"✅ Paragraphe §{rewritten + 1} réécrit")
+    
+    with tab3:
+        st.markdown("### 📊 Analyse de votre lettre")
+        
+        # Basic analysis avec cartes métriques
+        word_count = len(cover_letter.split())
+        char_count = len(cover_letter)
+        
+        col_analysis1, col_analysis2, col_analysis3 = st.columns(3)
+        
+        with col_analysis1:
+            st.markdown("""
+            <div class="metric-card">
+                <h3 style="color: #FF6B6B; margin: 0;">""" + str(word_count) + """</h3>
+                <p style="color: #636E72; margin: 0;">Mots</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col_analysis2:
+            st.markdown("""
+            <div class="metric-card">
+                <h3 style="color: #4ECDC4; margin: 0;">""" + str(char_count) + """</h3>
+                <p style="color: #636E72; margin: 0;">Caractères</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col_analysis3:
+            st.markdown("""
+            <div class="metric-card">
+                <h3 style="color: #45B7D1; margin: 0;">""" + str(word_count//200 + 1) + """ min</h3>
+                <p style="color: #636E72; margin: 0;">Lecture</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        # Quality indicators
+        st.markdown("#### 🎯 Indicateurs de qualité")
+        quality_score = min(100, (word_count / 350) * 100)
+        st.progress(quality_score / 100)
+        st.write(f"Score de qualité: {quality_score:.0f}%")
+        
+        # Temps de génération
+        if generation_stats:
+            st.markdown("#### ⏱️ Temps de génération")
+            st.write(
+                f"Premier mot après {generation_stats.get('time_to_first_token', 0):.1f} s · "
+                f"Total: {generation_stats.get('total_time', 0):.1f} s"
+            )
+            if generation_stats.get('model'):
+                st.caption(f"Modèle: {generation_stats['model']}")
+            if generation_stats.get('prompt_tokens'):
+                st.caption(
+                    f"Prompt: {generation_stats['prompt_tokens']} tokens, "
+                    f"dont {generation_stats.get('cached_tokens', 0)} en cache"
+                )
+            stage_labels = {
+                "resume_parsed": "CV analysé",
+                "posting_fetched": "Offre récupérée",
+                "prompt_built": "Prompt prêt",
+                "first_token": "Premier mot",
+                "done": "Terminé",
+            }
+            st.caption(" · ".join(
+                f"{stage_labels.get(stage, stage)}: {elapsed:.2f} s"
+                for stage, elapsed in generation_stats.get('stages', {}).items()
+            ))
+    
+    with tab4:
+        st.markdown("### 💾 Télécharger votre lettre")
+        
+        col_download1, col_download2 = st.columns(2)
+        
+        with col_download1:
+            st.download_button(
+                label="📄 Télécharger en TXT",
+                data=cover_letter,
+                file_name="lettre_motivation.txt",
+                mime="text/plain",
+                use_container_width=True
+            )
+        
+        with col_download2:
+            st.download_button(
+                label="📋 Télécharger en Markdown",
+                data=cover_letter,
+                file_name="lettre_motivation.md",
+                mime="text/markdown",
+                use_container_width=True
+            )
+        
+        st.markdown("#### 📋 Aperçu pour copier")
+        st.code(cover_letter, language="text")
+
 
 def main():
     st.set_page_config(
@@ -424,6 +736,7 @@ def main():
             4. Copiez la clé qui commence par `sk-`
             
             ### 🌐 Firecrawl API Key (optionnelle)
+            Les offres sont d'abord lues directement; Firecrawl ne sert qu'aux pages affichées en JavaScript.
             1. Allez sur [firecrawl.dev](https://www.firecrawl.dev/)
             2. Créez un compte
             3. Obtenez votre clé API
@@ -480,6 +793,27 @@ def main():
         include_salary = st.checkbox("💰 Mentionner les attentes salariales", value=False)
         include_availability = st.checkbox("📅 Mentionner la disponibilité", value=True)
         emphasize_skills = st.checkbox("🎯 Mettre l'accent sur les compétences", value=True)
+        regenerate = st.checkbox(
+            "🔄 Forcer une nouvelle génération",
+            value=False,
+            help="Ignore la lettre déjà générée pour ces mêmes informations"
+        )
+        draft = st.checkbox(
+            "⚡ Brouillon rapide",
+            value=False,
+            help="Utilise un modèle plus rapide et moins coûteux; décochez pour la version finale"
+        )
+        
+        # Variants
+        st.markdown("#### 🧪 Comparer plusieurs versions")
+        variant_tones = st.multiselect(
+            "Tons à comparer",
+            ["Professionnel", "Enthousiaste", "Confiant", "Humble", "Créatif"]
+        )
+        variant_templates = st.multiselect(
+            "Structures à comparer",
+            ["Classique", "Moderne", "Créative", "Technique", "Commercial"]
+        )
         
         # Save preferences
         if st.button("💾 Sauvegarder les préférences"):
@@ -597,40 +931,72 @@ def main():
             type="primary",
             use_container_width=True
         )
+        compare_button = st.button(
+            "🧪 Comparer les versions",
+            use_container_width=True,
+            disabled=not (variant_tones or variant_templates),
+            help="Choisissez des tons ou structures à comparer dans la barre latérale"
+        )
+    
+    # Empreinte des entrées: la génération n'est relancée que si elles changent
+    generation_options = dict(
+        tone=tone, length=length, language=language, template=template,
+        include_salary=include_salary, include_availability=include_availability,
+        emphasize_skills=emphasize_skills, company_name=company_name,
+        position_title=position_title, hiring_manager=hiring_manager,
+        key_skills=key_skills, achievements=achievements, draft=draft
+    )
+    inputs_hash = compute_inputs_hash(uploaded_file, job_content, **generation_options)
+    stored_result = st.session_state.get(RESULT_KEY)
     
     if generate_button:
-        if uploaded_file is not None and job_content:
+        if stored_result and stored_result['inputs_hash'] == inputs_hash and not regenerate:
+            st.info("ℹ️ Lettre déjà générée pour ces informations. Cochez « Forcer une nouvelle génération » pour en obtenir une autre.")
+        elif uploaded_file is not None and job_content:
             try:
                 # Progress tracking avec animations
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
-                async def process_with_enhanced_status():
-                    # Step 1: Processing resume
-                    status_text.info("📄 Analyse de votre CV en cours...")
-                    progress_bar.progress(20)
-                    await asyncio.sleep(0.5)
+                def process_with_enhanced_status():
+                    status_text.info("📄 Analyse de votre CV et de l'offre d'emploi...")
+                    progress_bar.progress(5)
                     
-                    # Step 2: Processing job posting
-                    status_text.info("🔍 Analyse de l'offre d'emploi...")
-                    progress_bar.progress(40)
-                    await asyncio.sleep(0.5)
+                    # Progression pilotée par les étapes réelles du pipeline
+                    stage_timings = {}
+                    stage_display = {
+                        "resume_parsed": (None, "📄 CV analysé"),
+                        "posting_fetched": (None, "🔍 Offre d'emploi analysée"),
+                        "prompt_built": (60, "✍️ Génération de votre lettre personnalisée..."),
+                        "first_token": (80, "✍️ Rédaction en cours..."),
+                        "done": (100, "✨ Lettre générée avec succès !"),
+                    }
                     
-                    # Step 3: Matching analysis
-                    status_text.info("🎯 Analyse de correspondance...")
-                    progress_bar.progress(60)
-                    await asyncio.sleep(0.5)
+                    def on_event(event):
+                        stage_timings[event['stage']] = event['elapsed']
+                        percent, message = stage_display.get(event['stage'], (None, None))
+                        if percent is None:
+                            # CV et offre sont traités en parallèle, dans un ordre quelconque
+                            extracted = len({"resume_parsed", "posting_fetched"} & stage_timings.keys())
+                            percent = 5 + 25 * extracted
+                        progress_bar.progress(percent)
+                        if event['stage'] == "done":
+                            status_text.success(message)
+                        elif message:
+                            status_text.info(message)
                     
-                    # Step 4: Generation
-                    status_text.info("✍️ Génération de votre lettre personnalisée...")
-                    progress_bar.progress(80)
-                    
-                    # Appel à votre fonction avec tous les paramètres
-                    cover_letter = await process_cover_letter_request(
+                    # Appel en streaming sur la boucle partagée: la lettre s'affiche au fur
+                    # et à mesure, les éléments Streamlit sont mis à jour depuis ce thread
+                    letter_placeholder = st.empty()
+                    letter_parts = []
+                    generation_stats = {}
+                    last_render = 0.0
+                    generation = stream_with_events(lambda on_stage: stream_cover_letter_request(
                         resume_file=uploaded_file,
                         job_content=job_content,
                         openai_client=openai_client,
                         firecrawl_client=firecrawl_client,
+                        stats=generation_stats,
                         tone=tone,
                         length=length,
                         language=language,
@@ -642,126 +1008,46 @@ def main():
                         position_title=position_title,
                         hiring_manager=hiring_manager,
                         key_skills=key_skills,
-                        achievements=achievements
-                    )
+                        achievements=achievements,
+                        regenerate=regenerate,
+                        draft=draft,
+                        on_event=on_stage
+                    ))
+                    for kind, value in get_runtime().iterate(generation):
+                        if kind == "event":
+                            on_event(value)
+                            continue
+                        letter_parts.append(value)
+                        # Limiter le nombre de rendus Streamlit (~10 par seconde)
+                        now = time.perf_counter()
+                        if now - last_render > 0.1:
+                            letter_placeholder.markdown("".join(letter_parts) + "▌")
+                            last_render = now
                     
-                    progress_bar.progress(100)
-                    status_text.success("✨ Lettre générée avec succès !")
+                    letter_placeholder.empty()
+                    generation_stats['stages'] = stage_timings
                     
-                    return cover_letter
+                    return "".join(letter_parts), generation_stats
 
-                # Run the async function
-                cover_letter = asyncio.run(process_with_enhanced_status())
+                cover_letter, generation_stats = process_with_enhanced_status()
                 
                 if cover_letter:
                     # Clear progress indicators
                     progress_bar.empty()
                     status_text.empty()
                     
-                    # Display results avec interface améliorée
-                    st.markdown("---")
-                    st.markdown("""
-                    <div class="section-card">
-                        <h2 style="color: #FF6B6B; text-align: center;">🎉 Votre lettre de motivation</h2>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Create tabs for different views
-                    tab1, tab2, tab3, tab4 = st.tabs(["📄 Aperçu", "📝 Édition", "📊 Analyse", "💾 Téléchargement"])
-                    
-                    with tab1:
-                        st.markdown("### 👀 Aperçu de votre lettre")
-                        st.markdown(
-                            f"""
-                            <div style="background: linear-gradient(135deg, #f8f9fa, #e9ecef); 
-                                        padding: 2rem; 
-                                        border-radius: 15px; 
-                                        border-left: 5px solid #FF6B6B;
-                                        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-                                        margin: 1rem 0;">
-                                {cover_letter.replace(chr(10), '<br>')}
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
+                    # Conserver le résultat pour les reruns suivants (édition, téléchargement...)
+                    previous = st.session_state.get(RESULT_KEY)
+                    st.session_state[RESULT_KEY] = {
+                        'inputs_hash': inputs_hash,
+                        'letter': cover_letter,
+                        'edited_letter': None,
+                        'stats': generation_stats,
+                        'options': generation_options,
+                        'created_at': time.time(),
+                        'version': previous['version'] + 1 if previous else 1,
+                    }
                     
-                    with tab2:
-                        st.markdown("### ✏️ Éditer votre lettre")
-                        edited_letter = st.text_area(
-                            "Vous pouvez modifier votre lettre ici:",
-                            value=cover_letter,
-                            height=400,
-                            key="edit_letter"
-                        )
-                        
-                        if st.button("💾 Sauvegarder les modifications"):
-                            st.success("✅ Modifications sauvegardées avec succès!")
-                    
-                    with tab3:
-                        st.markdown("### 📊 Analyse de votre lettre")
-                        
-                        # Basic analysis avec cartes métriques
-                        word_count = len(cover_letter.split())
-                        char_count = len(cover_letter)
-                        
-                        col_analysis1, col_analysis2, col_analysis3 = st.columns(3)
-                        
-                        with col_analysis1:
-                            st.markdown("""
-                            <div class="metric-card">
-                                <h3 style="color: #FF6B6B; margin: 0;">""" + str(word_count) + """</h3>
-                                <p style="color: #636E72; margin: 0;">Mots</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                        with col_analysis2:
-                            st.markdown("""
-                            <div class="metric-card">
-                                <h3 style="color: #4ECDC4; margin: 0;">""" + str(char_count) + """</h3>
-                                <p style="color: #636E72; margin: 0;">Caractères</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                        with col_analysis3:
-                            st.markdown("""
-                            <div class="metric-card">
-                                <h3 style="color: #45B7D1; margin: 0;">""" + str(word_count//200 + 1) + """ min</h3>
-                                <p style="color: #636E72; margin: 0;">Lecture</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        # Quality indicators
-                        st.markdown("#### 🎯 Indicateurs de qualité")
-                        quality_score = min(100, (word_count / 350) * 100)
-                        st.progress(quality_score / 100)
-                        st.write(f"Score de qualité: {quality_score:.0f}%")
-                    
-                    with tab4:
-                        st.markdown("### 💾 Télécharger votre lettre")
-                        
-                        col_download1, col_download2 = st.columns(2)
-                        
-                        with col_download1:
-                            st.download_button(
-                                label="📄 Télécharger en TXT",
-                                data=cover_letter,
-                                file_name="lettre_motivation.txt",
-                                mime="text/plain",
-                                use_container_width=True
-                            )
-                        
-                        with col_download2:
-                            st.download_button(
-                                label="📋 Télécharger en Markdown",
-                                data=cover_letter,
-                                file_name="lettre_motivation.md",
-                                mime="text/markdown",
-                                use_container_width=True
-                            )
-                        
-                        st.markdown("#### 📋 Aperçu pour copier")
-                        st.code(cover_letter, language="text")
-                
                 else:
                     st.error("❌ Erreur lors de la génération. Veuillez réessayer.")
                     
@@ -777,6 +1063,43 @@ def main():
                     
         else:
             st.warning("⚠️ Veuillez télécharger votre CV et fournir l'offre d'emploi.")
+    
+    if compare_button:
+        if uploaded_file is not None and job_content:
+            variants = [
+                {'tone': variant_tone, 'template': variant_template}
+                for variant_tone in (variant_tones or [tone])
+                for variant_template in (variant_templates or [template])
+            ][:MAX_VARIANTS]
+            try:
+                with st.spinner(f"🧪 Génération de {len(variants)} versions en parallèle..."):
+                    started = time.perf_counter()
+                    results = get_runtime().run(process_cover_letter_variants(
+                        resume_file=uploaded_file,
+                        job_content=job_content,
+                        openai_client=openai_client,
+                        firecrawl_client=firecrawl_client,
+                        variants=variants,
+                        regenerate=regenerate,
+                        **{**generation_options, 'tone': tone, 'template': template}
+                    ))
+                for variant in results:
+                    variant['options'] = {**generation_options, 'tone': variant['tone'], 'template': variant['template']}
+                    variant['inputs_hash'] = compute_inputs_hash(uploaded_file, job_content, **variant['options'])
+                st.session_state[VARIANTS_KEY] = {
+                    'variants': results,
+                    'elapsed': time.perf_counter() - started,
+                }
+            except Exception as e:
+                st.error(f"❌ Une erreur s'est produite: {str(e)}")
+        else:
+            st.warning("⚠️ Veuillez télécharger votre CV et fournir l'offre d'emploi.")
+    
+    if VARIANTS_KEY in st.session_state:
+        render_variants(st.session_state[VARIANTS_KEY])
+    
+    if RESULT_KEY in st.session_state:
+        render_result(st.session_state[RESULT_KEY], inputs_hash, openai_client)
 
     # Footer avec instructions dans une carte
     st.markdown("---")
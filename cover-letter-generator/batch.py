@@ -0,0 +1,82 @@
+# batch.py - Génération de lettres en lot depuis la ligne de commande
+#
+# Exemple:
+#   python batch.py mon_cv.pdf offres.txt -o lettres.jsonl --concurrency 8 --tone Confiant
+import argparse
+import asyncio
+import sys
+
+from dotenv import load_dotenv
+
+from src.batch import load_jobs, run_batch
+from src.clients import create_firecrawl_client, create_openai_client
+from src.dedupe import DEFAULT_THRESHOLD
+from src.files import LocalFile
+from src.telemetry import write_metrics
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Génère une lettre de motivation par offre d'emploi pour un même CV."
+    )
+    parser.add_argument("resume", help="CV (PDF, DOCX ou TXT)")
+    parser.add_argument("jobs", help="Offres: une URL/texte par ligne, ou fichier .jsonl")
+    parser.add_argument("-o", "--output", default="lettres.jsonl", help="Fichier JSONL de sortie")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Générations simultanées")
+    parser.add_argument("--tone", default="Professionnel")
+    parser.add_argument("--length", default="Moyenne (350-400 mots)")
+    parser.add_argument("--language", default="Français")
+    parser.add_argument("--template", default="Classique")
+    parser.add_argument("--draft", action="store_true", help="Brouillons avec le modèle rapide")
+    parser.add_argument("--no-dedupe", action="store_true", help="Génère une lettre pour chaque offre, même quasi identique")
+    parser.add_argument(
+        "--dedupe-threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Similarité à partir de laquelle deux offres sont considérées identiques"
+    )
+    parser.add_argument(
+        "--substitute-company", action="store_true",
+        help="Reprend la lettre d'une offre identique d'une autre entreprise en remplaçant son nom"
+    )
+    parser.add_argument("--metrics-file", help="Fichier où écrire les métriques (format Prometheus)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    load_dotenv()
+
+    openai_client = create_openai_client()
+    if openai_client is None:
+        print("❌ OPENAI_API_KEY manquante", file=sys.stderr)
+        return 1
+
+    jobs = load_jobs(args.jobs)
+    summary = asyncio.run(run_batch(
+        resume_file=LocalFile(args.resume),
+        jobs=jobs,
+        output_path=args.output,
+        openai_client=openai_client,
+        firecrawl_client=create_firecrawl_client(),
+        concurrency=args.concurrency,
+        dedupe=not args.no_dedupe,
+        dedupe_threshold=args.dedupe_threshold,
+        substitute_company=args.substitute_company,
+        tone=args.tone,
+        length=args.length,
+        language=args.language,
+        template=args.template,
+        draft=args.draft
+    ))
+    if args.metrics_file:
+        write_metrics(args.metrics_file)
+    print(
+        f"✅ {summary['ok']} lettres générées, {summary['error']} erreurs, "
+        f"{summary['skipped']} déjà présentes -> {args.output}"
+    )
+    if summary['reused']:
+        print(f"♻️ {summary['reused']} lettres réutilisées ({summary['reused']} appels au modèle évités)")
+    return 0 if summary['error'] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
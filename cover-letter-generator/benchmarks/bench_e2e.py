@@ -0,0 +1,241 @@
+# benchmarks/bench_e2e.py - Benchmark de bout en bout de process_cover_letter_request
+#
+# Usage:
+#   python benchmarks/bench_e2e.py [--concurrency 1 4 16] [--requests 48]
+#                                  [--latency 0.3] [--token-rate 200] [--error-rate 0.0]
+#                                  [--save-baseline benchmarks/baselines/local.json]
+#                                  [--compare benchmarks/baselines/local.json]
+#
+# Le pipeline complet (extraction du CV PDF/DOCX/TXT, récupération de l'offre,
+# prompt, génération) tourne contre des serveurs locaux qui imitent OpenAI et
+# Firecrawl (fake_openai.py, fake_firecrawl.py). Les caches sont désactivés sauf
+# --with-caches, pour mesurer le travail réel de chaque requête.
+#
+# --compare affiche l'écart avec une mesure enregistrée et se termine avec le code 1
+# si le p95 ou le débit régressent de plus de --threshold (10 % par défaut).
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_firecrawl import FakeFirecrawlServer, SimpleScrapeClient  # noqa: E402
+from fake_openai import FakeOpenAIServer  # noqa: E402
+from sample_documents import load_postings, load_resumes  # noqa: E402
+
+# Étapes rapportées: durée propre de chaque étape (voir src/events.py)
+STAGES = ("resume_parsed", "posting_fetched", "prompt_built", "generation")
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def configure_environment(with_caches: bool) -> None:
+    # Doit précéder l'import de src.core (constantes lues à l'import)
+    os.environ.setdefault("COVER_LETTER_CACHE_DIR", tempfile.mkdtemp(prefix="bench-e2e-"))
+    # Les URLs d'offres n'existent que dans fake_firecrawl.py (voir bench_fetch.py pour l'extraction locale)
+    os.environ.setdefault("COVER_LETTER_EXTRACTORS", "firecrawl")
+    if not with_caches:
+        for name in ("RESUME", "SCRAPE", "GENERATION"):
+            os.environ[f"COVER_LETTER_{name}_CACHE"] = "0"
+
+
+def create_scrape_client(api_url: str):
+    try:
+        from src.clients import create_firecrawl_client
+        return create_firecrawl_client("fc-bench", api_url=api_url)
+    except ImportError:
+        return SimpleScrapeClient(api_url)
+
+
+async def run_level(
+    concurrency: int,
+    requests: int,
+    resumes,
+    jobs: List[str],
+    openai_client,
+    firecrawl_client
+) -> Dict[str, Any]:
+    """
+    Lance `requests` générations avec au plus `concurrency` en parallèle.
+    """
+    from src.core import process_cover_letter_request
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+
+    async def one(index: int) -> None:
+        resume = resumes[index % len(resumes)]
+        job = jobs[index % len(jobs)]
+        events: Dict[str, Dict[str, Any]] = {}
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await process_cover_letter_request(
+                    resume, job, openai_client, firecrawl_client,
+                    # Options variées: pas deux requêtes identiques à la suite
+                    company_name=f"Entreprise {index}",
+                    on_event=lambda event: events.__setitem__(event['stage'], event)
+                )
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+        for stage in ("resume_parsed", "posting_fetched", "prompt_built"):
+            if 'duration' in events.get(stage, {}):
+                stages[stage].append(events[stage]['duration'])
+        if "prompt_built" in events and "done" in events:
+            stages["generation"].append(events["done"]['elapsed'] - events["prompt_built"]['elapsed'])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    wall_time = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'ok': len(latencies),
+        'errors': dict(errors),
+        'throughput': len(latencies) / wall_time if wall_time else 0.0,
+        'p50': percentile(ordered, 0.50),
+        'p95': percentile(ordered, 0.95),
+        'p99': percentile(ordered, 0.99),
+        'stages_p50': {stage: percentile(sorted(stages[stage]), 0.5) for stage in STAGES if stages[stage]},
+        'stages_p95': {stage: percentile(sorted(stages[stage]), 0.95) for stage in STAGES if stages[stage]},
+    }
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(f"{'conc.':>5} {'ok':>5} {'err.':>5} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8}   étapes (p50)")
+    for result in results:
+        stages = " · ".join(
+            f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in result['stages_p50'].items()
+        )
+        print(
+            f"{result['concurrency']:>5} {result['ok']:>5} {sum(result['errors'].values()):>5} "
+            f"{result['throughput']:>7.2f} {result['p50'] * 1000:>6.0f}ms {result['p95'] * 1000:>6.0f}ms "
+            f"{result['p99'] * 1000:>6.0f}ms   {stages}"
+        )
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> bool:
+    """
+    Affiche l'écart avec la mesure de référence; renvoie False en cas de régression.
+    """
+    reference = {result['concurrency']: result for result in baseline['results']}
+    print(f"\nComparaison avec {baseline.get('revision') or 'la référence'} ({baseline.get('created_at', '?')})")
+    ok = True
+    for result in results:
+        before = reference.get(result['concurrency'])
+        if before is None:
+            continue
+        p95_change = (result['p95'] - before['p95']) / before['p95'] if before['p95'] else 0.0
+        throughput_change = (
+            (result['throughput'] - before['throughput']) / before['throughput'] if before['throughput'] else 0.0
+        )
+        regression = p95_change > threshold or throughput_change < -threshold
+        ok = ok and not regression
+        print(
+            f"  concurrence {result['concurrency']:>3}: p95 {p95_change:+.1%}, débit {throughput_change:+.1%}"
+            + ("  ⚠️ régression" if regression else "")
+        )
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=48, help="Requêtes par niveau de concurrence")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latence simulée du modèle (s)")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Débit simulé du modèle (tokens/s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part des appels au modèle en erreur 429")
+    parser.add_argument("--scrape-latency", type=float, default=0.2, help="Latence simulée du scraping (s)")
+    parser.add_argument("--formats", nargs="+", default=["txt", "pdf", "docx"])
+    parser.add_argument("--with-caches", action="store_true")
+    parser.add_argument("--save-baseline", help="Fichier JSON où enregistrer les résultats")
+    parser.add_argument("--compare", help="Fichier JSON de référence")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    configure_environment(args.with_caches)
+    from src.clients import create_openai_client
+
+    postings = load_postings()
+    pages = {f"https://jobs.example.com/{posting.name}": posting.text for posting in postings}
+    # Une offre sur deux par URL (scraping), les autres en texte
+    jobs = [url if index % 2 == 0 else pages[url] for index, url in enumerate(pages)]
+    resumes = load_resumes(tuple(args.formats))
+
+    openai_server = FakeOpenAIServer(
+        latency=args.latency, token_rate=args.token_rate,
+        error_rate=args.error_rate, retry_after=0.1, seed=0
+    ).start()
+    scrape_server = FakeFirecrawlServer(pages, latency=args.scrape_latency, seed=0).start()
+    try:
+        async def run_all() -> List[Dict[str, Any]]:
+            openai_client = create_openai_client("sk-bench", base_url=openai_server.base_url)
+            firecrawl_client = create_scrape_client(scrape_server.api_url)
+            results = []
+            for concurrency in args.concurrency:
+                results.append(await run_level(
+                    concurrency, args.requests, resumes, jobs, openai_client, firecrawl_client
+                ))
+            await openai_client.close()
+            return results
+
+        results = asyncio.run(run_all())
+    finally:
+        openai_server.stop()
+        scrape_server.stop()
+
+    print(
+        f"{len(resumes)} CV ({', '.join(args.formats)}), {len(jobs)} offres · modèle: "
+        f"{args.latency:.2f}s + {args.token_rate:.0f} tokens/s, {args.error_rate:.0%} d'erreurs"
+    )
+    print_results(results)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'options': vars(args),
+                'results': results,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats enregistrés dans {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# benchmarks/bench_fetch.py - Récupération des offres: téléchargement direct vs Firecrawl seul
+#
+# Usage: python benchmarks/bench_fetch.py [--rounds 20] [--concurrency 8]
+#                                         [--site-latency 0.05] [--firecrawl-latency 1.5]
+#
+# Les pages de benchmarks/corpus/html/ (pages d'offres enregistrées) sont servies
+# par un serveur HTTP local; Firecrawl est imité par fake_firecrawl.py. Le manifeste
+# (manifest.json) indique pour chaque page le chemin attendu (local ou repli sur
+# Firecrawl) et les phrases qui doivent, ou ne doivent pas, figurer dans le texte extrait.
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Le serveur de test écoute sur 127.0.0.1: autoriser les adresses locales
+os.environ.setdefault("COVER_LETTER_FETCH_ALLOW_PRIVATE", "1")
+
+from bench_e2e import create_scrape_client, percentile  # noqa: E402
+from fake_firecrawl import FakeFirecrawlServer  # noqa: E402
+from sample_documents import CORPUS_DIR  # noqa: E402
+from src.extractors import PostingHTMLParser, fetch_posting  # noqa: E402
+
+HTML_DIR = os.path.join(CORPUS_DIR, "html")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        super().do_GET()
+
+
+def start_site(latency: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(FixtureHandler, directory=HTML_DIR))
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_time(html: str, runs: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        parser = PostingHTMLParser()
+        parser.feed(html)
+        parser.close()
+        parser.main_text()
+    return (time.perf_counter() - started) / runs
+
+
+async def run_mode(order: str, urls: List[str], rounds: int, concurrency: int, firecrawl_client) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    texts: Dict[str, str] = {}
+
+    async def one(url: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            texts[url] = await fetch_posting(url, firecrawl_client, order=order)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(url) for _ in range(rounds) for url in urls))
+    wall_time = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        'throughput': len(latencies) / wall_time,
+        'p50': percentile(ordered, 0.5),
+        'p95': percentile(ordered, 0.95),
+        'texts': texts,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20, help="Passages sur l'ensemble des pages")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--site-latency", type=float, default=0.05, help="Latence simulée des sites d'emploi (s)")
+    parser.add_argument("--firecrawl-latency", type=float, default=1.5, help="Latence simulée de Firecrawl (s)")
+    args = parser.parse_args()
+
+    with open(os.path.join(HTML_DIR, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    site = start_site(args.site_latency)
+    base_url = f"http://127.0.0.1:{site.server_address[1]}"
+    urls = {name: f"{base_url}/{name}" for name in manifest}
+    # Firecrawl rend les pages avec JavaScript: on lui donne le texte attendu
+    rendered = {url: f"[rendu Firecrawl] {name}\n" + "texte de l'offre " * 40 for name, url in urls.items()}
+    firecrawl_server = FakeFirecrawlServer(rendered, latency=args.firecrawl_latency).start()
+    firecrawl_client = create_scrape_client(firecrawl_server.api_url)
+
+    print(f"{len(urls)} pages, {args.rounds} passages, concurrence {args.concurrency} · "
+          f"sites {args.site_latency * 1000:.0f}ms, Firecrawl {args.firecrawl_latency * 1000:.0f}ms")
+    print(f"\n{'page':<24} {'octets':>7} {'analyse':>8} {'caract.':>8} {'chemin':>9} {'attendu':>9}  contrôle")
+    failures = 0
+
+    async def check_pages() -> None:
+        nonlocal failures
+        for name, spec in manifest.items():
+            with open(os.path.join(HTML_DIR, name), encoding="utf-8") as f:
+                html = f.read()
+            text = await fetch_posting(urls[name], firecrawl_client)
+            path = "fallback" if text.startswith("[rendu Firecrawl]") else "local"
+            missing = [phrase for phrase in spec['must'] if phrase not in text]
+            unwanted = [phrase for phrase in spec['must_not'] if phrase in text]
+            ok = path == spec['expected'] and not missing and not unwanted
+            failures += not ok
+            detail = "ok" if ok else f"manquant {missing}, en trop {unwanted}"
+            print(
+                f"{name:<24} {len(html.encode('utf-8')):>7} {parse_time(html) * 1000:>6.2f}ms "
+                f"{len(text):>8} {path:>9} {spec['expected']:>9}  {detail}"
+            )
+
+    async def compare() -> List[Dict[str, Any]]:
+        results = []
+        for label, order in (("firecrawl", "firecrawl"), ("local,firecrawl", "local,firecrawl")):
+            calls_before = firecrawl_server.calls
+            result = await run_mode(order, list(urls.values()), args.rounds, args.concurrency, firecrawl_client)
+            result.update(label=label, firecrawl_calls=firecrawl_server.calls - calls_before)
+            results.append(result)
+        return results
+
+    try:
+        asyncio.run(check_pages())
+        results = asyncio.run(compare())
+    finally:
+        firecrawl_server.stop()
+        site.shutdown()
+
+    total = args.rounds * len(urls)
+    print(f"\n{'extracteurs':<16} {'req/s':>7} {'p50':>8} {'p95':>8} {'appels Firecrawl':>17}")
+    for result in results:
+        print(
+            f"{result['label']:<16} {result['throughput']:>7.1f} {result['p50'] * 1000:>6.0f}ms "
+            f"{result['p95'] * 1000:>6.0f}ms {result['firecrawl_calls']:>8}/{total}"
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# benchmarks/bench_pdf.py - Extraction de PDF volumineux: tout le document vs lecture bornée
+#
+# Usage: python benchmarks/bench_pdf.py [--pages 10 50 200] [--runs 3]
+# Nécessite PyPDF2. Les PDF sont générés en mémoire (texte seul, police standard).
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sample_documents import build_pdf  # noqa: E402
+from src.pdf import MAX_PDF_CHARS, MAX_PDF_PAGES, extract_pdf_text  # noqa: E402
+
+WORDS = [
+    "expérience", "développement", "Python", "projet", "équipe", "client", "données",
+    "gestion", "plateforme", "migration", "performance", "qualité", "déploiement",
+    "analyse", "formation", "responsable", "architecture", "service", "produit",
+]
+
+
+def synthetic_pdf(pages: int, lines_per_page: int = 45, seed: int = 0) -> bytes:
+    """
+    Construit un PDF de `pages` pages de texte aléatoire.
+    """
+    rng = random.Random(seed)
+    return build_pdf([
+        [f"Page {number + 1}"] + [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+        for number in range(pages)
+    ])
+
+
+def measure(func, runs: int):
+    """
+    Meilleur temps sur `runs` exécutions (chronomètre seul: tracemalloc ralentit
+    fortement PyPDF2), puis pic mémoire sur une exécution supplémentaire.
+    """
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-pages", type=int, default=MAX_PDF_PAGES)
+    parser.add_argument("--max-chars", type=int, default=MAX_PDF_CHARS)
+    args = parser.parse_args()
+
+    print(f"Limites: {args.max_pages or '-'} pages, {args.max_chars or '-'} caractères")
+    print(f"{'pages':>6} {'taille':>9} {'complet':>10} {'borné':>10} {'mém. complet':>13} {'mém. borné':>11} {'pages lues':>10} {'p. max':>8}")
+    for pages in args.pages:
+        data = synthetic_pdf(pages)
+        full_time, full_peak, _ = measure(lambda: extract_pdf_text(data, max_pages=0, max_chars=0), args.runs)
+        bounded_time, bounded_peak, bounded = measure(
+            lambda: extract_pdf_text(data, max_pages=args.max_pages, max_chars=args.max_chars), args.runs
+        )
+        print(
+            f"{pages:>6} {len(data) / 1024:>7.0f}Ko {full_time * 1000:>8.0f}ms {bounded_time * 1000:>8.0f}ms "
+            f"{full_peak / 2 ** 20:>11.1f}Mo {bounded_peak / 2 ** 20:>9.1f}Mo "
+            f"{bounded.pages:>10} {max(bounded.page_seconds) * 1000:>6.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_ranking.py - Temps de sélection des parties pertinentes du CV
+#
+# Usage: python benchmarks/bench_ranking.py [--bullets 120] [--runs 200]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ranking import select_relevant_content, split_resume  # noqa: E402
+
+SKILLS = [
+    "Python", "Django", "FastAPI", "SQL", "PostgreSQL", "Docker", "Kubernetes", "AWS",
+    "React", "TypeScript", "gestion d'équipe", "Scrum", "machine learning", "pandas",
+    "Java", "Spring", "CI/CD", "Terraform", "analyse de données", "négociation",
+]
+VERBS = ["Développé", "Conçu", "Piloté", "Optimisé", "Migré", "Automatisé", "Animé", "Déployé"]
+
+
+def synthetic_resume(bullets: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = ["Jean Dupont", "jean.dupont@example.com · Paris", ""]
+    for section in ("EXPÉRIENCE", "PROJETS", "FORMATION", "COMPÉTENCES"):
+        lines.append(section)
+        for _ in range(bullets // 4):
+            skills = ", ".join(rng.sample(SKILLS, 3))
+            lines.append(f"- {rng.choice(VERBS)} une plateforme avec {skills} pour {rng.randint(2, 50)} clients")
+        lines.append("")
+    return "\n".join(lines)
+
+
+JOB = """Développeur backend Python (H/F)
+
+Profil recherché:
+- 5 ans d'expérience en Python, FastAPI ou Django
+- Maîtrise de PostgreSQL, Docker et AWS
+- Connaissance de Terraform et CI/CD appréciée
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bullets", type=int, default=120)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=600)
+    args = parser.parse_args()
+
+    resume = synthetic_resume(args.bullets)
+    units = len(split_resume(resume))
+
+    select_relevant_content(resume, JOB, args.max_tokens)  # échauffement
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        selected = select_relevant_content(resume, JOB, args.max_tokens)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    print(f"CV: {len(resume)} caractères, {units} unités -> {len(selected)} caractères gardés")
+    print(
+        f"select_relevant_content: médiane {timings[len(timings) // 2]:.2f} ms, "
+        f"p95 {timings[int(len(timings) * 0.95)]:.2f} ms, max {timings[-1]:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
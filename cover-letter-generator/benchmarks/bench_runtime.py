@@ -0,0 +1,120 @@
+# benchmarks/bench_runtime.py - Coût d'asyncio.run() + nouveau client par requête
+# comparé à la boucle partagée et au pool de connexions (src/runtime.py)
+#
+# Usage: python benchmarks/bench_runtime.py [--requests 50] [--latency 0.0]
+#
+# Le serveur local est en HTTP simple: l'écart mesuré ne comprend que la création
+# du client et de la connexion TCP. Contre l'API réelle s'y ajoute la poignée de main TLS.
+#
+# Résultats (200 requêtes, serveur sans latence, Python 3.11, 1 cœur; 3 exécutions):
+#   asyncio.run par requête    médiane 52-55 ms · p95 67-74 ms
+#   boucle + client partagés   médiane 4.3-4.8 ms · p95 4.9-6.0 ms
+#   dont création du client ~44 ms (contexte SSL et certificats chargés à chaque
+#   AsyncOpenAI), asyncio.run() ~0.2 ms: le gain vient de la réutilisation du client
+#   et de ses connexions, que la boucle partagée rend possible (un client httpx
+#   asynchrone reste lié à sa boucle).
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_openai import FakeOpenAIServer  # noqa: E402
+from src.clients import create_openai_client  # noqa: E402
+from src.runtime import get_runtime  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Bonjour"}]
+
+
+async def one_completion(client) -> None:
+    await client.chat.completions.create(model="gpt-4", messages=MESSAGES, max_tokens=50)
+
+
+def per_click_event_loop(base_url: str, requests: int):
+    """
+    Ancien comportement de app.py: asyncio.run() et un nouveau client à chaque clic.
+    """
+    from openai import AsyncOpenAI
+
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+
+        async def run():
+            async with AsyncOpenAI(api_key="sk-bench", base_url=base_url) as client:
+                await one_completion(client)
+
+        asyncio.run(run())
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def shared_runtime(base_url: str, requests: int):
+    runtime = get_runtime()
+    client = create_openai_client("sk-bench", base_url=base_url)
+    runtime.run(one_completion(client))  # connexion ouverte une fois
+
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        runtime.run(one_completion(client))
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def client_creation(requests: int):
+    from openai import AsyncOpenAI
+
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        AsyncOpenAI(api_key="sk-bench", base_url="http://127.0.0.1:1")
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def event_loop_creation(requests: int):
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        asyncio.run(asyncio.sleep(0))
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(name: str, timings) -> None:
+    timings = sorted(timings)
+    print(
+        f"{name:<28} médiane {statistics.median(timings) * 1000:7.2f} ms · "
+        f"p95 {timings[int(len(timings) * 0.95)] * 1000:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence simulée du serveur (s)")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(latency=args.latency).start()
+    try:
+        before = per_click_event_loop(server.base_url, args.requests)
+        after = shared_runtime(server.base_url, args.requests)
+    finally:
+        server.stop()
+
+    report("asyncio.run par requête", before)
+    report("boucle + client partagés", after)
+    saving = statistics.median(before) - statistics.median(after)
+    print(f"Gain médian par requête: {saving * 1000:.2f} ms")
+    print(
+        f"  dont création du client {statistics.median(client_creation(20)) * 1000:.2f} ms, "
+        f"asyncio.run() {statistics.median(event_loop_creation(args.requests)) * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
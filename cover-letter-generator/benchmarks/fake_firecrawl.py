@@ -0,0 +1,105 @@
+# benchmarks/fake_firecrawl.py - Serveur local imitant l'API de scraping de Firecrawl
+import json
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class FakeFirecrawlHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(body or b"{}")
+        server = self.server
+        if not self.path.rstrip("/").endswith("/scrape"):
+            self._send_json({"success": False, "error": "not found"}, status=404)
+            return
+        with server.lock:
+            server.calls += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and server.random.random() < server.error_rate:
+            self._send_json({"success": False, "error": "injected error"}, status=500)
+            return
+
+        url = request.get("url", "")
+        content = server.pages.get(url)
+        if content is None:
+            self._send_json({"success": False, "error": f"unknown url {url}"}, status=404)
+            return
+        # Champs des versions v0 (content) et v1 (markdown) de l'API
+        self._send_json({
+            "success": True,
+            "data": {"content": content, "markdown": content, "metadata": {"sourceURL": url}},
+        })
+
+    def _send_json(self, payload, status: int = 200) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeFirecrawlServer(ThreadingHTTPServer):
+    """
+    Serveur de test: renvoie le texte enregistré pour chaque URL (`pages`),
+    après `latency` secondes; une proportion `error_rate` des requêtes échoue.
+    `calls` compte les appels reçus.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, pages: Dict[str, str], port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        super().__init__(("127.0.0.1", port), FakeFirecrawlHandler)
+        self.pages = pages
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeFirecrawlServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class SimpleScrapeClient:
+    """
+    Client synchrone minimal avec la méthode scrape_url de FirecrawlApp, utilisé
+    quand le paquet firecrawl n'est pas installé.
+    """
+
+    def __init__(self, api_url: str, api_key: str = "fc-bench", timeout: float = 30.0):
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def scrape_url(self, url: str) -> dict:
+        request = urllib.request.Request(
+            f"{self.api_url}/v0/scrape",
+            data=json.dumps({"url": url}).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            payload = json.loads(response.read())
+        return payload["data"]
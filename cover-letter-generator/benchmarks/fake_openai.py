@@ -0,0 +1,181 @@
+# benchmarks/fake_openai.py - Serveur local imitant l'API chat.completions d'OpenAI
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_LETTER = (
+    "Madame, Monsieur,\n\n"
+    "Votre offre a retenu toute mon attention. Mon expérience correspond à vos besoins.\n\n"
+    "Je serais ravi d'échanger avec vous lors d'un entretien.\n\n"
+    "Je vous prie d'agréer mes salutations distinguées."
+)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 pour que les connexions keep-alive soient réutilisées
+    protocol_version = "HTTP/1.1"
+    # En-têtes et corps partent en deux écritures: sans TCP_NODELAY, l'ACK retardé du
+    # client ajoute ~40 ms à chaque réponse sur une connexion réutilisée
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "gpt-4", "object": "model", "owned_by": "fake"}]})
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(body or b"{}")
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and server.random.random() < server.error_rate:
+            self._send_error(server.error_status, server.retry_after)
+            return
+        if server.stall_rate and server.random.random() < server.stall_rate:
+            # Connexion bloquée: rien n'est envoyé avant `stall_time`
+            time.sleep(server.stall_time)
+
+        words = server.letter.split(" ")
+        usage = server.usage(request, body, len(words))
+        if request.get("stream"):
+            self._send_stream(request, words, usage)
+            return
+
+        if server.token_rate:
+            time.sleep(len(words) / server.token_rate)
+        self._send_json({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": server.letter},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _send_stream(self, request, words, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, word in enumerate(words):
+            delta = word if index == 0 else " " + word
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4"),
+                "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            if self.server.token_rate:
+                time.sleep(1.0 / self.server.token_rate)
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4"),
+                "choices": [],
+                "usage": usage,
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_error(self, status: int, retry_after: Optional[float]) -> None:
+        data = json.dumps({"error": {"message": "injected error", "type": "fake_error"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if retry_after is not None:
+            self.send_header("Retry-After", f"{retry_after:g}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload, status: int = 200) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """
+    Serveur de test: `latency` (s) avant la réponse, `token_rate` (tokens/s) pendant.
+
+    Cache de prompt simulé: les messages qui précèdent le dernier forment le préfixe;
+    s'il a déjà été vu et dépasse `prompt_cache_min_tokens` (~4 caractères par token),
+    ses tokens sont comptés dans usage.prompt_tokens_details.cached_tokens.
+
+    Injection de pannes: une proportion `error_rate` des requêtes reçoit une erreur
+    `error_status` (avec Retry-After si `retry_after` est donné), et une proportion
+    `stall_rate` reste bloquée `stall_time` secondes avant de répondre.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, token_rate: float = 0.0,
+                 letter: str = DEFAULT_LETTER, error_rate: float = 0.0, error_status: int = 429,
+                 retry_after: Optional[float] = None, stall_rate: float = 0.0, stall_time: float = 30.0,
+                 seed: Optional[int] = None, prompt_cache_min_tokens: int = 1024):
+        super().__init__(("127.0.0.1", port), FakeOpenAIHandler)
+        self.latency = latency
+        self.token_rate = token_rate
+        self.letter = letter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.stall_rate = stall_rate
+        self.stall_time = stall_time
+        self.random = random.Random(seed)
+        self.prompt_cache_min_tokens = prompt_cache_min_tokens
+        self._seen_prefixes = set()
+        self._prefix_lock = threading.Lock()
+
+    def usage(self, request: dict, body: bytes, completion_tokens: int) -> dict:
+        prompt_tokens = len(body) // 4
+        prefix = json.dumps(request.get("messages", [])[:-1], ensure_ascii=False)
+        prefix_tokens = len(prefix) // 4
+        with self._prefix_lock:
+            seen = prefix in self._seen_prefixes
+            self._seen_prefixes.add(prefix)
+        cached = prefix_tokens if seen and prefix_tokens >= self.prompt_cache_min_tokens else 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,157 @@
+# benchmarks/sample_documents.py - Corpus de CV et d'offres pour les benchmarks
+#
+# Les CV sont stockés en texte (benchmarks/corpus/) et convertis à la volée en
+# PDF et DOCX, sans dépendance: les benchmarks couvrent ainsi les trois formats
+# acceptés par l'application sans fichiers binaires dans le dépôt.
+import io
+import os
+import zipfile
+from typing import Dict, List, NamedTuple
+from xml.sax.saxutils import escape
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "txt": "text/plain",
+}
+
+
+class SampleFile:
+    """
+    Fichier en mémoire avec l'interface d'un upload Streamlit (name, type, size, getvalue()).
+    """
+
+    def __init__(self, name: str, data: bytes, content_type: str):
+        self.name = name
+        self.type = content_type
+        self.size = len(data)
+        self._data = data
+
+    def getvalue(self) -> bytes:
+        return self._data
+
+
+class Posting(NamedTuple):
+    name: str
+    text: str
+
+
+def _escape_pdf(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """
+    Construit un PDF texte (police standard Helvetica), une liste de lignes par page.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # arbre des pages, rempli une fois les numéros des pages connus
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        content = "BT /F1 10 Tf 12 TL 40 800 Td\n" + "".join(
+            f"({_escape_pdf(line)}) Tj T*\n" for line in lines
+        ) + "ET"
+        data = content.encode("cp1252", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(pages))
+
+    output = [b"%PDF-1.4\n"]
+    offsets = []
+    position = len(output[0])
+    for index, body in enumerate(objects, 1):
+        chunk = b"%d 0 obj\n" % index + body + b"\nendobj\n"
+        offsets.append(position)
+        output.append(chunk)
+        position += len(chunk)
+    output.append(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    output += [b"%010d 00000 n \n" % offset for offset in offsets]
+    output.append(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, position)
+    )
+    return b"".join(output)
+
+
+def text_to_pdf(text: str, lines_per_page: int = 60) -> bytes:
+    lines = text.splitlines() or [""]
+    return build_pdf([lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)])
+
+
+def text_to_docx(text: str) -> bytes:
+    """
+    Construit un document Word minimal (un paragraphe par ligne).
+    """
+    paragraphs = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>'
+        for line in text.splitlines()
+    )
+    parts = {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/>'
+            '</Relationships>'
+        ),
+        "word/document.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{paragraphs}</w:body></w:document>'
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in parts.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _read_texts(folder: str) -> Dict[str, str]:
+    directory = os.path.join(CORPUS_DIR, folder)
+    texts = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                texts[os.path.splitext(filename)[0]] = f.read()
+    return texts
+
+
+def load_resumes(formats=("txt", "pdf", "docx")) -> List[SampleFile]:
+    """
+    Chaque CV du corpus dans chacun des formats demandés.
+    """
+    converters = {
+        "txt": lambda text: text.encode("utf-8"),
+        "pdf": text_to_pdf,
+        "docx": text_to_docx,
+    }
+    resumes = []
+    for name, text in _read_texts("resumes").items():
+        for extension in formats:
+            resumes.append(SampleFile(f"{name}.{extension}", converters[extension](text), MIME_TYPES[extension]))
+    return resumes
+
+
+def load_postings() -> List[Posting]:
+    return [Posting(name, text) for name, text in _read_texts("postings").items()]
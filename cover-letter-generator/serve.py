@@ -0,0 +1,57 @@
+# serve.py - Service HTTP de génération (voir src/service.py)
+#
+# Exemple:
+#   python serve.py --port 8000 --workers 4
+#   curl -F resume=@mon_cv.pdf -F job=https://exemple.com/offre \
+#        -F 'params={"tone": "Confiant", "company_name": "Acme"}' http://localhost:8000/generate
+#
+# Chaque worker est un processus avec sa propre boucle, ses clients et ses
+# limites d'admission; un répartiteur de charge peut viser plusieurs machines.
+# Avec plusieurs workers, /metrics n'est pas exposé (compteurs propres à chaque
+# processus): pour des métriques, un processus par port avec --workers 1.
+import argparse
+import os
+import sys
+
+from src.service import DRAIN_TIMEOUT
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP de génération de lettres de motivation.")
+    parser.add_argument("--host", default=os.getenv('COVER_LETTER_SERVICE_HOST', "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv('COVER_LETTER_SERVICE_PORT', '8000')))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv('COVER_LETTER_SERVICE_WORKERS', '1')),
+        help="Processus workers (un par cœur en général)"
+    )
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    import uvicorn
+
+    # Lu par create_default_app dans chaque worker
+    os.environ['COVER_LETTER_SERVICE_WORKERS'] = str(args.workers)
+    if args.workers > 1:
+        print(
+            f"ℹ️ {args.workers} workers: /metrics désactivé (un processus par port avec --workers 1 pour les métriques)",
+            file=sys.stderr
+        )
+
+    uvicorn.run(
+        "src.service:create_default_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        # Les requêtes en cours terminent avant l'arrêt (SIGTERM), dans la limite du drain
+        timeout_graceful_shutdown=DRAIN_TIMEOUT or None
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+# src/batch.py - Génération en lot: un CV, plusieurs offres d'emploi
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from .core import (
+    extract_job_content, extract_resume_content, process_cover_letter_request, request_deadline
+)
+from .dedupe import DEFAULT_THRESHOLD, NearDuplicateIndex
+
+
+def load_jobs(path: str) -> List[Dict[str, Any]]:
+    """
+    Charge la liste des offres à traiter.
+
+    - Fichier .jsonl: un objet par ligne avec "job" (URL ou texte), et
+      optionnellement "id" et des options de personnalisation (company_name, tone...)
+    - Autre fichier: une offre par ligne non vide (URL ou texte sur une ligne)
+    """
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                job = json.loads(line)
+                if 'job' not in job:
+                    raise ValueError(f"Entrée sans champ 'job': {line[:80]}")
+            else:
+                job = {'job': line}
+            job.setdefault('id', hashlib.sha1(job['job'].encode("utf-8")).hexdigest()[:12])
+            jobs.append(job)
+    return jobs
+
+
+def load_completed_ids(output_path: str) -> Set[str]:
+    """
+    Renvoie les identifiants déjà générés avec succès dans un fichier de sortie existant.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Dernière ligne tronquée après un crash
+                continue
+            if record.get('status') == "ok":
+                completed.add(record['id'])
+    return completed
+
+
+class BatchProgress:
+    """
+    Affiche l'avancement d'un lot (débit et temps restant estimé) sur stderr.
+    """
+
+    def __init__(self, total: int, stream=None):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self.stream = stream or sys.stderr
+
+    def update(self, ok: bool) -> None:
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - self.done) / rate if rate > 0 else 0.0
+        self.stream.write(
+            f"\r[{self.done}/{self.total}] {rate * 60:.1f} lettres/min · "
+            f"erreurs: {self.failed} · reste ~{remaining:.0f}s "
+        )
+        if self.done == self.total:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+def reuse_key(options: Dict[str, Any], substitute_company: bool = False) -> str:
+    """
+    Options de génération qui doivent être identiques pour qu'une offre quasi
+    identique reprenne la lettre d'une autre. Avec `substitute_company`, le nom de
+    l'entreprise peut différer (il est remplacé dans la lettre reprise).
+    """
+    shared = dict(options)
+    if substitute_company:
+        shared['company_name'] = bool(options.get('company_name'))
+    return json.dumps(shared, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def substitute_company_name(letter: str, original: str, replacement: str) -> str:
+    if not original or not replacement or original == replacement:
+        return letter
+    return letter.replace(original, replacement)
+
+
+async def run_batch(
+    resume_file,
+    jobs: List[Dict[str, Any]],
+    output_path: str,
+    openai_client,
+    firecrawl_client,
+    concurrency: int = 4,
+    progress: Optional[BatchProgress] = None,
+    dedupe: bool = True,
+    dedupe_threshold: float = DEFAULT_THRESHOLD,
+    substitute_company: bool = False,
+    **options
+) -> Dict[str, int]:
+    """
+    Génère une lettre par offre avec au plus `concurrency` générations simultanées.
+
+    Le CV est extrait une seule fois. Chaque résultat est ajouté au fichier JSONL
+    dès qu'il est prêt; les offres déjà présentes avec succès sont ignorées, ce
+    qui permet de relancer un lot interrompu.
+
+    Avec `dedupe`, une offre quasi identique à une offre déjà traitée du lot
+    (similarité >= `dedupe_threshold`, voir src/dedupe.py) et avec les mêmes
+    options reprend sa lettre au lieu d'appeler le modèle ('duplicate_of' dans
+    le résultat). `substitute_company` autorise la reprise entre offres dont
+    seul company_name diffère, en remplaçant le nom dans la lettre.
+    """
+    completed = load_completed_ids(output_path)
+    pending = [job for job in jobs if job['id'] not in completed]
+    progress = progress or BatchProgress(len(pending))
+
+    resume_content = await extract_resume_content(resume_file)
+    semaphore = asyncio.Semaphore(concurrency)
+    summary = {'skipped': len(jobs) - len(pending), 'ok': 0, 'error': 0, 'reused': 0}
+
+    # Une extraction par offre distincte (même URL ou même texte)
+    descriptions: Dict[str, "asyncio.Future[str]"] = {}
+    # Un index par jeu d'options, et la lettre attendue de chaque offre de référence
+    indexes: Dict[str, NearDuplicateIndex] = {}
+    letters: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+    companies: Dict[str, str] = {}
+
+    async def describe(job_content: str, timeout: Optional[float]) -> str:
+        # Même délai que l'étape d'extraction de process_cover_letter_request
+        task = descriptions.get(job_content)
+        if task is None:
+            task = descriptions[job_content] = asyncio.ensure_future(request_deadline(timeout).run(
+                extract_job_content(job_content, firecrawl_client), "extraction"
+            ))
+        return await asyncio.shield(task)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+
+        async def generate(job_description: str, job_options: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await process_cover_letter_request(
+                    resume_file=resume_file,
+                    job_content=job_description,
+                    openai_client=openai_client,
+                    firecrawl_client=firecrawl_client,
+                    resume_content=resume_content,
+                    **job_options
+                )
+
+        async def process(job: Dict[str, Any]) -> None:
+            job_options = dict(options)
+            job_options.update({k: v for k, v in job.items() if k not in ('id', 'job')})
+            record = {'id': job['id'], 'job': job['job']}
+            started = time.perf_counter()
+            leader: Optional["asyncio.Future[Optional[str]]"] = None
+            try:
+                async with semaphore:
+                    job_description = await describe(job['job'], job_options.get('timeout'))
+
+                match = None
+                if dedupe:
+                    key = reuse_key(job_options, substitute_company)
+                    index = indexes.setdefault(key, NearDuplicateIndex(dedupe_threshold))
+                    match = index.match_or_add(job['id'], job_description)
+                    if match is None:
+                        leader = letters[job['id']] = asyncio.get_running_loop().create_future()
+                        companies[job['id']] = job_options.get('company_name', "")
+
+                # Lettre de l'offre de référence (None si sa génération a échoué)
+                reused = await asyncio.shield(letters[match.key]) if match is not None else None
+                if reused is not None:
+                    record['cover_letter'] = substitute_company_name(
+                        reused, companies[match.key], job_options.get('company_name', "")
+                    )
+                    record['duplicate_of'] = match.key
+                    record['similarity'] = round(match.similarity, 3)
+                    summary['reused'] += 1
+                else:
+                    record['cover_letter'] = await generate(job_description, job_options)
+                record['status'] = "ok"
+            except Exception as e:
+                record['status'] = "error"
+                record['error'] = f"{type(e).__name__}: {e}"
+            finally:
+                if leader is not None and not leader.done():
+                    leader.set_result(record.get('cover_letter'))
+            record['elapsed'] = round(time.perf_counter() - started, 3)
+
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            summary[record['status']] += 1
+            progress.update(record['status'] == "ok")
+
+        await asyncio.gather(*(process(job) for job in pending))
+
+    return summary
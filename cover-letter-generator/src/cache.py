@@ -0,0 +1,518 @@
+# src/cache.py - Caches persistants (mémoire + SQLite)
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Paramètres de suivi retirés des URLs avant de calculer la clé de cache
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "trk", "refid")
+
+
+def default_cache_dir() -> str:
+    """
+    Répertoire des caches sur disque (surchargeable via COVER_LETTER_CACHE_DIR).
+    """
+    return os.getenv(
+        'COVER_LETTER_CACHE_DIR',
+        os.path.join(os.path.expanduser("~"), ".cache", "cover-letter-generator")
+    )
+
+
+def cache_enabled(name: str) -> bool:
+    """
+    Indique si un cache est activé (désactivable via COVER_LETTER_<NAME>_CACHE=0).
+    """
+    value = os.getenv(f"COVER_LETTER_{name.upper()}_CACHE", "1")
+    return value.lower() not in ("0", "false", "no", "off")
+
+
+class SQLiteStore:
+    """
+    Table clé/valeur SQLite avec éviction par taille totale et par âge.
+    """
+
+    def __init__(self, path: str, table: str = "entries"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            return row[0]
+
+    def get_with_age(self, key: str) -> Optional[tuple]:
+        """
+        Renvoie (valeur, date de création) ou None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            return row[0], row[1]
+
+    def set(self, key: str, value: bytes, created_at: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), created_at or now, now)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def evict(self, max_bytes: Optional[int] = None, max_age: Optional[float] = None) -> int:
+        """
+        Supprime les entrées trop anciennes puis les moins récemment utilisées
+        jusqu'à repasser sous max_bytes. Renvoie le nombre d'entrées supprimées.
+        """
+        removed = 0
+        with self._lock:
+            if max_age is not None:
+                cursor = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - max_age,)
+                )
+                removed += cursor.rowcount
+            if max_bytes is not None:
+                total = self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM {self.table}"
+                ).fetchone()[0]
+                if total > max_bytes:
+                    rows = self._conn.execute(
+                        f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC"
+                    ).fetchall()
+                    for key, size in rows:
+                        if total <= max_bytes:
+                            break
+                        self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                        total -= size
+                        removed += 1
+        return removed
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResumeCache:
+    """
+    Cache du texte extrait des CV, adressé par le contenu du fichier.
+
+    Un LRU en mémoire sert les accès répétés de la session; le stockage SQLite
+    conserve les extractions entre les redémarrages.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_bytes: int = 8 * 1024 * 1024,
+        max_disk_bytes: int = 64 * 1024 * 1024
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._store = SQLiteStore(path or os.path.join(default_cache_dir(), "resumes.sqlite3"))
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(data: bytes, content_type: str, parser_version: str) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{parser_version}:{content_type}:{digest}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return text
+
+        value = self._store.get(key)
+        if value is None:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+
+        text = value.decode("utf-8")
+        with self._lock:
+            self._stats['disk_hits'] += 1
+            self._remember(key, text)
+        return text
+
+    def set(self, key: str, text: str) -> None:
+        with self._lock:
+            self._remember(key, text)
+        self._store.set(key, text.encode("utf-8"))
+        evicted = self._store.evict(max_bytes=self.max_disk_bytes)
+        if evicted:
+            with self._lock:
+                self._stats['evictions'] += evicted
+
+    def _remember(self, key: str, text: str) -> None:
+        # Appelé sous verrou
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        self._memory[key] = text
+        self._memory_size += len(text)
+        while self._memory_size > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        stats['disk_bytes'] = self._store.total_size()
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        self._store.clear()
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalise une URL d'offre pour que les variantes d'un même lien partagent
+    une entrée de cache (casse de l'hôte, port par défaut, fragment, paramètres
+    de suivi, ordre des paramètres, slash final).
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class ScrapeCache:
+    """
+    Cache des offres d'emploi scrapées, avec durée de vie et revalidation.
+
+    - Une entrée plus récente que `ttl` est servie directement.
+    - Entre `ttl` et `ttl + stale_ttl`, l'entrée périmée est servie immédiatement
+      et un nouveau scraping est lancé en arrière-plan (stale-while-revalidate).
+    - Au-delà, le scraping est attendu.
+    Les requêtes simultanées pour une même URL partagent un seul scraping (par boucle
+    asyncio: une tâche ne peut être attendue que depuis sa boucle).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 6 * 3600,
+        stale_ttl: float = 24 * 3600,
+        stale_while_revalidate: bool = True,
+        max_disk_bytes: int = 64 * 1024 * 1024
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_disk_bytes = max_disk_bytes
+        self._store = SQLiteStore(path or os.path.join(default_cache_dir(), "scrapes.sqlite3"))
+        # Scrapings en cours, par boucle (chaque dictionnaire n'est utilisé que par le thread de sa boucle)
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task[str]]]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'revalidations': 0}
+
+    def lookup(self, url: str) -> Optional[Tuple[str, float]]:
+        """
+        Renvoie (contenu, âge en secondes) pour une URL, sans déclencher de scraping.
+        """
+        entry = self._store.get_with_age(normalize_url(url))
+        if entry is None:
+            return None
+        value, fetched_at = entry
+        return value.decode("utf-8"), time.time() - fetched_at
+
+    async def get_or_fetch(self, url: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        """
+        Renvoie le contenu de l'URL depuis le cache ou via `fetch`.
+        """
+        key = normalize_url(url)
+        entry = self.lookup(key)
+        inflight = self._inflight_for_loop()
+
+        if entry is not None:
+            content, age = entry
+            if age < self.ttl:
+                self._count('hits')
+                return content
+            if self.stale_while_revalidate and age < self.ttl + self.stale_ttl:
+                self._count('stale_hits')
+                if key not in inflight:
+                    self._count('revalidations')
+                    task = self._start_fetch(inflight, key, fetch)
+                    task.add_done_callback(self._log_revalidation_error)
+                return content
+
+        if key in inflight:
+            self._count('coalesced')
+            return await asyncio.shield(inflight[key])
+
+        self._count('misses')
+        return await asyncio.shield(self._start_fetch(inflight, key, fetch))
+
+    def _inflight_for_loop(self) -> Dict[str, "asyncio.Task[str]"]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            inflight = self._inflight.get(loop)
+            if inflight is None:
+                inflight = self._inflight[loop] = {}
+            return inflight
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _start_fetch(
+        self,
+        inflight: Dict[str, "asyncio.Task[str]"],
+        key: str,
+        fetch: Callable[[], Awaitable[str]]
+    ) -> "asyncio.Task[str]":
+        async def run() -> str:
+            try:
+                content = await fetch()
+                if content:
+                    self._store.set(key, content.encode("utf-8"))
+                    self._store.evict(max_bytes=self.max_disk_bytes, max_age=self.ttl + self.stale_ttl)
+                return content
+            finally:
+                inflight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        inflight[key] = task
+        return task
+
+    @staticmethod
+    def _log_revalidation_error(task: "asyncio.Task[str]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Erreur lors de la revalidation du scraping: {str(task.exception())}")
+
+    def invalidate(self, url: str) -> None:
+        self._store.delete(normalize_url(url))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = (lookups - stats['misses']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+class GenerationCache:
+    """
+    Cache des lettres générées, indexé sur les entrées normalisées et les
+    paramètres de génération (options, modèle, température).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_disk_bytes: int = 32 * 1024 * 1024,
+        max_age: float = 7 * 24 * 3600
+    ):
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self._store = SQLiteStore(path or os.path.join(default_cache_dir(), "generations.sqlite3"))
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0}
+
+    @staticmethod
+    def make_key(
+        resume_content: str,
+        job_description: str,
+        generation_params: Dict[str, Any],
+        model: str,
+        temperature: float
+    ) -> str:
+        def normalize(text: str) -> str:
+            return re.sub(r"\s+", " ", text or "").strip()
+
+        payload = json.dumps(
+            {
+                'resume': normalize(resume_content),
+                'job': normalize(job_description),
+                'params': generation_params,
+                'model': model,
+                'temperature': temperature,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._store.get_with_age(key)
+        if entry is not None and time.time() - entry[1] > self.max_age:
+            self._store.delete(key)
+            entry = None
+        with self._lock:
+            self._stats['hits' if entry is not None else 'misses'] += 1
+        return entry[0].decode("utf-8") if entry is not None else None
+
+    def set(self, key: str, cover_letter: str) -> None:
+        self._store.set(key, cover_letter.encode("utf-8"))
+        self._store.evict(max_bytes=self.max_disk_bytes, max_age=self.max_age)
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._stats['bypassed'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['disk_bytes'] = self._store.total_size()
+        return stats
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+_resume_cache: Optional[ResumeCache] = None
+_resume_cache_lock = threading.Lock()
+
+
+def get_resume_cache() -> Optional[ResumeCache]:
+    """
+    Renvoie le cache de CV partagé, ou None s'il est désactivé.
+    """
+    global _resume_cache
+    if not cache_enabled("resume"):
+        return None
+    with _resume_cache_lock:
+        if _resume_cache is None:
+            _resume_cache = ResumeCache()
+        return _resume_cache
+
+
+def set_resume_cache(cache: Optional[ResumeCache]) -> None:
+    """
+    Remplace le cache de CV partagé (utile pour les tests et les scripts).
+    """
+    global _resume_cache
+    with _resume_cache_lock:
+        _resume_cache = cache
+
+
+_scrape_cache: Optional[ScrapeCache] = None
+_scrape_cache_lock = threading.Lock()
+
+
+def get_scrape_cache() -> Optional[ScrapeCache]:
+    """
+    Renvoie le cache de scraping partagé, ou None s'il est désactivé.
+
+    Durées configurables via COVER_LETTER_SCRAPE_TTL et COVER_LETTER_SCRAPE_STALE_TTL
+    (en secondes).
+    """
+    global _scrape_cache
+    if not cache_enabled("scrape"):
+        return None
+    with _scrape_cache_lock:
+        if _scrape_cache is None:
+            _scrape_cache = ScrapeCache(
+                ttl=float(os.getenv('COVER_LETTER_SCRAPE_TTL', 6 * 3600)),
+                stale_ttl=float(os.getenv('COVER_LETTER_SCRAPE_STALE_TTL', 24 * 3600))
+            )
+        return _scrape_cache
+
+
+def set_scrape_cache(cache: Optional[ScrapeCache]) -> None:
+    """
+    Remplace le cache de scraping partagé (par exemple par une instance
+    sur un fichier temporaire dans les tests).
+    """
+    global _scrape_cache
+    with _scrape_cache_lock:
+        _scrape_cache = cache
+
+
+_generation_cache: Optional[GenerationCache] = None
+_generation_cache_lock = threading.Lock()
+
+
+def get_generation_cache() -> Optional[GenerationCache]:
+    """
+    Renvoie le cache de lettres partagé, ou None s'il est désactivé
+    (COVER_LETTER_GENERATION_CACHE=0).
+    """
+    global _generation_cache
+    if not cache_enabled("generation"):
+        return None
+    with _generation_cache_lock:
+        if _generation_cache is None:
+            _generation_cache = GenerationCache()
+        return _generation_cache
+
+
+def set_generation_cache(cache: Optional[GenerationCache]) -> None:
+    global _generation_cache
+    with _generation_cache_lock:
+        _generation_cache = cache
@@ -0,0 +1,86 @@
+# src/clients.py - Création des clients API à partir de l'environnement
+import os
+from typing import Optional
+
+# Valeurs d'exemple du fichier .env, considérées comme absentes
+PLACEHOLDER_KEYS = ('sk-your-openai-key-here', 'fc-your-firecrawl-key-here')
+
+
+def get_api_key(name: str) -> Optional[str]:
+    """
+    Lit une clé API dans l'environnement, en ignorant les valeurs d'exemple.
+    """
+    value = os.getenv(name)
+    if not value or value in PLACEHOLDER_KEYS:
+        return None
+    return value
+
+
+def create_http_client(max_connections: int = 100, keepalive_expiry: float = 300.0):
+    """
+    Client HTTP asynchrone partagé par les appels au modèle: connexions gardées
+    ouvertes entre les requêtes, HTTP/2 si le paquet h2 est installé.
+
+    Le client doit être utilisé depuis une seule boucle d'événements
+    (voir src/runtime.py).
+    """
+    import httpx
+
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(600.0, connect=5.0)
+    )
+
+
+def create_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """
+    Crée un client AsyncOpenAI avec un pool de connexions persistant,
+    ou renvoie None si aucune clé n'est configurée.
+    """
+    api_key = api_key or get_api_key('OPENAI_API_KEY')
+    if not api_key:
+        return None
+    from openai import AsyncOpenAI
+    # Les reprises sont gérées par src/resilience.py (délai global, Retry-After)
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=create_http_client(),
+        max_retries=0
+    )
+
+
+async def warm_up_openai_client(openai_client) -> None:
+    """
+    Ouvre une connexion vers l'API à l'avance (requête gratuite sur la liste des
+    modèles) pour que la première génération ne paie pas la poignée de main TCP/TLS.
+    """
+    try:
+        await openai_client.models.list()
+    except Exception as e:
+        print(f"Préchauffage de la connexion OpenAI impossible: {str(e)}")
+
+
+def create_firecrawl_client(api_key: Optional[str] = None, api_url: Optional[str] = None):
+    """
+    Crée un client Firecrawl, ou renvoie None si aucune clé n'est configurée.
+    `api_url` permet de viser une autre instance (auto-hébergée, serveur de test).
+    """
+    api_key = api_key or get_api_key('FIRECRAWL_API_KEY')
+    if not api_key:
+        return None
+    from firecrawl import FirecrawlApp
+    if api_url:
+        return FirecrawlApp(api_key=api_key, api_url=api_url)
+    return FirecrawlApp(api_key=api_key)
@@ -1,9 +1,55 @@
 # src/core.py - Version mise à jour
 import asyncio
-from typing import Dict, Any, Optional, Union
-import tempfile
+import logging
+import time
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Union
 import os
 
+from .cache import (
+    GenerationCache, ResumeCache, get_generation_cache, get_resume_cache, get_scrape_cache
+)
+from . import events, telemetry
+from .events import EventCallback, ProgressReporter
+from .extractors import fetch_posting
+from .letter import build_paragraph_prompt, clean_paragraph, split_paragraphs
+from .params import InvalidInput
+from .pdf import PdfExtraction, extract_pdf_text
+from .ranking import select_relevant_content
+from .resilience import (
+    Deadline, DeadlineExceeded, RetryPolicy, call_with_retries, default_retry_policy,
+    hedge_delay, hedged, is_retryable
+)
+from .routing import ModelTier, cached_tokens, get_router
+from .tokens import count_tokens, fit_to_budget
+from .workers import run_in_worker
+
+# À incrémenter à chaque changement de parse_pdf_bytes / parse_word_bytes
+# pour invalider les extractions mises en cache
+RESUME_PARSER_VERSION = "2"
+
+PDF_UNAVAILABLE = "Contenu PDF non disponible - PyPDF2 requis"
+WORD_UNAVAILABLE = "Contenu Word non disponible - python-docx requis"
+
+# Modèle de référence pour le comptage des tokens; le modèle appelé est choisi
+# par src/routing.py selon la demande
+MODEL = "gpt-4"
+TEMPERATURE = 0.7
+SYSTEM_PROMPT = "Vous êtes un expert en rédaction de lettres de motivation."
+
+# Budget de tokens pour le prompt (contexte du modèle moins la réponse et une marge)
+MAX_INPUT_TOKENS = int(os.getenv('COVER_LETTER_MAX_INPUT_TOKENS', '6000'))
+
+# Taille (tokens) au-delà de laquelle le CV est filtré par pertinence (0 = désactivé)
+RESUME_SELECTION_TOKENS = int(os.getenv('COVER_LETTER_RESUME_SELECTION_TOKENS', '1500'))
+
+# Réponse maximale pour la réécriture d'un paragraphe
+PARAGRAPH_MAX_TOKENS = 300
+
+# Délai global d'une requête, propagé à toutes les étapes (0 = aucun)
+REQUEST_TIMEOUT = float(os.getenv('COVER_LETTER_REQUEST_TIMEOUT', '180'))
+
+logger = logging.getLogger(__name__)
+
 async def process_cover_letter_request(
     resume_file, 
     job_content, 
@@ -22,6 +68,11 @@ async def process_cover_letter_request(
     hiring_manager: str = "",
     key_skills: str = "",
     achievements: str = "",
+    resume_content: Optional[str] = None,
+    regenerate: bool = False,
+    draft: bool = False,
+    on_event: Optional[EventCallback] = None,
+    timeout: Optional[float] = None,
     **kwargs  # Pour capturer d'autres paramètres non prévus
 ) -> str:
     """
@@ -44,39 +95,52 @@ async def process_cover_letter_request(
         hiring_manager: Nom du recruteur
         key_skills: Compétences clés à souligner
         achievements: Réalisations importantes
+        resume_content: Texte du CV déjà extrait (évite de reparser resume_file,
+                        par exemple pour un même CV et plusieurs offres)
+        regenerate: Ignorer le cache et générer une nouvelle lettre
+        draft: Brouillon, rédigé par le modèle rapide (voir src/routing.py)
+        on_event: Callback appelé à chaque étape (voir src/events.py)
+        timeout: Délai global en secondes (REQUEST_TIMEOUT par défaut)
         
     Returns:
         str: Lettre de motivation générée
     """
     
+    progress = ProgressReporter(on_event)
+    deadline = request_deadline(timeout)
     try:
-        # Étape 1: Traitement du CV
-        resume_content = await extract_resume_content(resume_file)
-        
-        # Étape 2: Traitement de l'offre d'emploi
-        job_description = await extract_job_content(job_content, firecrawl_client)
+        # Étapes 1 et 2: Traitement du CV et de l'offre d'emploi en parallèle
+        resume_content, job_description = await deadline.run(
+            extract_inputs(resume_file, job_content, firecrawl_client, resume_content, progress),
+            "extraction"
+        )
         
         # Étape 3: Génération de la lettre avec les paramètres personnalisés
         cover_letter = await generate_personalized_cover_letter(
             resume_content=resume_content,
             job_description=job_description,
             openai_client=openai_client,
-            generation_params={
-                'tone': tone,
-                'length': length,
-                'language': language,
-                'template': template,
-                'include_salary': include_salary,
-                'include_availability': include_availability,
-                'emphasize_skills': emphasize_skills,
-                'company_name': company_name,
-                'position_title': position_title,
-                'hiring_manager': hiring_manager,
-                'key_skills': key_skills,
-                'achievements': achievements
-            }
+            generation_params=build_generation_params(
+                tone=tone,
+                length=length,
+                language=language,
+                template=template,
+                include_salary=include_salary,
+                include_availability=include_availability,
+                emphasize_skills=emphasize_skills,
+                company_name=company_name,
+                position_title=position_title,
+                hiring_manager=hiring_manager,
+                key_skills=key_skills,
+                achievements=achievements
+            ),
+            regenerate=regenerate,
+            draft=draft,
+            progress=progress,
+            deadline=deadline
         )
         
+        await progress.emit(events.DONE)
         return cover_letter
         
     except Exception as e:
@@ -84,41 +148,350 @@ async def process_cover_letter_request(
         raise e
 
 
+async def stream_cover_letter_request(
+    resume_file,
+    job_content,
+    openai_client,
+    firecrawl_client,
+    stats: Optional[Dict[str, Any]] = None,
+    on_event: Optional[EventCallback] = None,
+    timeout: Optional[float] = None,
+    **options
+) -> AsyncIterator[str]:
+    """
+    Variante de process_cover_letter_request qui renvoie la lettre au fil de la génération.
+    
+    Args:
+        stats: Dictionnaire optionnel complété avec les temps de la requête
+               (time_to_first_token, total_time, en secondes) et le modèle utilisé
+        on_event: Callback appelé à chaque étape (voir src/events.py)
+        timeout: Délai global en secondes (REQUEST_TIMEOUT par défaut)
+        **options: Mêmes paramètres de personnalisation que process_cover_letter_request
+        
+    Yields:
+        str: Fragments successifs de la lettre
+    """
+    progress = ProgressReporter(on_event)
+    deadline = request_deadline(timeout)
+    try:
+        resume_content, job_description = await deadline.run(
+            extract_inputs(resume_file, job_content, firecrawl_client, options.pop('resume_content', None), progress),
+            "extraction"
+        )
+        
+        async for delta in stream_personalized_cover_letter(
+            resume_content=resume_content,
+            job_description=job_description,
+            openai_client=openai_client,
+            generation_params=build_generation_params(**options),
+            stats=stats,
+            regenerate=options.get('regenerate', False),
+            draft=options.get('draft', False),
+            progress=progress,
+            deadline=deadline
+        ):
+            yield delta
+        
+        await progress.emit(events.DONE)
+            
+    except Exception as e:
+        print(f"Erreur dans stream_cover_letter_request: {str(e)}")
+        raise e
+
+
+async def process_cover_letter_variants(
+    resume_file,
+    job_content,
+    openai_client,
+    firecrawl_client,
+    variants: List[Dict[str, Any]],
+    max_concurrency: int = 3,
+    regenerate: bool = False,
+    draft: bool = False,
+    on_event: Optional[EventCallback] = None,
+    timeout: Optional[float] = None,
+    **options
+) -> List[Dict[str, Any]]:
+    """
+    Génère plusieurs versions d'une lettre (tons, templates, longueurs) en une requête.
+    
+    Le CV et l'offre sont extraits une seule fois, puis les générations sont lancées
+    en parallèle (au plus `max_concurrency` à la fois).
+    
+    Args:
+        variants: Liste d'options à faire varier, par exemple
+                  [{'tone': 'Professionnel'}, {'tone': 'Enthousiaste', 'template': 'Moderne'}]
+        **options: Options communes à toutes les variantes (voir process_cover_letter_request)
+        
+    Returns:
+        List[Dict]: Pour chaque variante, ses options ('tone', 'template', 'length')
+                    et 'cover_letter', ou 'error' si sa génération a échoué
+    """
+    progress = ProgressReporter(on_event)
+    deadline = request_deadline(timeout)
+    try:
+        resume_content, job_description = await deadline.run(
+            extract_inputs(resume_file, job_content, firecrawl_client, options.pop('resume_content', None), progress),
+            "extraction"
+        )
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def generate_variant(variant: Dict[str, Any]) -> Dict[str, Any]:
+            generation_params = build_generation_params(**{**options, **variant})
+            result = {key: generation_params[key] for key in ('tone', 'template', 'length')}
+            async with semaphore:
+                try:
+                    result['cover_letter'] = await generate_personalized_cover_letter(
+                        resume_content=resume_content,
+                        job_description=job_description,
+                        openai_client=openai_client,
+                        generation_params=generation_params,
+                        regenerate=regenerate,
+                        draft=draft,
+                        deadline=deadline
+                    )
+                except Exception as e:
+                    result['error'] = str(e)
+            await progress.emit(events.VARIANT_DONE, variant=result)
+            return result
+        
+        results = await asyncio.gather(*(generate_variant(variant) for variant in variants))
+        await progress.emit(events.DONE)
+        return list(results)
+        
+    except Exception as e:
+        print(f"Erreur dans process_cover_letter_variants: {str(e)}")
+        raise e
+
+
+async def regenerate_paragraph(
+    letter: str,
+    index: int,
+    openai_client,
+    generation_params: Optional[Dict[str, Any]] = None,
+    instructions: str = "",
+    timeout: Optional[float] = None
+) -> str:
+    """
+    Réécrit un seul paragraphe de la lettre, avec le reste de la lettre comme contexte.
+    
+    Ni le CV ni l'offre ne sont réanalysés: seule la lettre est envoyée, et la
+    réponse est limitée à PARAGRAPH_MAX_TOKENS, sur le modèle rapide.
+    
+    Args:
+        letter: Lettre complète
+        index: Position du paragraphe à réécrire (voir src/letter.py, split_paragraphs)
+        generation_params: Options de la lettre (langue, ton, entreprise...)
+        instructions: Consignes de l'utilisateur pour ce paragraphe
+        timeout: Délai global en secondes (REQUEST_TIMEOUT par défaut)
+        
+    Returns:
+        str: Nouveau paragraphe (voir replace_paragraph pour l'insérer)
+    """
+    try:
+        paragraphs = split_paragraphs(letter)
+        if not 0 <= index < len(paragraphs):
+            raise IndexError(f"Paragraphe {index} inexistant (la lettre en compte {len(paragraphs)})")
+        
+        prompt = build_paragraph_prompt(paragraphs, index, generation_params, instructions)
+        candidates = [
+            tier._replace(max_tokens=min(tier.max_tokens, PARAGRAPH_MAX_TOKENS))
+            for tier in get_router().route(generation_params or {}, draft=True)
+        ]
+        
+        started = time.perf_counter()
+        tier, response = await _call_with_fallback(
+            candidates,
+            lambda tier: _create_completion(openai_client, build_messages(prompt), tier),
+            request_deadline(timeout),
+            "Réécriture de paragraphe"
+        )
+        logger.info("Paragraphe %d réécrit en %.2fs (%s)", index + 1, time.perf_counter() - started, tier.model)
+        paragraph = clean_paragraph(response.choices[0].message.content or "")
+        if not paragraph:
+            raise ValueError("Réponse vide du modèle pour le paragraphe")
+        return paragraph
+        
+    except Exception as e:
+        print(f"Erreur dans regenerate_paragraph: {str(e)}")
+        raise e
+
+
+def request_deadline(timeout: Optional[float] = None) -> Deadline:
+    """
+    Échéance d'une requête: `timeout` s'il est donné, sinon REQUEST_TIMEOUT.
+    """
+    timeout = timeout if timeout is not None else REQUEST_TIMEOUT
+    return Deadline(timeout or None)
+
+
+async def extract_inputs(
+    resume_file,
+    job_content,
+    firecrawl_client,
+    resume_content: Optional[str] = None,
+    progress: Optional[ProgressReporter] = None
+) -> Tuple[str, str]:
+    """
+    Extrait le CV et l'offre d'emploi en parallèle.
+    
+    Si le texte du CV est déjà connu, seule l'offre est extraite.
+    """
+    progress = progress or ProgressReporter()
+    job_stage = progress.track(events.POSTING_FETCHED, extract_job_content(job_content, firecrawl_client))
+    if resume_content is not None:
+        await progress.emit(events.RESUME_PARSED, duration=0.0, cached=True)
+        return resume_content, await job_stage
+    return await run_concurrently(
+        progress.track(events.RESUME_PARSED, extract_resume_content(resume_file)),
+        job_stage
+    )
+
+
+def build_generation_params(
+    tone: str = "Professionnel",
+    length: str = "Moyenne (350-400 mots)",
+    language: str = "Français",
+    template: str = "Classique",
+    include_salary: bool = False,
+    include_availability: bool = True,
+    emphasize_skills: bool = True,
+    company_name: str = "",
+    position_title: str = "",
+    hiring_manager: str = "",
+    key_skills: str = "",
+    achievements: str = "",
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    Regroupe les options de personnalisation dans le dictionnaire attendu par le prompt.
+    """
+    return {
+        'tone': tone,
+        'length': length,
+        'language': language,
+        'template': template,
+        'include_salary': include_salary,
+        'include_availability': include_availability,
+        'emphasize_skills': emphasize_skills,
+        'company_name': company_name,
+        'position_title': position_title,
+        'hiring_manager': hiring_manager,
+        'key_skills': key_skills,
+        'achievements': achievements
+    }
+
+
+class ConcurrentStageError(Exception):
+    """
+    Regroupe les erreurs de plusieurs étapes exécutées en parallèle.
+    """
+
+    def __init__(self, errors: List[BaseException]):
+        self.errors = errors
+        details = "; ".join(f"{type(e).__name__}: {e}" for e in errors)
+        super().__init__(f"{len(errors)} étapes ont échoué - {details}")
+
+
+async def run_concurrently(*coroutines) -> Tuple[Any, ...]:
+    """
+    Exécute plusieurs coroutines en parallèle et renvoie leurs résultats dans l'ordre.
+    
+    Dès qu'une étape échoue, les étapes encore en cours sont annulées. Si une seule
+    étape a échoué, son exception est relevée telle quelle; sinon les erreurs sont
+    regroupées dans une ConcurrentStageError. Une entrée invalide prime sur les autres
+    erreurs (InvalidInput relevée, chaînée à la ConcurrentStageError): réessayer ne servirait à rien.
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    
+    if pending:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    errors = [
+        task.exception() for task in tasks
+        if task.done() and not task.cancelled() and task.exception() is not None
+    ]
+    if len(errors) == 1:
+        raise errors[0]
+    if errors:
+        grouped = ConcurrentStageError(errors)
+        invalid = next((error for error in errors if isinstance(error, InvalidInput)), None)
+        if invalid is not None:
+            raise invalid from grouped
+        raise grouped
+    
+    return tuple(task.result() for task in tasks)
+
+
 async def extract_resume_content(resume_file) -> str:
     """
     Extrait le contenu du CV selon le format du fichier.
+    
+    Le résultat est mis en cache selon le contenu du fichier et la version du parser:
+    un même CV téléversé à nouveau n'est pas reparsé.
     """
     try:
-        if resume_file.type == "application/pdf":
-            return await extract_pdf_content(resume_file)
-        elif resume_file.type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", 
-                                 "application/msword"]:
-            return await extract_word_content(resume_file)
-        elif resume_file.type == "text/plain":
-            return resume_file.getvalue().decode("utf-8")
-        else:
-            raise ValueError(f"Format de fichier non supporté: {resume_file.type}")
+        with telemetry.span("extract_resume", type=resume_file.type, size_bytes=getattr(resume_file, 'size', None)) as stage:
+            cache = get_resume_cache()
+            cached = None
+            if cache is not None:
+                cache_key = ResumeCache.make_key(resume_file.getvalue(), resume_file.type, RESUME_PARSER_VERSION)
+                cached = cache.get(cache_key)
+            stage.set_attribute("cached", cached is not None)
+            
+            resume_content = cached if cached is not None else await _extract_resume_uncached(resume_file)
+            if cache is not None and cached is None and resume_content not in (PDF_UNAVAILABLE, WORD_UNAVAILABLE):
+                cache.set(cache_key, resume_content)
+            stage.set_attribute("chars", len(resume_content))
+            telemetry.record_input_size("resume", resume_content)
+            return resume_content
             
     except Exception as e:
         print(f"Erreur lors de l'extraction du CV: {str(e)}")
         raise e
 
 
+async def _extract_resume_uncached(resume_file) -> str:
+    if resume_file.type == "application/pdf":
+        return await extract_pdf_content(resume_file)
+    elif resume_file.type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", 
+                             "application/msword"]:
+        return await extract_word_content(resume_file)
+    elif resume_file.type == "text/plain":
+        return resume_file.getvalue().decode("utf-8")
+    else:
+        raise InvalidInput(f"Format de fichier non supporté: {resume_file.type}")
+
+
 async def extract_job_content(job_content, firecrawl_client) -> str:
     """
     Extrait le contenu de l'offre d'emploi selon le type d'input.
     """
     try:
         if isinstance(job_content, str):
-            # Si c'est une URL
-            if job_content.startswith(('http://', 'https://')):
-                return await extract_from_url(job_content, firecrawl_client)
-            # Si c'est du texte direct
-            else:
-                return job_content
+            source = "url" if job_content.startswith(('http://', 'https://')) else "text"
         else:
-            # Si c'est un fichier uploadé
-            return await extract_file_content(job_content)
+            source = "file"
+        with telemetry.span("extract_job", source=source) as stage:
+            if source == "url":
+                job_description = await extract_from_url(job_content, firecrawl_client)
+            elif source == "text":
+                job_description = job_content
+            else:
+                # Si c'est un fichier uploadé
+                job_description = await extract_file_content(job_content)
+            stage.set_attribute("chars", len(job_description))
+            telemetry.record_input_size("posting", job_description)
+            return job_description
             
     except Exception as e:
         print(f"Erreur lors de l'extraction de l'offre: {str(e)}")
@@ -130,18 +503,24 @@ async def extract_pdf_content(pdf_file) -> str:
     Extrait le contenu d'un fichier PDF.
     """
     try:
-        import PyPDF2
-        from io import BytesIO
-        
-        pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_file.getvalue()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        data = pdf_file.getvalue()
+        with telemetry.span("parse_pdf", size_bytes=len(data)) as stage:
+            extraction = await run_in_worker(parse_pdf_document, data, size_hint=len(data))
+            stage.set_attributes(
+                pages=extraction.pages,
+                truncated=extraction.truncated,
+                page_seconds=[round(seconds, 4) for seconds in extraction.page_seconds],
+                slowest_page_seconds=max(extraction.page_seconds, default=0.0)
+            )
+        logger.debug(
+            "PDF: durée par page %s",
+            ", ".join(f"{number}: {seconds:.3f}s" for number, seconds in enumerate(extraction.page_seconds, 1))
+        )
+        return extraction.text
         
     except ImportError:
         # Fallback si PyPDF2 n'est pas installé
-        return "Contenu PDF non disponible - PyPDF2 requis"
+        return PDF_UNAVAILABLE
     except Exception as e:
         print(f"Erreur lors de l'extraction PDF: {str(e)}")
         raise e
@@ -152,30 +531,57 @@ async def extract_word_content(word_file) -> str:
     Extrait le contenu d'un fichier Word.
     """
     try:
-        from docx import Document
-        from io import BytesIO
-        
-        doc = Document(BytesIO(word_file.getvalue()))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+        data = word_file.getvalue()
+        return await run_in_worker(parse_word_bytes, data, size_hint=len(data))
         
     except ImportError:
         # Fallback si python-docx n'est pas installé
-        return "Contenu Word non disponible - python-docx requis"
+        return WORD_UNAVAILABLE
     except Exception as e:
         print(f"Erreur lors de l'extraction Word: {str(e)}")
         raise e
 
 
+def parse_pdf_bytes(data: bytes) -> str:
+    """
+    Parse un PDF (appel bloquant, exécuté dans le pool de workers).
+    
+    Seules les premières pages sont lues (voir src/pdf.py pour les limites).
+    """
+    return parse_pdf_document(data).text
+
+
+def parse_pdf_document(data: bytes) -> PdfExtraction:
+    """
+    Comme parse_pdf_bytes, avec le nombre de pages lues et la durée de chaque page.
+    """
+    return extract_pdf_text(data)
+
+
+def parse_word_bytes(data: bytes) -> str:
+    """
+    Parse un document Word (appel bloquant, exécuté dans le pool de workers).
+    """
+    from docx import Document
+    from io import BytesIO
+    
+    doc = Document(BytesIO(data))
+    return "".join(paragraph.text + "\n" for paragraph in doc.paragraphs)
+
+
 async def extract_from_url(url: str, firecrawl_client) -> str:
     """
-    Extrait le contenu d'une URL avec Firecrawl.
+    Extrait le contenu d'une URL: téléchargement direct, puis Firecrawl si la page
+    l'exige (voir src/extractors.py).
+    
+    Les résultats sont mis en cache par URL normalisée (voir ScrapeCache).
     """
     try:
-        result = firecrawl_client.scrape_url(url)
-        return result.get('content', '')
+        with telemetry.span("scrape"):
+            cache = get_scrape_cache()
+            if cache is None:
+                return await fetch_posting(url, firecrawl_client)
+            return await cache.get_or_fetch(url, lambda: fetch_posting(url, firecrawl_client))
     except Exception as e:
         print(f"Erreur lors du scraping URL: {str(e)}")
         raise e
@@ -204,40 +610,449 @@ async def generate_personalized_cover_letter(
     resume_content: str, 
     job_description: str, 
     openai_client, 
-    generation_params: Dict[str, Any]
+    generation_params: Dict[str, Any],
+    regenerate: bool = False,
+    draft: bool = False,
+    progress: Optional[ProgressReporter] = None,
+    deadline: Optional[Deadline] = None
 ) -> str:
     """
     Génère une lettre de motivation personnalisée avec les paramètres spécifiés.
+    
+    Une lettre déjà générée pour les mêmes entrées est renvoyée depuis le cache,
+    sauf si `regenerate` est vrai. Les erreurs transitoires (429, 5xx, réseau) sont
+    reprises avec backoff dans la limite de `deadline`, puis la génération passe
+    au modèle suivant de la liste de routage.
     """
     try:
-        # Construction du prompt personnalisé
-        prompt = build_personalized_prompt(resume_content, job_description, generation_params)
-        
-        # Appel à l'API OpenAI
-        response = await openai_client.chat.completions.create(
-            model="gpt-4",  # ou "gpt-3.5-turbo" selon vos besoins
-            messages=[
-                {"role": "system", "content": "Vous êtes un expert en rédaction de lettres de motivation."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content
-        
+        with telemetry.span(
+            "generate", streaming=False, draft=draft,
+            resume_chars=len(resume_content), job_chars=len(job_description)
+        ) as stage:
+            candidates = get_router().route(generation_params, draft)
+            cache, cache_key, cached_letter = _lookup_generation_cache(
+                resume_content, job_description, generation_params, regenerate, candidates[0].model
+            )
+            stage.set_attribute("cached", cached_letter is not None)
+            if cached_letter is not None:
+                return cached_letter
+            
+            # Construction du prompt personnalisé
+            messages = await _build_messages_with_progress(resume_content, job_description, generation_params, progress)
+            
+            # Appel à l'API OpenAI
+            started = time.perf_counter()
+            tier, response = await _call_with_fallback(
+                candidates,
+                lambda tier: hedged(
+                    lambda: _create_completion(openai_client, messages, tier),
+                    hedge_delay(get_router().stats_for(tier.model).latency)
+                ),
+                deadline,
+                "Génération OpenAI"
+            )
+            logger.info(
+                "Génération terminée en %.2fs (%s, %d tokens de prompt en cache)",
+                time.perf_counter() - started, tier.model, cached_tokens(getattr(response, 'usage', None))
+            )
+            
+            stage.set_attributes(model=tier.model, **_usage_attributes(getattr(response, 'usage', None)))
+            cover_letter = response.choices[0].message.content
+            _store_generation(
+                cache, cache_key, candidates[0].model, tier.model, cover_letter,
+                resume_content, job_description, generation_params
+            )
+            return cover_letter
+            
     except Exception as e:
         print(f"Erreur lors de la génération: {str(e)}")
         raise e
 
 
-def build_personalized_prompt(
+async def stream_personalized_cover_letter(
+    resume_content: str,
+    job_description: str,
+    openai_client,
+    generation_params: Dict[str, Any],
+    stats: Optional[Dict[str, Any]] = None,
+    regenerate: bool = False,
+    draft: bool = False,
+    progress: Optional[ProgressReporter] = None,
+    deadline: Optional[Deadline] = None
+) -> AsyncIterator[str]:
+    """
+    Génère la lettre en streaming et renvoie les fragments de texte dès leur réception.
+    
+    Si `stats` est fourni, il est complété avec time_to_first_token, total_time, model
+    et, si l'API les renvoie, prompt_tokens et cached_tokens.
+    Une lettre en cache est renvoyée en un seul fragment (voir generate_personalized_cover_letter).
+    L'ouverture du flux est reprise en cas d'erreur transitoire; une fois le
+    premier fragment reçu, une erreur interrompt la génération.
+    """
+    deadline = deadline or Deadline()
+    stats = stats if stats is not None else {}
+    progress = progress or ProgressReporter()
+    try:
+        # Span non attaché au contexte: le générateur reprend dans le contexte de l'appelant
+        with telemetry.span(
+            "generate", attach=False, streaming=True, draft=draft,
+            resume_chars=len(resume_content), job_chars=len(job_description)
+        ) as stage:
+            router = get_router()
+            candidates = router.route(generation_params, draft)
+            cache, cache_key, cached_letter = _lookup_generation_cache(
+                resume_content, job_description, generation_params, regenerate, candidates[0].model
+            )
+            stage.set_attribute("cached", cached_letter is not None)
+            if cached_letter is not None:
+                stats['time_to_first_token'] = stats['total_time'] = 0.0
+                stats['cached'] = True
+                await progress.emit(events.FIRST_TOKEN, cached=True)
+                yield cached_letter
+                return
+            
+            messages = await _build_messages_with_progress(resume_content, job_description, generation_params, progress)
+            
+            started = time.perf_counter()
+            tier, (chunk, chunks, stream) = await _call_with_fallback(
+                candidates,
+                lambda tier: hedged(
+                    lambda: _open_stream(openai_client, messages, tier),
+                    hedge_delay(router.stats_for(tier.model).first_chunk_latency),
+                    on_discard=lambda opened: _close_stream(opened[2])
+                ),
+                deadline,
+                "Génération OpenAI (streaming)"
+            )
+            stats['model'] = tier.model
+            stage.set_attribute("model", tier.model)
+            
+            parts = []
+            try:
+                while chunk is not None:
+                    if getattr(chunk, 'usage', None) is not None:
+                        router.record_usage(tier.model, chunk.usage)
+                        stats['prompt_tokens'] = getattr(chunk.usage, 'prompt_tokens', None)
+                        stats['cached_tokens'] = cached_tokens(chunk.usage)
+                        telemetry.record_usage(tier.model, chunk.usage)
+                        stage.set_attributes(**_usage_attributes(chunk.usage))
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if 'time_to_first_token' not in stats:
+                            stats['time_to_first_token'] = time.perf_counter() - started
+                            telemetry.record_first_token(tier.model, stats['time_to_first_token'])
+                            stage.set_attribute("time_to_first_token", stats['time_to_first_token'])
+                            await progress.emit(events.FIRST_TOKEN, duration=stats['time_to_first_token'])
+                        parts.append(delta)
+                        yield delta
+                    chunk = await deadline.run(_next_chunk(chunks), "génération")
+            except Exception:
+                router.record_error(tier.model)
+                raise
+            finally:
+                await _close_stream(stream)
+            
+            _store_generation(
+                cache, cache_key, candidates[0].model, tier.model, "".join(parts),
+                resume_content, job_description, generation_params
+            )
+            stats['total_time'] = time.perf_counter() - started
+            # Latence déjà mesurée au premier fragment (_open_stream): la durée totale
+            # comprend les reprises, le repli et le rythme de lecture de l'appelant
+            router.record_success(tier.model)
+            logger.info(
+                "Génération en streaming (%s): premier token en %.2fs, total %.2fs, %d tokens de prompt en cache",
+                tier.model,
+                stats.get('time_to_first_token', stats['total_time']),
+                stats['total_time'],
+                stats.get('cached_tokens', 0)
+            )
+            
+    except Exception as e:
+        print(f"Erreur lors de la génération: {str(e)}")
+        raise e
+
+
+async def _call_with_fallback(
+    candidates: List[ModelTier],
+    call,
+    deadline: Optional[Deadline],
+    description: str
+) -> Tuple[ModelTier, Any]:
+    """
+    Appelle `call(tier)` avec reprises sur chaque modèle candidat, dans l'ordre,
+    tant que l'erreur est transitoire (ou le modèle introuvable) et que le délai le permet.
+    
+    Les modèles de repli disponibles réduisent les reprises sur le premier: un
+    modèle en difficulté est vite abandonné au profit du suivant.
+    """
+    policy = default_retry_policy()
+    for index, tier in enumerate(candidates):
+        is_last = index == len(candidates) - 1
+        tier_policy = policy if is_last else RetryPolicy(
+            max_attempts=min(2, policy.max_attempts),
+            base_delay=policy.base_delay,
+            max_delay=policy.max_delay,
+            attempt_timeout=policy.attempt_timeout
+        )
+        try:
+            result = await call_with_retries(
+                lambda: call(tier), tier_policy, deadline, f"{description} ({tier.model})"
+            )
+            return tier, result
+        except Exception as e:
+            can_fall_back = is_retryable(e) or getattr(e, 'status_code', None) == 404
+            if is_last or isinstance(e, DeadlineExceeded) or not can_fall_back:
+                raise
+            logger.warning(
+                "%s: %s indisponible (%s), repli sur %s",
+                description, tier.model, type(e).__name__, candidates[index + 1].model
+            )
+
+
+async def _create_completion(openai_client, messages: List[Dict[str, str]], tier: ModelTier):
+    router = get_router()
+    started = time.perf_counter()
+    try:
+        response = await openai_client.chat.completions.create(
+            model=tier.model,
+            messages=messages,
+            max_tokens=tier.max_tokens,
+            temperature=TEMPERATURE
+        )
+    except Exception:
+        router.record_error(tier.model)
+        raise
+    router.record_success(tier.model, time.perf_counter() - started, getattr(response, 'usage', None))
+    telemetry.record_usage(tier.model, getattr(response, 'usage', None))
+    return response
+
+
+async def _open_stream(
+    openai_client,
+    messages: List[Dict[str, str]],
+    tier: ModelTier
+) -> Tuple[Any, Any, Any]:
+    """
+    Ouvre le flux de génération et attend son premier fragment.
+    
+    Returns:
+        (premier fragment ou None si le flux est vide, itérateur, flux)
+    """
+    router = get_router()
+    started = time.perf_counter()
+    try:
+        stream = await openai_client.chat.completions.create(
+            model=tier.model,
+            messages=messages,
+            max_tokens=tier.max_tokens,
+            temperature=TEMPERATURE,
+            stream=True,
+            # Dernier fragment avec l'usage (tokens), pour les statistiques par modèle
+            stream_options={"include_usage": True}
+        )
+    except Exception:
+        router.record_error(tier.model)
+        raise
+    chunks = stream.__aiter__()
+    try:
+        first_chunk = await _next_chunk(chunks)
+    except BaseException as e:
+        if isinstance(e, Exception):
+            router.record_error(tier.model)
+        await _close_stream(stream)
+        raise
+    router.record_first_chunk(tier.model, time.perf_counter() - started)
+    return first_chunk, chunks, stream
+
+
+def _usage_attributes(usage: Any) -> Dict[str, Any]:
+    if usage is None:
+        return {}
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+        'completion_tokens': getattr(usage, 'completion_tokens', None),
+        'cached_tokens': cached_tokens(usage),
+    }
+
+
+async def _next_chunk(chunks):
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _close_stream(stream) -> None:
+    # AsyncStream du SDK OpenAI (close) ou générateur asynchrone (aclose)
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is not None:
+        try:
+            await close()
+        except Exception:
+            pass
+
+
+async def _build_messages_with_progress(
+    resume_content: str,
+    job_description: str,
+    generation_params: Dict[str, Any],
+    progress: Optional[ProgressReporter]
+) -> List[Dict[str, str]]:
+    started = time.perf_counter()
+    with telemetry.span("build_prompt") as stage:
+        messages = build_personalized_messages(resume_content, job_description, generation_params)
+        if telemetry.ENABLED:
+            stage.set_attribute("prompt_tokens", _count_message_tokens(messages))
+    if progress is not None:
+        await progress.emit(events.PROMPT_BUILT, duration=time.perf_counter() - started)
+    return messages
+
+
+def _lookup_generation_cache(
+    resume_content: str,
+    job_description: str,
+    generation_params: Dict[str, Any],
+    regenerate: bool,
+    model: str = MODEL
+) -> Tuple[Optional[GenerationCache], Optional[str], Optional[str]]:
+    """
+    Renvoie (cache, clé, lettre en cache). La lettre est None si elle n'est pas
+    connue ou si `regenerate` est vrai; le cache est None s'il est désactivé.
+    """
+    cache = get_generation_cache()
+    if cache is None:
+        return None, None, None
+    
+    cache_key = GenerationCache.make_key(
+        resume_content, job_description, generation_params, model, TEMPERATURE
+    )
+    if regenerate:
+        cache.record_bypass()
+        return cache, cache_key, None
+    
+    cached_letter = cache.get(cache_key)
+    if cached_letter is not None:
+        logger.info("Lettre servie depuis le cache")
+    return cache, cache_key, cached_letter
+
+
+def _store_generation(
+    cache: Optional[GenerationCache],
+    cache_key: Optional[str],
+    requested_model: str,
+    model: str,
+    cover_letter: str,
+    resume_content: str,
+    job_description: str,
+    generation_params: Dict[str, Any]
+) -> None:
+    """
+    Met la lettre en cache sous la clé du modèle qui l'a rédigée: une lettre obtenue
+    par repli n'est pas servie ensuite à la place de celle du modèle demandé.
+    """
+    if cache is None or not cover_letter:
+        return
+    if model != requested_model:
+        cache_key = GenerationCache.make_key(
+            resume_content, job_description, generation_params, model, TEMPERATURE
+        )
+    cache.set(cache_key, cover_letter)
+
+
+def build_messages(prompt: str, context: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Construit la liste de messages envoyée au modèle.
+    
+    L'ordre va du plus stable au plus variable: message système, contexte
+    (consignes et CV, identiques d'une requête à l'autre pour un même candidat),
+    puis la demande. Le fournisseur peut ainsi réutiliser le préfixe commun
+    (cache de prompt: coût réduit et premier token plus rapide).
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if context:
+        messages.append({"role": "user", "content": context})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def build_personalized_messages(
     resume_content: str, 
+    job_description: str, 
+    params: Dict[str, Any],
+    max_input_tokens: Optional[int] = None
+) -> List[Dict[str, str]]:
+    """
+    Construit les messages personnalisés basés sur les paramètres fournis.
+    
+    Un CV plus long que RESUME_SELECTION_TOKENS est d'abord réduit à ses parties
+    les plus pertinentes pour l'offre (classement BM25, voir src/ranking.py).
+    Si le prompt dépasse le budget de tokens d'entrée (MAX_INPUT_TOKENS par défaut),
+    le CV et l'offre sont réduits avec fit_to_budget. Les informations saisies par
+    l'utilisateur (compétences clés, réalisations...) ne sont jamais coupées.
+    
+    Les consignes et le CV forment un préfixe identique pour toutes les variantes
+    et régénérations d'une même candidature; l'offre et les options viennent après.
+    """
+    max_input_tokens = max_input_tokens or MAX_INPUT_TOKENS
+    
+    # CV long: ne garder que les parties les plus pertinentes pour l'offre
+    if RESUME_SELECTION_TOKENS and count_tokens(resume_content, MODEL) > RESUME_SELECTION_TOKENS:
+        resume_content = select_relevant_content(
+            resume_content, job_description, RESUME_SELECTION_TOKENS, MODEL
+        )
+    
+    # Tokens du prompt hors CV et offre (consignes, options utilisateur, message système)
+    fixed_tokens = _count_message_tokens(build_messages(_render_request("", params), _render_context("")))
+    resume_tokens = count_tokens(resume_content, MODEL)
+    job_tokens = count_tokens(job_description, MODEL)
+    
+    if fixed_tokens + resume_tokens + job_tokens > max_input_tokens:
+        resume_content, job_description = fit_to_budget(
+            resume_content, job_description, max_input_tokens - fixed_tokens, MODEL
+        )
+        logger.info(
+            "Prompt réduit au budget de %d tokens: CV %d -> %d, offre %d -> %d",
+            max_input_tokens, resume_tokens, count_tokens(resume_content, MODEL),
+            job_tokens, count_tokens(job_description, MODEL)
+        )
+    
+    messages = build_messages(_render_request(job_description, params), _render_context(resume_content))
+    logger.info("Prompt: %d tokens (budget %d)", _count_message_tokens(messages), max_input_tokens)
+    return messages
+
+
+def _count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(message["content"], MODEL) for message in messages)
+
+
+def _render_context(resume_content: str) -> str:
+    """
+    Partie stable du prompt: consignes générales et CV, sans aucune option de la requête.
+    """
+    return f"""
+    Vous allez rédiger une lettre de motivation personnalisée à partir du CV ci-dessous
+    et de l'offre d'emploi fournie dans le message suivant.
+
+    **Consignes importantes:**
+    - Analysez attentivement le CV et l'offre d'emploi
+    - Identifiez les points de correspondance
+    - Personnalisez le contenu selon les spécifications
+    - Utilisez un style adapté au secteur d'activité
+    - Concluez par une invitation à l'entretien
+    - Respectez la longueur demandée
+
+    **CV du candidat:**
+    {resume_content}
+    """
+
+
+def _render_request(
     job_description: str, 
     params: Dict[str, Any]
 ) -> str:
     """
-    Construit un prompt personnalisé basé sur les paramètres fournis.
+    Partie variable du prompt: offre d'emploi et options de la requête.
     """
     
     # Mapping des longueurs
@@ -258,15 +1073,11 @@ def build_personalized_prompt(
     
     # Construction du prompt
     prompt = f"""
-    Rédigez une lettre de motivation personnalisée en {params['language']} avec les spécifications suivantes:
-
-    **CV du candidat:**
-    {resume_content}
-
     **Offre d'emploi:**
     {job_description}
 
     **Instructions de rédaction:**
+    - Langue: {params['language']}
     - Ton: {tone_mapping.get(params['tone'], 'professionnel')}
     - Longueur: {length_mapping.get(params['length'], 'entre 350 et 400 mots')}
     - Template: {params['template']}
@@ -294,15 +1105,9 @@ def build_personalized_prompt(
     if params['emphasize_skills']:
         prompt += "\n- Mettre l'accent sur les compétences techniques"
     
-    prompt += """
+    prompt += f"""
 
-    **Consignes importantes:**
-    - Analysez attentivement le CV et l'offre d'emploi
-    - Identifiez les points de correspondance
-    - Personnalisez le contenu selon les spécifications
-    - Utilisez un style adapté au secteur d'activité
-    - Concluez par une invitation à l'entretien
-    - Respectez la longueur demandée
+    Rédigez maintenant la lettre de motivation en {params['language']}.
     """
     
-    return prompt
\ No newline at end of file
+    return prompt
@@ -0,0 +1,155 @@
+# src/dedupe.py - Détection des offres quasi identiques (MinHash + LSH)
+#
+# Une même offre est souvent publiée sur plusieurs sites avec de petites
+# différences (mentions du site, mise en page, liens). Chaque description est
+# normalisée puis découpée en séquences de mots (shingles); la signature MinHash
+# estime la similarité de Jaccard entre deux offres, et l'indexation par bandes
+# (LSH) ne compare une offre qu'aux offres qui partagent au moins une bande.
+# Un texte trop court (moins de MIN_SHINGLES séquences) n'est ni indexé ni comparé:
+# deux textes vides ou de quelques mots auraient une similarité trompeuse.
+import hashlib
+import random
+import re
+import unicodedata
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+# Premier de Mersenne 2^61 - 1: permutations h(x) = (a * x + b) mod P
+MERSENNE_PRIME = (1 << 61) - 1
+NUM_PERM = 128
+# 16 bandes de 8 lignes: deux offres similaires à 70 % partagent une bande avec
+# une probabilité d'environ 60 %, à 90 % avec une probabilité supérieure à 99,9 %
+BANDS = 16
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.9
+# Environ 20 mots: en dessous, ce n'est pas une offre complète
+MIN_SHINGLES = 18
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+|\S+@\S+")
+NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Minuscules, sans accents, sans URLs ni adresses e-mail, ponctuation réduite à des espaces.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = URL_PATTERN.sub(" ", text)
+    return NON_WORD.sub(" ", text).strip()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> FrozenSet[int]:
+    """
+    Empreintes 64 bits des séquences de `size` mots du texte normalisé.
+    """
+    words = normalize_text(text).split()
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[index:index + size]) for index in range(len(words) - size + 1)]
+    return frozenset(
+        int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+        for gram in grams
+    )
+
+
+def jaccard(first: FrozenSet[int], second: FrozenSet[int]) -> float:
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class MinHasher:
+    """
+    Signatures MinHash de `num_perm` valeurs (permutations tirées d'une graine fixe:
+    les signatures sont comparables d'un processus à l'autre).
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+
+    def signature(self, hashes: FrozenSet[int]) -> Tuple[int, ...]:
+        if not hashes:
+            return (MERSENNE_PRIME,) * self.num_perm
+        return tuple(
+            min((a * value + b) % MERSENNE_PRIME for value in hashes)
+            for a, b in self.permutations
+        )
+
+
+class Match(NamedTuple):
+    key: str
+    similarity: float
+
+
+class NearDuplicateIndex:
+    """
+    Index des textes déjà vus: query() renvoie le plus proche au-dessus de `threshold`
+    (similarité de Jaccard exacte, vérifiée sur les candidats trouvés par LSH).
+    Les textes de moins de `min_shingles` séquences sont ignorés.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS,
+                 min_shingles: int = MIN_SHINGLES):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) doit être un multiple de bands ({bands})")
+        self.threshold = threshold
+        self.min_shingles = max(1, min_shingles)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(bands)]
+        self._shingles: Dict[str, FrozenSet[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def _bands(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        return [signature[band * self.rows:(band + 1) * self.rows] for band in range(self.bands)]
+
+    def query(self, text: str) -> Optional[Match]:
+        hashes = shingles(text)
+        if len(hashes) < self.min_shingles:
+            return None
+        return self._query(hashes)[0]
+
+    def _query(self, hashes: FrozenSet[int]) -> Tuple[Optional[Match], List[Tuple[int, ...]]]:
+        bands = self._bands(self.hasher.signature(hashes))
+        candidates: Set[str] = set()
+        for buckets, band in zip(self._buckets, bands):
+            candidates.update(buckets.get(band, ()))
+        best: Optional[Match] = None
+        for key in candidates:
+            similarity = jaccard(hashes, self._shingles[key])
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = Match(key, similarity)
+        return best, bands
+
+    def add(self, key: str, text: str) -> None:
+        hashes = shingles(text)
+        if len(hashes) < self.min_shingles:
+            return
+        self._insert(key, hashes, self._bands(self.hasher.signature(hashes)))
+
+    def _insert(self, key: str, hashes: FrozenSet[int], bands: List[Tuple[int, ...]]) -> None:
+        self._shingles[key] = hashes
+        for buckets, band in zip(self._buckets, bands):
+            buckets.setdefault(band, []).append(key)
+
+    def match_or_add(self, key: str, text: str) -> Optional[Match]:
+        """
+        Renvoie le texte quasi identique déjà indexé, ou indexe celui-ci sous `key`
+        (une seule signature calculée dans les deux cas). Un texte trop court n'est
+        pas indexé et ne correspond à rien.
+        """
+        hashes = shingles(text)
+        if len(hashes) < self.min_shingles:
+            return None
+        match, bands = self._query(hashes)
+        if match is None:
+            self._insert(key, hashes, bands)
+        return match
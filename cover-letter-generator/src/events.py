@@ -0,0 +1,83 @@
+# src/events.py - Événements de progression du pipeline de génération
+import asyncio
+import inspect
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+# Étapes signalées, dans l'ordre habituel
+RESUME_PARSED = "resume_parsed"
+POSTING_FETCHED = "posting_fetched"
+PROMPT_BUILT = "prompt_built"
+FIRST_TOKEN = "first_token"
+VARIANT_DONE = "variant_done"
+DONE = "done"
+
+EventCallback = Callable[[Dict[str, Any]], Optional[Awaitable[None]]]
+
+
+class ProgressReporter:
+    """
+    Transmet les étapes d'une requête à un callback (synchrone ou asynchrone).
+
+    Chaque événement est un dictionnaire avec au moins:
+        stage: nom de l'étape (voir constantes ci-dessus)
+        elapsed: secondes écoulées depuis le début de la requête
+    et selon l'étape: duration (durée propre de l'étape), cached...
+    """
+
+    def __init__(self, on_event: Optional[EventCallback] = None):
+        self.on_event = on_event
+        self.started = time.perf_counter()
+
+    async def emit(self, stage: str, **data) -> None:
+        if self.on_event is None:
+            return
+        event = {'stage': stage, 'elapsed': time.perf_counter() - self.started}
+        event.update(data)
+        result = self.on_event(event)
+        if inspect.isawaitable(result):
+            await result
+
+    async def track(self, stage: str, awaitable: Awaitable[Any]) -> Any:
+        """
+        Attend `awaitable` puis émet `stage` avec la durée de l'attente.
+        """
+        started = time.perf_counter()
+        result = await awaitable
+        await self.emit(stage, duration=time.perf_counter() - started)
+        return result
+
+
+async def stream_with_events(
+    start: Callable[[EventCallback], AsyncIterator[str]]
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Fusionne les fragments d'une génération en streaming et ses événements de
+    progression en un seul flux de ("event", événement) et ("delta", texte).
+
+    `start` reçoit le callback à passer en on_event et renvoie le flux de fragments,
+    par exemple: lambda on_event: stream_cover_letter_request(..., on_event=on_event)
+    """
+    items: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for delta in start(lambda event: items.put_nowait(("event", event))):
+                items.put_nowait(("delta", delta))
+            items.put_nowait(("end", None))
+        except Exception as e:
+            items.put_nowait(("error", e))
+
+    task = asyncio.ensure_future(pump())
+    try:
+        while True:
+            kind, value = await items.get()
+            if kind == "end":
+                return
+            if kind == "error":
+                raise value
+            yield kind, value
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
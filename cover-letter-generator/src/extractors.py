@@ -0,0 +1,550 @@
+# src/extractors.py - Récupération du texte d'une offre d'emploi à partir de son URL
+#
+# Les extracteurs sont essayés dans l'ordre de COVER_LETTER_EXTRACTORS (défaut
+# "local,firecrawl"):
+# - local: téléchargement direct (httpx, connexions réutilisées) et analyse HTML au fil
+#   de l'eau, sans navigation, menus, bannières ni pieds de page. Les données
+#   structurées JobPosting (JSON-LD) sont utilisées quand la page en fournit.
+# - firecrawl: API distante (payante) qui exécute le JavaScript de la page.
+# Un extracteur passe la main au suivant si le texte obtenu est trop court
+# (COVER_LETTER_LOCAL_MIN_CHARS) ou si la page ne s'affiche qu'avec JavaScript.
+#
+# register_extractor() permet d'ajouter un extracteur (API d'un ATS par exemple).
+import asyncio
+import codecs
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+import weakref
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from . import telemetry
+
+logger = logging.getLogger(__name__)
+
+EXTRACTOR_ORDER = os.getenv('COVER_LETTER_EXTRACTORS', 'local,firecrawl')
+# Texte minimal pour accepter le résultat du téléchargement direct
+LOCAL_MIN_CHARS = int(os.getenv('COVER_LETTER_LOCAL_MIN_CHARS', '300'))
+# Taille maximale lue d'une page (octets)
+LOCAL_MAX_BYTES = int(os.getenv('COVER_LETTER_LOCAL_MAX_BYTES', str(2 * 2 ** 20)))
+LOCAL_TIMEOUT = float(os.getenv('COVER_LETTER_LOCAL_TIMEOUT', '10'))
+# Adresses privées (réseau interne, métadonnées cloud) refusées sauf COVER_LETTER_FETCH_ALLOW_PRIVATE=1
+ALLOW_PRIVATE = os.getenv('COVER_LETTER_FETCH_ALLOW_PRIVATE', '0').lower() in ("1", "true", "yes", "on")
+MAX_REDIRECTS = 5
+
+USER_AGENT = "Mozilla/5.0 (compatible; CoverLetterGenerator/1.0; +https://github.com/Garehmalika/cover-letter-generator)"
+
+EXTRACTIONS = telemetry.register(telemetry.Counter(
+    "cover_letter_posting_extractions_total",
+    "Extractions d'offres par extracteur (ok, fallback: résultat insuffisant, error)",
+    ("extractor", "outcome")
+))
+
+
+class ExtractionInsufficient(Exception):
+    """
+    Le texte obtenu ne suffit pas (page trop courte, rendue en JavaScript...):
+    l'extracteur suivant doit prendre le relais. `text` garde le résultat partiel.
+    """
+
+    def __init__(self, reason: str, text: str = ""):
+        self.reason = reason
+        self.text = text
+        super().__init__(reason)
+
+
+# Éléments dont le contenu n'est jamais du texte d'offre
+SKIPPED_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "nav", "header",
+    "footer", "aside", "form", "button", "select", "option", "dialog", "head", "object",
+}
+# Éléments qui découpent le texte en blocs
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "h1", "h2", "h3",
+    "h4", "h5", "h6", "table", "tr", "td", "th", "blockquote", "pre", "br", "hr", "body",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Classes, identifiants et rôles des zones annexes (menus, cookies, partage...)
+BOILERPLATE = re.compile(
+    r"(^|[-_\s])(nav|navbar|menu|breadcrumbs?|cookies?|consent|gdpr|footer|sidebar|"
+    r"social|share|sharing|newsletter|subscribe|modal|popup|related|similar|recommended|"
+    r"advert|ads?|promo|skip-link|login|signup)([-_\s]|$)",
+    re.IGNORECASE
+)
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "dialog", "alert"}
+# Conteneurs probables du texte principal
+MAIN_CONTENT = re.compile(
+    r"(job|posting|offer|offre|vacancy|position)[-_]?(description|details?|body|content)|"
+    r"(^|[-_\s])(description|main-content|article-body)([-_\s]|$)",
+    re.IGNORECASE
+)
+# Pages qui ne s'affichent qu'avec JavaScript
+JS_REQUIRED = re.compile(
+    r"(enable|activer?|activez)\s+(le\s+)?javascript|javascript\s+(is\s+)?(required|disabled|désactivé)",
+    re.IGNORECASE
+)
+APP_ROOT_IDS = {"root", "app", "__next", "__nuxt", "___gatsby", "svelte"}
+WHITESPACE = re.compile(r"\s+")
+
+
+class PostingHTMLParser(HTMLParser):
+    """
+    Analyse HTML incrémentale (feed() par fragments) qui garde le texte principal
+    d'une page, découpé en blocs, sans les zones annexes.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[Tuple[str, int, bool]] = []  # (texte, caractères de liens, dans le contenu principal)
+        self.json_ld: List[str] = []
+        self.title = ""
+        self.script_count = 0
+        self.js_required = False
+        self.app_root = False
+        self._skip: List[List[Any]] = []  # [balise, profondeur] des zones ignorées
+        self._main: List[List[Any]] = []  # idem pour les zones de contenu principal
+        self._parts: List[str] = []
+        self._link_chars = 0
+        self._link_depth = 0
+        self._capture: Optional[str] = None  # "title", "ld+json" ou "noscript"
+        self._captured: List[str] = []
+        self._list_item = False
+
+    # Zones imbriquées: on compte les balises de même nom pour trouver la fin
+    @staticmethod
+    def _enter(regions: List[List[Any]], tag: str) -> None:
+        for region in regions:
+            if region[0] == tag:
+                region[1] += 1
+
+    @staticmethod
+    def _leave(regions: List[List[Any]], tag: str) -> None:
+        for region in regions:
+            if region[0] == tag:
+                region[1] -= 1
+        while regions and regions[-1][1] <= 0:
+            regions.pop()
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        attributes = dict(attrs)
+        if tag == "script":
+            self.script_count += 1
+            if (attributes.get("type") or "").lower() == "application/ld+json":
+                self._capture, self._captured = "ld+json", []
+        elif tag == "title" and not self.title:
+            self._capture, self._captured = "title", []
+        elif tag == "noscript":
+            self._capture, self._captured = "noscript", []
+        if attributes.get("id") in APP_ROOT_IDS:
+            self.app_root = True
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS and not self._skip:
+                self._flush()
+            return
+
+        self._enter(self._skip, tag)
+        self._enter(self._main, tag)
+        if self._skip:
+            return
+        marker = " ".join(filter(None, (attributes.get("class"), attributes.get("id"))))
+        if tag in SKIPPED_TAGS or attributes.get("role") in BOILERPLATE_ROLES or \
+                (marker and BOILERPLATE.search(marker) and tag not in ("body", "main", "article")) or \
+                attributes.get("aria-hidden") == "true" or "hidden" in attributes:
+            self._flush()
+            self._skip.append([tag, 1])
+            return
+        if tag in ("main", "article") or attributes.get("itemprop") == "description" or \
+                (marker and MAIN_CONTENT.search(marker)):
+            self._flush()
+            self._main.append([tag, 1])
+        if tag == "a":
+            self._link_depth += 1
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._list_item = tag == "li"
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._capture and tag in ("script", "title", "noscript"):
+            text = "".join(self._captured)
+            if self._capture == "ld+json":
+                self.json_ld.append(text)
+            elif self._capture == "title":
+                self.title = WHITESPACE.sub(" ", text).strip()
+            elif JS_REQUIRED.search(text):
+                self.js_required = True
+            self._capture = None
+        if tag in VOID_TAGS:
+            return
+        skipping = bool(self._skip)
+        self._leave(self._skip, tag)
+        if skipping:
+            self._leave(self._main, tag)
+            return
+        if tag == "a" and self._link_depth:
+            self._link_depth -= 1
+        if tag in BLOCK_TAGS or any(region[0] == tag for region in self._main):
+            self._flush()
+            self._list_item = False
+        self._leave(self._main, tag)
+
+    def handle_data(self, data: str) -> None:
+        if self._capture:
+            self._captured.append(data)
+            return
+        if self._skip:
+            return
+        self._parts.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def _flush(self) -> None:
+        text = WHITESPACE.sub(" ", "".join(self._parts)).strip()
+        if text:
+            if self._list_item:
+                text = f"- {text}"
+            self.blocks.append((text, self._link_chars, bool(self._main)))
+        self._parts = []
+        self._link_chars = 0
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+
+    def main_text(self) -> str:
+        """
+        Texte principal: les zones de contenu principal si elles sont assez fournies,
+        sinon tous les blocs hors listes de liens.
+        """
+        main = [text for text, _, in_main in self.blocks if in_main]
+        if sum(len(text) for text in main) >= 200:
+            candidates = main
+        else:
+            candidates = [
+                text for text, link_chars, _ in self.blocks
+                # Bloc composé surtout de liens: menu, liste d'offres similaires...
+                if not (link_chars > 0.5 * len(text) and len(text) < 300)
+            ]
+        lines: List[str] = []
+        for text in candidates:
+            if not lines or lines[-1] != text:
+                lines.append(text)
+        return "\n".join(lines)
+
+    def needs_javascript(self, text: str) -> bool:
+        """
+        Page vide sans JavaScript: message <noscript>, ou racine d'application
+        (React, Vue...) sans contenu et beaucoup de scripts.
+        """
+        if len(text) >= LOCAL_MIN_CHARS:
+            return False
+        return self.js_required or (self.app_root and self.script_count >= 3)
+
+
+def html_to_text(html: str) -> str:
+    parser = PostingHTMLParser()
+    parser.feed(html)
+    parser.close()
+    return parser.main_text()
+
+
+def job_posting_from_json_ld(blocks: List[str]) -> Optional[str]:
+    """
+    Texte d'une offre décrite en JSON-LD (schema.org JobPosting), publié par la
+    plupart des sites d'emploi pour les moteurs de recherche.
+    """
+    for block in blocks:
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            types = item.get("@type")
+            types = types if isinstance(types, list) else [types]
+            if "JobPosting" not in types or not item.get("description"):
+                continue
+            lines = []
+            if item.get("title"):
+                lines.append(str(item["title"]))
+            organization = item.get("hiringOrganization")
+            if isinstance(organization, dict) and organization.get("name"):
+                lines.append(f"Entreprise: {organization['name']}")
+            location = _job_location(item.get("jobLocation"))
+            if location:
+                lines.append(f"Lieu: {location}")
+            if item.get("employmentType"):
+                employment = item["employmentType"]
+                lines.append(f"Contrat: {', '.join(employment) if isinstance(employment, list) else employment}")
+            lines.append(html_to_text(str(item["description"])))
+            return "\n".join(lines)
+    return None
+
+
+def _job_location(location: Any) -> str:
+    if isinstance(location, list):
+        location = location[0] if location else None
+    if not isinstance(location, dict):
+        return ""
+    address = location.get("address")
+    if isinstance(address, dict):
+        parts = (address.get("addressLocality"), address.get("addressRegion"), address.get("addressCountry"))
+        return ", ".join(str(part) for part in parts if part and isinstance(part, str))
+    return ""
+
+
+def check_public_url(url: str) -> None:
+    """
+    Refuse les URLs qui ne sont pas http(s) ou dont l'hôte est une adresse IP non
+    publique. Les noms de domaine sont vérifiés à la connexion (PublicAddressBackend).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ExtractionInsufficient(f"URL non supportée: {url}")
+    if ALLOW_PRIVATE:
+        return
+    try:
+        address = ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        return
+    if not address.is_global:
+        raise ExtractionInsufficient(f"Adresse non publique refusée: {parts.hostname}")
+
+
+async def resolve_public_address(host: str, port: int) -> str:
+    """
+    Résout `host` et renvoie l'adresse à laquelle se connecter. Refuse les hôtes dont
+    une adresse est privée, de boucle locale ou de lien local (métadonnées cloud).
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError as e:
+        raise ExtractionInsufficient(f"Résolution de {host} impossible: {e}")
+    addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    for address in addresses:
+        if not address.is_global:
+            raise ExtractionInsufficient(f"Adresse non publique refusée: {host} ({address})")
+    if not addresses:
+        raise ExtractionInsufficient(f"Résolution de {host} impossible: aucune adresse")
+    return str(addresses[0])
+
+
+def _pinned_transport(**kwargs):
+    """
+    Transport httpx qui se connecte à l'adresse vérifiée par resolve_public_address:
+    le nom n'est pas résolu une seconde fois à la connexion (rebinding DNS). L'en-tête
+    Host, le SNI et la vérification du certificat utilisent toujours le nom de l'URL.
+    Chaque redirection ouvre sa propre connexion et passe par la même vérification.
+    """
+    import httpcore
+    import httpx
+
+    class PublicAddressBackend(httpcore.AsyncNetworkBackend):
+        def __init__(self, backend):
+            self.backend = backend
+
+        async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+            if not ALLOW_PRIVATE:
+                host = await resolve_public_address(host, port)
+            return await self.backend.connect_tcp(host, port, timeout, local_address, socket_options)
+
+        async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+            raise ExtractionInsufficient("Socket Unix refusé")
+
+        async def sleep(self, seconds):
+            await self.backend.sleep(seconds)
+
+    transport = httpx.AsyncHTTPTransport(**kwargs)
+    # httpx ne permet pas de choisir le backend réseau du pool: il est enveloppé sur place
+    # (attribut privé, versions de httpx/httpcore fixées dans requirements.txt)
+    if not hasattr(transport._pool, "_network_backend"):
+        raise RuntimeError("Version de httpcore non supportée: impossible de vérifier les adresses de connexion")
+    transport._pool._network_backend = PublicAddressBackend(transport._pool._network_backend)
+    return transport
+
+
+class LocalExtractor:
+    """
+    Téléchargement direct de la page, analysée au fil de la réception.
+
+    Un client HTTP (pool de connexions) est gardé par boucle d'événements.
+    """
+
+    name = "local"
+
+    def __init__(self, min_chars: int = LOCAL_MIN_CHARS, max_bytes: int = LOCAL_MAX_BYTES,
+                 timeout: float = LOCAL_TIMEOUT):
+        self.min_chars = min_chars
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            limits = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0)
+            client = self._clients[loop] = httpx.AsyncClient(
+                transport=_pinned_transport(limits=limits),
+                headers={
+                    'User-Agent': USER_AGENT,
+                    'Accept': "text/html,application/xhtml+xml;q=0.9,text/plain;q=0.8",
+                    'Accept-Language': "fr,en;q=0.8",
+                },
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                follow_redirects=False,
+                # Aucun proxy de l'environnement (HTTP_PROXY...): il joindrait l'hôte sans la
+                # vérification d'adresse. httpx les ignore déjà avec un transport fourni.
+                trust_env=False
+            )
+        return client
+
+    async def extract(self, url: str) -> str:
+        parser = PostingHTMLParser()
+        plain_text: Optional[List[str]] = None
+        client = self._client()
+        for _ in range(MAX_REDIRECTS + 1):
+            check_public_url(url)
+            async with client.stream("GET", url) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers.get("location", ""))
+                    continue
+                if response.status_code >= 400:
+                    raise ExtractionInsufficient(f"HTTP {response.status_code}")
+                content_type = response.headers.get("content-type", "text/html").lower()
+                if "html" not in content_type and not content_type.startswith("text/plain"):
+                    raise ExtractionInsufficient(f"Contenu non HTML ({content_type.split(';')[0]})")
+                if content_type.startswith("text/plain"):
+                    plain_text = []
+                decoder = _text_decoder(response.encoding)
+                received = 0
+                async for data in response.aiter_bytes():
+                    data = data[:self.max_bytes - received]
+                    received += len(data)
+                    chunk = decoder.decode(data, final=received >= self.max_bytes)
+                    if plain_text is not None:
+                        plain_text.append(chunk)
+                    else:
+                        parser.feed(chunk)
+                    if received >= self.max_bytes:
+                        break
+                else:
+                    tail = decoder.decode(b"", final=True)
+                    if plain_text is not None:
+                        plain_text.append(tail)
+                    else:
+                        parser.feed(tail)
+            break
+        else:
+            raise ExtractionInsufficient("Trop de redirections")
+
+        if plain_text is not None:
+            text = "".join(plain_text).strip()
+        else:
+            parser.close()
+            text = parser.main_text()
+            structured = job_posting_from_json_ld(parser.json_ld)
+            if structured and len(structured) >= min(len(text), self.min_chars):
+                text = structured
+            elif parser.title and text and parser.title not in text:
+                text = f"{parser.title}\n{text}"
+            if parser.needs_javascript(text):
+                raise ExtractionInsufficient("Page rendue en JavaScript", text)
+        if len(text) < self.min_chars:
+            raise ExtractionInsufficient(f"Texte trop court ({len(text)} caractères)", text)
+        return text
+
+    async def aclose(self) -> None:
+        for client in list(self._clients.values()):
+            await client.aclose()
+        self._clients.clear()
+
+
+def _text_decoder(encoding: Optional[str]):
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+class FirecrawlExtractor:
+    """
+    Scraping par l'API Firecrawl (client synchrone, appelé dans un thread).
+    """
+
+    name = "firecrawl"
+
+    def __init__(self, firecrawl_client):
+        self.firecrawl_client = firecrawl_client
+
+    async def extract(self, url: str) -> str:
+        if self.firecrawl_client is None:
+            raise ExtractionInsufficient("Firecrawl non configuré (FIRECRAWL_API_KEY)")
+        result = await asyncio.to_thread(self.firecrawl_client.scrape_url, url)
+        return result.get('content', '')
+
+
+# Fabriques des extracteurs: reçoivent le client Firecrawl de la requête
+_local_extractor = LocalExtractor()
+EXTRACTORS: Dict[str, Callable[[Any], Any]] = {
+    "local": lambda firecrawl_client: _local_extractor,
+    "firecrawl": FirecrawlExtractor,
+}
+
+
+def register_extractor(name: str, factory: Callable[[Any], Any]) -> None:
+    """
+    Ajoute un extracteur: `factory(firecrawl_client)` renvoie un objet avec
+    `name` et `async extract(url) -> str` (ExtractionInsufficient pour passer la main).
+    Il est utilisé s'il figure dans COVER_LETTER_EXTRACTORS (ou `order` de fetch_posting).
+    """
+    EXTRACTORS[name] = factory
+
+
+async def fetch_posting(url: str, firecrawl_client=None, order: Optional[str] = None) -> str:
+    """
+    Texte de l'offre à `url`, avec le premier extracteur qui donne un résultat suffisant.
+
+    Si aucun n'y parvient, le plus long résultat partiel est renvoyé; à défaut,
+    la dernière erreur est relevée.
+    """
+    names = [name.strip() for name in (order or EXTRACTOR_ORDER).split(",") if name.strip()]
+    best_partial = ""
+    last_error: Optional[Exception] = None
+    for name in names:
+        if name not in EXTRACTORS:
+            raise ValueError(f"Extracteur inconnu: {name}")
+        extractor = EXTRACTORS[name](firecrawl_client)
+        with telemetry.span("extract_posting", extractor=name, url_host=urlsplit(url).hostname) as stage:
+            try:
+                text = await extractor.extract(url)
+            except ExtractionInsufficient as e:
+                EXTRACTIONS.inc(extractor=name, outcome="fallback")
+                stage.set_attribute("fallback", e.reason)
+                logger.info("Extraction %s insuffisante pour %s: %s", name, url, e.reason)
+                if len(e.text) > len(best_partial):
+                    best_partial = e.text
+                last_error = e
+                continue
+            except Exception as e:
+                EXTRACTIONS.inc(extractor=name, outcome="error")
+                logger.warning("Extraction %s en échec pour %s: %s", name, url, e)
+                last_error = e
+                continue
+            EXTRACTIONS.inc(extractor=name, outcome="ok")
+            stage.set_attribute("chars", len(text))
+            return text
+    if best_partial:
+        return best_partial
+    if isinstance(last_error, ExtractionInsufficient):
+        raise ValueError(f"Offre introuvable à {url}: {last_error.reason}")
+    raise last_error or ValueError(f"Aucun extracteur configuré pour {url}")
@@ -0,0 +1,54 @@
+# src/files.py - Fichiers locaux compatibles avec les uploads Streamlit
+import mimetypes
+import os
+
+# Types MIME attendus par extract_resume_content / extract_file_content
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".doc": "application/msword",
+    ".txt": "text/plain",
+}
+
+
+def guess_content_type(name: str, content_type: str = None) -> str:
+    """
+    Type MIME d'un fichier: celui annoncé s'il est précis, sinon déduit de l'extension.
+    """
+    if content_type and content_type != "application/octet-stream":
+        return content_type
+    extension = os.path.splitext(name)[1].lower()
+    return MIME_TYPES.get(extension) or mimetypes.guess_type(name)[0] or "text/plain"
+
+
+class LocalFile:
+    """
+    Enveloppe un fichier du disque avec l'interface utilisée par le pipeline
+    (name, type, size, getvalue()), comme un UploadedFile de Streamlit.
+    """
+
+    def __init__(self, path: str, content_type: str = None):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.type = guess_content_type(path, content_type)
+        with open(path, "rb") as f:
+            self._data = f.read()
+        self.size = len(self._data)
+
+    def getvalue(self) -> bytes:
+        return self._data
+
+
+class MemoryFile:
+    """
+    Fichier reçu en mémoire (upload HTTP, tâche en file) avec la même interface que LocalFile.
+    """
+
+    def __init__(self, name: str, data: bytes, content_type: str = None):
+        self.name = name
+        self.type = guess_content_type(name, content_type)
+        self.size = len(data)
+        self._data = data
+
+    def getvalue(self) -> bytes:
+        return self._data
@@ -0,0 +1,77 @@
+# src/letter.py - Lettre découpée en paragraphes adressables
+#
+# La génération renvoie toujours une chaîne (cache, streaming, lot, service et file
+# de tâches l'utilisent telle quelle); les paragraphes sont déduits du texte, séparés
+# par une ligne vide, et leur index sert d'adresse.
+import re
+from typing import Any, Dict, List, Optional
+
+PARAGRAPH_SEPARATOR = re.compile(r"\n\s*\n")
+PARAGRAPH_MARKER = re.compile(r"^\s*\[§\d+\]\s*")
+
+
+def split_paragraphs(letter: str) -> List[str]:
+    """
+    Découpe une lettre en paragraphes (séparés par une ligne vide). L'index d'un
+    paragraphe dans la liste est son adresse pour regenerate_paragraph.
+    """
+    return [paragraph.strip() for paragraph in PARAGRAPH_SEPARATOR.split(letter) if paragraph.strip()]
+
+
+def join_paragraphs(paragraphs: List[str]) -> str:
+    return "\n\n".join(paragraphs)
+
+
+def replace_paragraph(letter: str, index: int, paragraph: str) -> str:
+    """
+    Remplace le paragraphe `index` de la lettre.
+    """
+    paragraphs = split_paragraphs(letter)
+    if not 0 <= index < len(paragraphs):
+        raise IndexError(f"Paragraphe {index} inexistant (la lettre en compte {len(paragraphs)})")
+    paragraphs[index] = paragraph
+    return join_paragraphs(paragraphs)
+
+
+def clean_paragraph(text: str) -> str:
+    """
+    Nettoie la réponse du modèle: marqueur éventuellement recopié, lignes vides
+    internes (le résultat doit rester un seul paragraphe).
+    """
+    text = PARAGRAPH_MARKER.sub("", text.strip().strip('"').strip())
+    return PARAGRAPH_SEPARATOR.sub("\n", text)
+
+
+def build_paragraph_prompt(
+    paragraphs: List[str],
+    index: int,
+    params: Optional[Dict[str, Any]] = None,
+    instructions: str = ""
+) -> str:
+    """
+    Prompt de réécriture d'un seul paragraphe, avec le reste de la lettre comme contexte.
+    """
+    params = params or {}
+    numbered = "\n\n".join(f"[§{number}] {paragraph}" for number, paragraph in enumerate(paragraphs, 1))
+    prompt = f"""
+    Voici une lettre de motivation, découpée en paragraphes numérotés:
+
+    {numbered}
+
+    Réécrivez uniquement le paragraphe [§{index + 1}].
+    - Langue: {params.get('language', 'Français')}
+    - Ton: {params.get('tone', 'Professionnel')}
+    - Gardez une longueur proche de l'original et la cohérence avec les autres paragraphes
+    """
+    if params.get('company_name'):
+        prompt += f"\n- Nom de l'entreprise: {params['company_name']}"
+    if params.get('position_title'):
+        prompt += f"\n- Titre du poste: {params['position_title']}"
+    if instructions:
+        prompt += f"\n- Consignes de l'utilisateur: {instructions}"
+
+    prompt += """
+
+    Répondez uniquement avec le texte du nouveau paragraphe, sans numéro ni commentaire.
+    """
+    return prompt
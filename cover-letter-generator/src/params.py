@@ -0,0 +1,50 @@
+# src/params.py - Options de génération reçues de l'extérieur (service HTTP, file de tâches)
+import functools
+from typing import Any, Dict
+
+
+class InvalidInput(ValueError):
+    """
+    Entrée invalide (paramètres, format de fichier): une nouvelle tentative échouerait aussi.
+    """
+
+
+# Arguments de process_cover_letter_request acceptés dans "params"
+# (les fichiers, clients et callbacks sont fournis par l'appelant)
+RESERVED_PARAMS = {"resume_file", "job_content", "openai_client", "firecrawl_client", "resume_content", "on_event"}
+
+
+@functools.lru_cache(maxsize=None)
+def param_defaults() -> Dict[str, Any]:
+    """
+    Valeurs par défaut des options, lues dans la signature de process_cover_letter_request.
+    """
+    import inspect
+
+    # Import local: core importe InvalidInput depuis ce module
+    from .core import process_cover_letter_request
+
+    return {
+        name: parameter.default
+        for name, parameter in inspect.signature(process_cover_letter_request).parameters.items()
+        if parameter.kind is parameter.POSITIONAL_OR_KEYWORD and name not in RESERVED_PARAMS
+    }
+
+
+def validate_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Vérifie noms et types des options de génération (voir param_defaults).
+    """
+    defaults = param_defaults()
+    unknown = sorted(set(params) - set(defaults))
+    if unknown:
+        raise InvalidInput(f"Paramètres inconnus: {', '.join(unknown)}")
+    for name, value in params.items():
+        default = defaults[name]
+        if name == "timeout":
+            valid = value is None or (isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0)
+        else:
+            valid = isinstance(value, type(default))
+        if not valid:
+            raise InvalidInput(f"Valeur invalide pour {name}: {value!r}")
+    return params
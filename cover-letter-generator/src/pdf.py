@@ -0,0 +1,87 @@
+# src/pdf.py - Extraction page par page des PDF, avec limites de pages et de caractères
+import logging
+import os
+import time
+from io import BytesIO
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Au-delà, le texte serait de toute façon coupé par le budget du prompt (0 = illimité)
+MAX_PDF_PAGES = int(os.getenv('COVER_LETTER_MAX_PDF_PAGES', '30'))
+MAX_PDF_CHARS = int(os.getenv('COVER_LETTER_MAX_PDF_CHARS', '60000'))
+
+PdfSource = Union[bytes, BinaryIO]
+
+
+class PdfPage(NamedTuple):
+    number: int
+    total: int
+    text: str
+    seconds: float
+
+
+class PdfExtraction(NamedTuple):
+    text: str
+    pages: int
+    truncated: bool
+    page_seconds: List[float]
+
+
+def iter_pdf_pages(source: PdfSource, max_pages: int = 0) -> Iterator[PdfPage]:
+    """
+    Extrait le texte d'un PDF une page à la fois, avec la durée de chaque page.
+
+    Les pages ne sont analysées qu'au moment où elles sont demandées: arrêter
+    l'itération évite de traiter le reste du document.
+    """
+    import PyPDF2
+
+    stream = BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    reader = PyPDF2.PdfReader(stream)
+    total = len(reader.pages)
+    for index in range(min(total, max_pages) if max_pages else total):
+        started = time.perf_counter()
+        text = reader.pages[index].extract_text() or ""
+        yield PdfPage(index + 1, total, text, time.perf_counter() - started)
+
+
+def extract_pdf_text(
+    source: PdfSource,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None
+) -> PdfExtraction:
+    """
+    Extrait le texte d'un PDF en s'arrêtant à `max_pages` pages ou `max_chars`
+    caractères (MAX_PDF_PAGES / MAX_PDF_CHARS par défaut, 0 = illimité).
+    """
+    max_pages = MAX_PDF_PAGES if max_pages is None else max_pages
+    max_chars = MAX_PDF_CHARS if max_chars is None else max_chars
+
+    parts: List[str] = []
+    page_seconds: List[float] = []
+    chars = 0
+    truncated = False
+    for page in iter_pdf_pages(source, max_pages):
+        # Pages restantes non lues (limite de pages)
+        truncated = page.number < page.total
+        page_seconds.append(page.seconds)
+        text = page.text + "\n"
+        if max_chars and chars + len(text) > max_chars:
+            parts.append(text[:max_chars - chars])
+            truncated = True
+            break
+        parts.append(text)
+        chars += len(text)
+
+    if truncated:
+        logger.info(
+            "PDF tronqué après %d pages (limites: %s pages, %s caractères)",
+            len(page_seconds), max_pages or "-", max_chars or "-"
+        )
+    if page_seconds:
+        logger.debug(
+            "PDF: %d pages en %.3fs (page la plus lente: %.3fs)",
+            len(page_seconds), sum(page_seconds), max(page_seconds)
+        )
+    return PdfExtraction("".join(parts), len(page_seconds), truncated, page_seconds)
@@ -0,0 +1,152 @@
+# src/ranking.py - Sélection des parties du CV les plus pertinentes pour l'offre
+import math
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+from .tokens import count_tokens
+
+WORD_PATTERN = re.compile(r"[a-zà-öø-ÿ0-9+#]+(?:[.'][a-zà-öø-ÿ0-9+#]+)*")
+BULLET_PATTERN = re.compile(r"^\s*(?:[-•*▪◦·–]|\d+[.)])\s+")
+
+STOPWORDS = frozenset("""
+    a au aux avec ce ces dans de des du elle en et eux il je la le les leur lui ma mais me
+    même mes moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te
+    tes toi ton tu un une vos votre vous c d j l à m n s t y été être avoir est sont
+    an and are as at be by for from has have in is it its of on or that the to was were will
+    with you your we our this their
+""".split())
+
+# Paramètres BM25 usuels
+K1 = 1.5
+B = 0.75
+
+
+class ResumeUnit(NamedTuple):
+    section: int
+    heading: str
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+def _is_heading(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or len(stripped) > 50 or BULLET_PATTERN.match(stripped):
+        return False
+    return stripped.endswith(":") or (stripped.isupper() and any(c.isalpha() for c in stripped))
+
+
+def split_resume(resume_content: str) -> List[ResumeUnit]:
+    """
+    Découpe un CV en unités notables: chaque puce est une unité, les autres lignes
+    d'un même paragraphe sont regroupées. Chaque unité garde le titre de sa section.
+    """
+    units: List[ResumeUnit] = []
+    section, heading = 0, ""
+    paragraph: List[str] = []
+
+    def flush() -> None:
+        if paragraph:
+            units.append(ResumeUnit(section, heading, "\n".join(paragraph)))
+            paragraph.clear()
+
+    for line in resume_content.splitlines():
+        if not line.strip():
+            flush()
+        elif _is_heading(line):
+            flush()
+            section += 1
+            heading = line.strip()
+        elif BULLET_PATTERN.match(line):
+            flush()
+            units.append(ResumeUnit(section, heading, line.rstrip()))
+        else:
+            paragraph.append(line.rstrip())
+    flush()
+    return units
+
+
+def score_units(units: List[ResumeUnit], job_description: str) -> List[float]:
+    """
+    Score BM25 de chaque unité du CV, en utilisant l'offre d'emploi comme requête.
+    Le titre de section est compté avec l'unité.
+    """
+    documents = [Counter(tokenize(f"{unit.heading} {unit.text}")) for unit in units]
+    if not documents:
+        return []
+    lengths = [sum(document.values()) for document in documents]
+    average_length = (sum(lengths) / len(lengths)) or 1.0
+
+    document_frequency: Dict[str, int] = Counter()
+    for document in documents:
+        document_frequency.update(document.keys())
+
+    # Poids de la requête: termes de l'offre, avec un effet de saturation
+    query = {term: 1.0 + math.log(count) for term, count in Counter(tokenize(job_description)).items()}
+    count = len(documents)
+    idf = {
+        term: math.log(1.0 + (count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+        for term in query if term in document_frequency
+    }
+
+    scores = []
+    for document, length in zip(documents, lengths):
+        norm = K1 * (1.0 - B + B * length / average_length)
+        score = 0.0
+        for term, weight in idf.items():
+            frequency = document.get(term)
+            if frequency:
+                score += weight * query[term] * frequency * (K1 + 1.0) / (frequency + norm)
+        scores.append(score)
+    return scores
+
+
+def select_relevant_content(
+    resume_content: str,
+    job_description: str,
+    max_tokens: int,
+    model: str = "gpt-4",
+    keep_units: Optional[int] = 1
+) -> str:
+    """
+    Garde les unités du CV les mieux classées par rapport à l'offre, dans la
+    limite de `max_tokens`, en conservant l'ordre et les titres d'origine.
+
+    Les `keep_units` premières unités (en-tête: nom, contact...) sont toujours gardées.
+    Le CV n'est réduit que s'il dépasse le budget; le budget restant après les unités
+    classées est complété par les unités sans terme commun avec l'offre, dans l'ordre du CV.
+    """
+    units = split_resume(resume_content)
+    sizes = [count_tokens(unit.text, model) for unit in units]
+    if sum(sizes) <= max_tokens:
+        return resume_content.strip()
+    scores = score_units(units, job_description)
+
+    selected = set(range(min(keep_units or 0, len(units))))
+    used = sum(sizes[index] for index in selected)
+    ranked = sorted(
+        (index for index in range(len(units)) if scores[index] > 0),
+        key=lambda index: (-scores[index], index)
+    )
+    unscored = [index for index in range(len(units)) if scores[index] <= 0]
+    for index in ranked + unscored:
+        if index in selected or used + sizes[index] > max_tokens:
+            continue
+        selected.add(index)
+        used += sizes[index]
+
+    lines: List[str] = []
+    current_section = None
+    for index, unit in enumerate(units):
+        if index not in selected:
+            continue
+        if unit.section != current_section:
+            current_section = unit.section
+            if unit.heading:
+                lines.append("")
+                lines.append(unit.heading)
+        lines.append(unit.text)
+    return "\n".join(lines).strip()
@@ -0,0 +1,263 @@
+# src/resilience.py - Délais, reprises et requêtes doublées pour les appels distants
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Codes HTTP pour lesquels une nouvelle tentative a des chances d'aboutir
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Exceptions réseau du SDK OpenAI / httpx, reconnues par leur nom pour ne pas
+# importer ces paquets ici
+RETRYABLE_ERRORS = {
+    "APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout",
+    "ConnectTimeout", "RemoteProtocolError", "ReadError", "PoolTimeout",
+}
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """
+    Le délai global de la requête est dépassé.
+    """
+
+
+class Deadline:
+    """
+    Échéance d'une requête, transmise à toutes ses étapes.
+
+    Chaque étape n'attend jamais plus longtemps que le temps restant; sans
+    délai (timeout=None), les étapes ne sont pas limitées.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    async def run(self, awaitable: Awaitable[Any], stage: str = "requête") -> Any:
+        """
+        Attend `awaitable` dans la limite du temps restant.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return await awaitable
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(f"Délai de {self.timeout:g}s dépassé ({stage})")
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError as e:
+            if isinstance(e, DeadlineExceeded) or not self.expired:
+                raise
+            raise DeadlineExceeded(f"Délai de {self.timeout:g}s dépassé ({stage})") from e
+
+
+class RetryPolicy:
+    """
+    Reprises avec backoff exponentiel et gigue complète ("full jitter").
+
+    Args:
+        max_attempts: Nombre total de tentatives
+        base_delay: Délai de base avant la deuxième tentative (s)
+        max_delay: Plafond du délai entre deux tentatives (s)
+        attempt_timeout: Durée maximale d'une tentative (connexion bloquée), None = illimitée
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        attempt_timeout: Optional[float] = None
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """
+        Délai avant la tentative suivante: Retry-After si le serveur en donne un,
+        sinon un tirage uniforme dans [0, min(max_delay, base_delay * 2^(attempt-1))].
+        """
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay * 4)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Lit l'en-tête Retry-After (ou retry-after-ms) de la réponse d'erreur, s'il existe.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # Date HTTP; une valeur illisible est ignorée (délai de reprise habituel)
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+async def call_with_retries(
+    factory: Callable[[], Awaitable[Any]],
+    policy: Optional["RetryPolicy"] = None,
+    deadline: Optional[Deadline] = None,
+    description: str = "appel"
+) -> Any:
+    """
+    Appelle `factory()` jusqu'à réussite, en reprenant les erreurs transitoires
+    tant que le délai global le permet.
+    """
+    policy = policy or default_retry_policy()
+    deadline = deadline or Deadline()
+    attempt = 0
+    while True:
+        attempt += 1
+        call = factory()
+        if policy.attempt_timeout is not None:
+            call = asyncio.wait_for(call, policy.attempt_timeout)
+        try:
+            return await deadline.run(call, description)
+        except Exception as e:
+            if attempt >= policy.max_attempts or not is_retryable(e):
+                raise
+            delay = policy.backoff(attempt, e)
+            remaining = deadline.remaining()
+            if remaining is not None and delay >= remaining:
+                raise
+            logger.warning(
+                "%s: tentative %d échouée (%s: %s), nouvel essai dans %.2fs",
+                description, attempt, type(e).__name__, e, delay
+            )
+            await asyncio.sleep(delay)
+
+
+async def hedged(
+    factory: Callable[[], Awaitable[Any]],
+    hedge_after: Optional[float],
+    on_discard: Optional[Callable[[Any], Awaitable[None]]] = None
+) -> Any:
+    """
+    Lance `factory()`; s'il n'a pas abouti après `hedge_after` secondes, lance un
+    second appel identique et garde le premier qui réussit. L'autre est annulé
+    (ou passé à `on_discard` s'il a déjà abouti, pour libérer ses ressources).
+    """
+    first = asyncio.ensure_future(factory())
+    tasks = {first}
+    winner = None
+    # Tout ce qui suit est dans le try: si l'appelant est annulé (déconnexion, délai
+    # global), les appels en cours sont annulés et ceux déjà aboutis libérés
+    try:
+        if hedge_after:
+            done, _ = await asyncio.wait({first}, timeout=hedge_after)
+            if not done:
+                logger.info("Pas de réponse après %.2fs, envoi d'une requête doublée", hedge_after)
+                tasks.add(asyncio.ensure_future(factory()))
+        last = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    winner = task
+                    return task.result()
+                last = task
+        # Aucun appel n'a réussi: erreur du dernier
+        return last.result()
+    finally:
+        for task in tasks:
+            if task is winner:
+                continue
+            if not task.done():
+                task.cancel()
+            elif on_discard is not None and not task.cancelled() and task.exception() is None:
+                await on_discard(task.result())
+
+
+class LatencyTracker:
+    """
+    Fenêtre glissante des latences observées, pour calculer des percentiles.
+    Avec `max_age`, les mesures plus anciennes que `max_age` secondes sont oubliées.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, max_age: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.min_samples = min_samples
+        self.max_age = max_age
+        self.clock = clock
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append((self.clock(), seconds))
+
+    def percentile(self, q: float) -> Optional[float]:
+        if self.max_age is not None:
+            oldest = self.clock() - self.max_age
+            while self._samples and self._samples[0][0] < oldest:
+                self._samples.popleft()
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(seconds for _, seconds in self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def default_retry_policy() -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=int(os.getenv('COVER_LETTER_MAX_ATTEMPTS', '4')),
+        attempt_timeout=float(os.getenv('COVER_LETTER_ATTEMPT_TIMEOUT', '0')) or None
+    )
+
+
+def hedge_delay(tracker: LatencyTracker) -> Optional[float]:
+    """
+    Délai avant la requête doublée: p95 observé, ou COVER_LETTER_HEDGE_AFTER tant
+    qu'il n'y a pas assez de mesures. Désactivé sauf si COVER_LETTER_HEDGE=1
+    (la requête doublée est facturée).
+    """
+    if os.getenv('COVER_LETTER_HEDGE', '0').lower() not in ("1", "true", "yes", "on"):
+        return None
+    return tracker.percentile(0.95) or float(os.getenv('COVER_LETTER_HEDGE_AFTER', '8'))
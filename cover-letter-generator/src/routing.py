@@ -0,0 +1,212 @@
+# src/routing.py - Choix du modèle selon la demande, avec repli et statistiques par modèle
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .resilience import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class ModelTier(NamedTuple):
+    name: str
+    model: str
+    max_tokens: int
+    # Au-delà de ce p95 (s), le modèle est considéré comme lent et passe en repli
+    latency_budget: float
+
+
+# Longueurs et templates qu'un modèle rapide rédige correctement
+FAST_LENGTHS = frozenset({"Courte (250-300 mots)"})
+FAST_TEMPLATES = frozenset({"Classique", "Moderne", "Commercial"})
+
+# Nombre d'erreurs consécutives qui écartent un modèle, et pendant combien de temps (s)
+MAX_CONSECUTIVE_ERRORS = 3
+ERROR_COOLDOWN = 60.0
+# Durée (s) pendant laquelle une latence compte dans le p95: un modèle écarté pour
+# lenteur ne reçoit plus de trafic, il redevient candidat quand ses mesures expirent
+LATENCY_WINDOW = float(os.getenv('COVER_LETTER_LATENCY_WINDOW', '300'))
+
+
+class ModelStats:
+    """
+    Latences, erreurs et tokens observés pour un modèle.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.last_error_at = 0.0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = LatencyTracker(max_age=LATENCY_WINDOW, clock=clock)
+        self.first_chunk_latency = LatencyTracker(max_age=LATENCY_WINDOW, clock=clock)
+
+    def healthy(self, tier: ModelTier) -> bool:
+        if (self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS
+                and self.clock() - self.last_error_at < ERROR_COOLDOWN):
+            return False
+        # Génération complète, et premier fragment des générations en streaming
+        for tracker in (self.latency, self.first_chunk_latency):
+            p95 = tracker.percentile(0.95)
+            if p95 is not None and p95 > tier.latency_budget:
+                return False
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'consecutive_errors': self.consecutive_errors,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_prompt_tokens': self.cached_prompt_tokens,
+            'prompt_cache_ratio': self.cached_prompt_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            'completion_tokens': self.completion_tokens,
+            'latency_p50': self.latency.percentile(0.5),
+            'latency_p95': self.latency.percentile(0.95),
+            'first_chunk_p95': self.first_chunk_latency.percentile(0.95),
+        }
+
+
+class ModelRouter:
+    """
+    Associe chaque demande à une liste ordonnée de modèles: le premier est le
+    modèle visé, les suivants servent de repli s'il est en erreur ou trop lent.
+
+    - brouillon, ou lettre courte avec un template simple: tier "fast";
+    - sinon (version finale): tier "premium".
+    Un modèle en erreur répétée (pendant ERROR_COOLDOWN) ou dont le p95 sur les
+    LATENCY_WINDOW dernières secondes dépasse son budget passe en dernier.
+    """
+
+    def __init__(self, tiers: List[ModelTier], enabled: bool = True,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tiers = {tier.name: tier for tier in tiers}
+        self.enabled = enabled
+        self.clock = clock
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def stats_for(self, model: str) -> ModelStats:
+        with self._lock:
+            if model not in self._stats:
+                self._stats[model] = ModelStats(self.clock)
+            return self._stats[model]
+
+    def preferred_tier(self, generation_params: Dict[str, Any], draft: bool = False) -> str:
+        if not self.enabled:
+            return "premium"
+        if draft:
+            return "fast"
+        if (generation_params.get('length') in FAST_LENGTHS
+                and generation_params.get('template') in FAST_TEMPLATES):
+            return "fast"
+        return "premium"
+
+    def route(self, generation_params: Dict[str, Any], draft: bool = False) -> List[ModelTier]:
+        """
+        Renvoie les tiers à essayer dans l'ordre.
+        """
+        preferred = self.preferred_tier(generation_params, draft)
+        order = [preferred] + [name for name in ("premium", "fast") if name != preferred]
+        candidates = [self.tiers[name] for name in order if name in self.tiers]
+        if not self.enabled:
+            return candidates[:1]
+
+        healthy = [tier for tier in candidates if self.stats_for(tier.model).healthy(tier)]
+        degraded = [tier for tier in candidates if tier not in healthy]
+        if degraded and healthy and degraded[0] is candidates[0]:
+            logger.info("Modèle %s lent ou en erreur, repli sur %s", degraded[0].model, healthy[0].model)
+        return healthy + degraded
+
+    def record_success(self, model: str, latency: Optional[float] = None, usage: Any = None) -> None:
+        """
+        `latency`: durée de l'appel réussi (sans reprises ni repli). Sans latence (flux,
+        dont la durée dépend du lecteur), seul le premier fragment est mesuré (record_first_chunk).
+        """
+        stats = self.stats_for(model)
+        with self._lock:
+            stats.requests += 1
+            stats.consecutive_errors = 0
+            if latency is not None:
+                stats.latency.record(latency)
+        if usage is not None:
+            self.record_usage(model, usage)
+
+    def record_first_chunk(self, model: str, latency: float) -> None:
+        self.stats_for(model).first_chunk_latency.record(latency)
+
+    def record_usage(self, model: str, usage: Any) -> None:
+        stats = self.stats_for(model)
+        with self._lock:
+            stats.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+            stats.cached_prompt_tokens += cached_tokens(usage)
+            stats.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+    def record_error(self, model: str) -> None:
+        stats = self.stats_for(model)
+        with self._lock:
+            stats.requests += 1
+            stats.errors += 1
+            stats.consecutive_errors += 1
+            stats.last_error_at = stats.clock()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            models = list(self._stats.items())
+        return {model: stats.snapshot() for model, stats in models}
+
+
+def cached_tokens(usage: Any) -> int:
+    """
+    Tokens du prompt servis par le cache de préfixe du fournisseur
+    (usage.prompt_tokens_details.cached_tokens), 0 s'ils ne sont pas renvoyés.
+    """
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return getattr(details, 'cached_tokens', 0) or 0
+
+
+def default_tiers() -> List[ModelTier]:
+    max_tokens = int(os.getenv('COVER_LETTER_MAX_TOKENS', '1000'))
+    return [
+        ModelTier(
+            "premium",
+            os.getenv('COVER_LETTER_PREMIUM_MODEL', 'gpt-4'),
+            max_tokens,
+            float(os.getenv('COVER_LETTER_PREMIUM_LATENCY_BUDGET', '60'))
+        ),
+        ModelTier(
+            "fast",
+            os.getenv('COVER_LETTER_FAST_MODEL', 'gpt-3.5-turbo'),
+            max_tokens,
+            float(os.getenv('COVER_LETTER_FAST_LATENCY_BUDGET', '20'))
+        ),
+    ]
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """
+    Renvoie le routeur partagé, configuré par les variables d'environnement
+    COVER_LETTER_*_MODEL et COVER_LETTER_ROUTING (0 = toujours le modèle premium).
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            enabled = os.getenv('COVER_LETTER_ROUTING', '1').lower() not in ("0", "false", "no", "off")
+            _router = ModelRouter(default_tiers(), enabled=enabled)
+        return _router
+
+
+def set_router(router: Optional[ModelRouter]) -> None:
+    global _router
+    with _router_lock:
+        _router = router
@@ -0,0 +1,99 @@
+# src/runtime.py - Boucle d'événements partagée pour les appels asynchrones
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+
+class BackgroundRuntime:
+    """
+    Boucle asyncio qui tourne dans un thread dédié pendant toute la vie du processus.
+
+    Les scripts synchrones (Streamlit, CLI) y soumettent leurs coroutines au lieu
+    d'appeler asyncio.run() à chaque requête: les clients HTTP asynchrones et leurs
+    connexions keep-alive restent ainsi valides d'une requête à l'autre.
+    """
+
+    def __init__(self, name: str = "cover-letter-runtime"):
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(self, coroutine: Coroutine[Any, Any, Any]) -> Future:
+        """
+        Planifie une coroutine sur la boucle partagée et renvoie un Future thread-safe.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """
+        Exécute une coroutine sur la boucle partagée et attend son résultat.
+        """
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def iterate(self, iterator: AsyncIterator[Any]) -> Iterator[Any]:
+        """
+        Parcourt un générateur asynchrone depuis un thread synchrone, élément par élément.
+
+        Si l'appelant s'arrête en cours de route (exception, rerun Streamlit),
+        le générateur est annulé sur la boucle partagée.
+        """
+        items: "queue.Queue" = queue.Queue()
+
+        async def pump() -> None:
+            try:
+                async for item in iterator:
+                    items.put(("item", item))
+                items.put(("end", None))
+            except BaseException as e:
+                items.put(("error", e))
+                raise
+
+        future = self.submit(pump())
+        try:
+            while True:
+                kind, value = items.get()
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_runtime: Optional[BackgroundRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> BackgroundRuntime:
+    """
+    Renvoie la boucle partagée du processus, en la démarrant au premier appel.
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = BackgroundRuntime()
+        return _runtime
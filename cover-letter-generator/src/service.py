@@ -0,0 +1,489 @@
+# src/service.py - Service HTTP (ASGI) autour de process_cover_letter_request
+#
+# Lancement: python serve.py --workers 4 (voir serve.py). Nécessite starlette,
+# python-multipart et uvicorn.
+#
+# - POST /generate (multipart/form-data):
+#     resume    fichier du CV (PDF, DOCX, TXT)
+#     job       URL ou texte de l'offre, ou job_file: fichier de l'offre
+#     params    objet JSON optionnel, mêmes noms que les arguments de
+#               process_cover_letter_request (tone, length, company_name, draft, timeout...)
+#     stream    "true" pour une réponse SSE (aussi avec Accept: text/event-stream)
+#   Réponse JSON {"cover_letter", "elapsed", "stages"}, ou événements SSE
+#   progress / delta / done / error.
+# - POST /tasks: mêmes champs (sans stream), plus une clé d'idempotence (en-tête
+#   Idempotency-Key ou champ idempotency_key); la génération est mise en file
+#   (voir src/taskqueue.py et worker.py) et la réponse 202 donne l'identifiant de la tâche.
+# - GET /tasks/{id}: statut de la tâche et, une fois terminée, la lettre (result)
+# - GET /healthz: 200, ou 503 dès la réception de SIGTERM pour que le répartiteur
+#   retire l'instance avant que le serveur cesse d'écouter
+# - GET /metrics: métriques du processus au format Prometheus (voir src/telemetry.py).
+#   Absente avec plusieurs workers (serve.py --workers > 1): chaque processus ne tient
+#   que ses propres compteurs et le scrape tomberait sur un worker au hasard. Pour des
+#   métriques, lancer un processus par port (--workers 1) et les scraper chacun.
+#
+# Admission (par processus, donc par worker):
+# - COVER_LETTER_SERVICE_CONCURRENCY: générations simultanées (défaut 16)
+# - COVER_LETTER_SERVICE_QUEUE: requêtes en attente d'une place; au-delà, 503 immédiat (défaut 32)
+# - COVER_LETTER_SERVICE_QUEUE_TIMEOUT: attente maximale d'une place avant 503 (défaut 30 s)
+# - COVER_LETTER_SERVICE_DRAIN_DELAY: délai entre SIGTERM et l'arrêt de l'écoute (défaut 5 s)
+# - COVER_LETTER_SERVICE_DRAIN_TIMEOUT: délai laissé aux requêtes en cours à l'arrêt (défaut 30 s)
+# - COVER_LETTER_SERVICE_MAX_UPLOAD: taille maximale d'un fichier reçu (octets, défaut 10 Mo)
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import signal
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple, Union
+
+from . import events, telemetry
+from .clients import create_firecrawl_client, create_openai_client
+from .core import process_cover_letter_request, stream_cover_letter_request
+from .files import MemoryFile
+from .params import InvalidInput, validate_params
+from .resilience import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv('COVER_LETTER_SERVICE_CONCURRENCY', '16'))
+MAX_QUEUE = int(os.getenv('COVER_LETTER_SERVICE_QUEUE', '32'))
+QUEUE_TIMEOUT = float(os.getenv('COVER_LETTER_SERVICE_QUEUE_TIMEOUT', '30'))
+DRAIN_TIMEOUT = float(os.getenv('COVER_LETTER_SERVICE_DRAIN_TIMEOUT', '30'))
+# Sur SIGTERM, délai (s) pendant lequel /healthz répond 503 avant que le serveur
+# cesse d'écouter, pour que le répartiteur de charge retire l'instance
+DRAIN_DELAY = float(os.getenv('COVER_LETTER_SERVICE_DRAIN_DELAY', '5'))
+MAX_UPLOAD_BYTES = int(os.getenv('COVER_LETTER_SERVICE_MAX_UPLOAD', str(10 * 2 ** 20)))
+# Champs texte (offre, params): au plus MAX_FIELD_BYTES chacun; une requête contient
+# au plus deux fichiers (CV et offre)
+MAX_FIELD_BYTES = 2 ** 20
+MAX_FORM_FIELDS = 16
+MAX_REQUEST_BYTES = 2 * MAX_UPLOAD_BYTES + 4 * MAX_FIELD_BYTES
+
+IN_FLIGHT = telemetry.register(telemetry.Gauge(
+    "cover_letter_service_in_flight", "Générations en cours dans ce processus"
+))
+QUEUED = telemetry.register(telemetry.Gauge(
+    "cover_letter_service_queued", "Requêtes en attente d'une place de génération"
+))
+REJECTED = telemetry.register(telemetry.Counter(
+    "cover_letter_service_rejected_total", "Requêtes refusées (503) par le contrôle d'admission", ("reason",)
+))
+REQUESTS = telemetry.register(telemetry.Counter(
+    "cover_letter_service_requests_total", "Requêtes /generate terminées", ("status",)
+))
+
+
+class Overloaded(Exception):
+    """
+    Requête refusée faute de place (file pleine, attente trop longue, arrêt en cours).
+    """
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Service surchargé ({reason})")
+
+
+class AdmissionControl:
+    """
+    Limite le nombre de générations simultanées et la longueur de la file d'attente.
+
+    Une requête attend une place au plus `queue_timeout` secondes; si `max_queue`
+    requêtes attendent déjà, elle est refusée tout de suite. Pendant l'arrêt
+    (drain), les nouvelles requêtes sont refusées et les requêtes en cours terminent.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.draining = False
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def acquire(self) -> None:
+        if self.draining:
+            self._reject("draining")
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self._reject("queue_full")
+        self.waiting += 1
+        QUEUED.inc()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout or None)
+        except asyncio.TimeoutError:
+            self._reject("queue_timeout")
+        finally:
+            self.waiting -= 1
+            QUEUED.dec()
+        self.in_flight += 1
+        IN_FLIGHT.inc()
+        self._idle.clear()
+
+    def release(self) -> None:
+        self._semaphore.release()
+        self.in_flight -= 1
+        IN_FLIGHT.dec()
+        if self.in_flight == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """
+        Refuse les nouvelles requêtes et attend la fin de celles en cours.
+        Renvoie False si des requêtes tournaient encore après `timeout` secondes.
+        """
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout or None)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def install_drain_signal(self, delay: float = DRAIN_DELAY) -> Callable[[], None]:
+        """
+        Sur SIGTERM, passe en drain tout de suite (/healthz répond 503) et ne transmet
+        le signal au gestionnaire précédent (arrêt d'uvicorn) qu'après `delay` secondes:
+        le serveur accepte encore les connexions pendant que le répartiteur de charge
+        retire l'instance. Un second SIGTERM est transmis immédiatement.
+        Renvoie la fonction qui restaure le gestionnaire précédent.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return lambda: None
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def forward(signum, frame) -> None:
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                signal.signal(signal.SIGTERM, previous)
+                signal.raise_signal(signal.SIGTERM)
+
+        def handle(signum, frame) -> None:
+            if self.draining:
+                forward(signum, frame)
+                return
+            self.draining = True
+            logger.info("SIGTERM reçu: drain, arrêt dans %.0f s", delay)
+            loop.call_soon_threadsafe(loop.call_later, delay, forward, signum, frame)
+
+        signal.signal(signal.SIGTERM, handle)
+        return lambda: signal.signal(signal.SIGTERM, previous)
+
+    def _reject(self, reason: str) -> None:
+        REJECTED.inc(reason=reason)
+        # Estimation grossière: une génération libère une place toutes les quelques secondes
+        retry_after = 1.0 + self.waiting / max(1, self.max_concurrency)
+        raise Overloaded(reason, retry_after)
+
+
+def parse_params(raw: Optional[str]) -> Dict[str, Any]:
+    """
+    Lit et valide le champ "params" (objet JSON) d'une requête /generate.
+    """
+    if not raw:
+        return {}
+    try:
+        params = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise InvalidInput(f"params n'est pas un JSON valide: {e}")
+    if not isinstance(params, dict):
+        raise InvalidInput("params doit être un objet JSON")
+    return validate_params(params)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _error_status(error: Exception) -> int:
+    if isinstance(error, (DeadlineExceeded, asyncio.TimeoutError)):
+        return 504
+    if isinstance(error, InvalidInput):
+        return 422
+    return 502
+
+
+def create_app(
+    openai_client=None,
+    firecrawl_client=None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    max_queue: int = MAX_QUEUE,
+    queue_timeout: float = QUEUE_TIMEOUT,
+    drain_timeout: float = DRAIN_TIMEOUT,
+    drain_delay: float = DRAIN_DELAY,
+    task_queue=None,
+    expose_metrics: bool = True
+):
+    """
+    Construit l'application ASGI. Sans clients fournis, ils sont créés au
+    démarrage de chaque worker à partir de l'environnement (OPENAI_API_KEY...).
+    `task_queue` est la file des routes /tasks (get_task_queue() par défaut).
+    `expose_metrics`: ajoute la route /metrics (métriques de ce seul processus).
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+    from starlette.routing import Route
+
+    class SlotStreamingResponse(StreamingResponse):
+        """
+        Réponse en streaming qui libère la place de génération quand elle se
+        termine, même si le client se déconnecte avant le premier fragment.
+        """
+
+        def __init__(self, content, admission: AdmissionControl, **kwargs):
+            super().__init__(content, **kwargs)
+            self.admission = admission
+
+        async def __call__(self, scope, receive, send) -> None:
+            try:
+                await super().__call__(scope, receive, send)
+            finally:
+                self.admission.release()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        state = app.state
+        state.admission = AdmissionControl(max_concurrency, max_queue, queue_timeout)
+        state.task_queue = task_queue
+        state.openai_client = openai_client or create_openai_client()
+        state.firecrawl_client = firecrawl_client or create_firecrawl_client()
+        if state.openai_client is None:
+            raise RuntimeError("OPENAI_API_KEY manquante")
+        logger.info(
+            "Service prêt (pid %d): %d générations simultanées, file de %d",
+            os.getpid(), max_concurrency, max_queue
+        )
+        restore_signal = state.admission.install_drain_signal(drain_delay)
+        try:
+            yield
+        finally:
+            restore_signal()
+            if not await state.admission.drain(drain_timeout):
+                logger.warning("Arrêt avec %d générations encore en cours", state.admission.in_flight)
+            if openai_client is None:
+                await state.openai_client.close()
+
+    def overloaded_response(error: Overloaded):
+        return JSONResponse(
+            {'error': str(error), 'reason': error.reason}, status_code=503,
+            headers={'Retry-After': str(math.ceil(error.retry_after))}
+        )
+
+    async def generate(request):
+        state = request.app.state
+        try:
+            resume_file, job_content, params, fields = await _read_form(request)
+            stream = str(fields.get("stream", "")).lower() in ("1", "true", "yes") \
+                or "text/event-stream" in request.headers.get("accept", "")
+        except _UploadTooLarge as e:
+            REQUESTS.inc(status="413")
+            return JSONResponse({'error': str(e)}, status_code=413)
+        except ValueError as e:
+            REQUESTS.inc(status="400")
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        try:
+            await state.admission.acquire()
+        except Overloaded as e:
+            REQUESTS.inc(status="503")
+            return overloaded_response(e)
+
+        if stream:
+            return SlotStreamingResponse(
+                _stream_letter(state, resume_file, job_content, params),
+                state.admission,
+                media_type="text/event-stream",
+                headers={'Cache-Control': "no-cache", 'X-Accel-Buffering': "no"}
+            )
+
+        try:
+            stages: Dict[str, float] = {}
+            started = time.perf_counter()
+            cover_letter = await process_cover_letter_request(
+                resume_file, job_content, state.openai_client, state.firecrawl_client,
+                on_event=lambda event: _record_stage(stages, event),
+                **params
+            )
+        except Exception as e:
+            status = _error_status(e)
+            REQUESTS.inc(status=str(status))
+            return JSONResponse({'error': str(e), 'type': type(e).__name__}, status_code=status)
+        finally:
+            state.admission.release()
+
+        REQUESTS.inc(status="200")
+        return JSONResponse({
+            'cover_letter': cover_letter,
+            'elapsed': round(time.perf_counter() - started, 3),
+            'stages': stages,
+        })
+
+    def get_queue(state):
+        # Ouverte à la première tâche: le service n'en a pas besoin pour /generate
+        if state.task_queue is None:
+            from .taskqueue import get_task_queue
+            state.task_queue = get_task_queue()
+        return state.task_queue
+
+    async def submit_task(request):
+        try:
+            resume_file, job_content, params, fields = await _read_form(request)
+        except _UploadTooLarge as e:
+            return JSONResponse({'error': str(e)}, status_code=413)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        key = request.headers.get("idempotency-key") or fields.get("idempotency_key") or None
+        queue = get_queue(request.app.state)
+        if key is not None:
+            existing = await asyncio.to_thread(queue.get_by_key, key)
+            if existing is not None:
+                return JSONResponse(existing.to_dict(), status_code=200)
+        task = await asyncio.to_thread(queue.submit, resume_file, job_content, params, key)
+        return JSONResponse(
+            task.to_dict(), status_code=202, headers={'Location': f"/tasks/{task.id}"}
+        )
+
+    async def get_task(request):
+        task = await asyncio.to_thread(get_queue(request.app.state).get, request.path_params["task_id"])
+        if task is None:
+            return JSONResponse({'error': "Tâche inconnue"}, status_code=404)
+        return JSONResponse(task.to_dict())
+
+    async def healthz(request):
+        admission = request.app.state.admission
+        body = {
+            'status': "draining" if admission.draining else "ok",
+            'in_flight': admission.in_flight,
+            'queued': admission.waiting,
+        }
+        return JSONResponse(body, status_code=503 if admission.draining else 200)
+
+    async def metrics(request):
+        # Profondeur de la file, si ce processus l'utilise
+        if request.app.state.task_queue is not None:
+            await asyncio.to_thread(request.app.state.task_queue.refresh_metrics)
+        return PlainTextResponse(
+            telemetry.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+    routes = [
+        Route("/generate", generate, methods=["POST"]),
+        Route("/tasks", submit_task, methods=["POST"]),
+        Route("/tasks/{task_id}", get_task),
+        Route("/healthz", healthz),
+    ]
+    if expose_metrics:
+        routes.append(Route("/metrics", metrics))
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+class _UploadTooLarge(Exception):
+    pass
+
+
+async def _read_form(request) -> Tuple[MemoryFile, Union[str, MemoryFile], Dict[str, Any], Dict[str, str]]:
+    """
+    Lit le formulaire d'une génération: CV, offre (texte/URL ou fichier), options,
+    et les autres champs texte.
+    """
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_REQUEST_BYTES:
+        raise _UploadTooLarge(f"Requête trop volumineuse (max {MAX_REQUEST_BYTES} octets)")
+    form = await _limit_body(request, MAX_REQUEST_BYTES).form(
+        max_files=2, max_fields=MAX_FORM_FIELDS, max_part_size=MAX_FIELD_BYTES
+    )
+    try:
+        upload = form.get("resume")
+        if upload is None or isinstance(upload, str):
+            raise InvalidInput("Champ 'resume' manquant (fichier du CV)")
+        resume_file = await _read_upload(upload)
+        job_content = form.get("job")
+        job_file = form.get("job_file")
+        if job_file is not None and not isinstance(job_file, str):
+            job_content = await _read_upload(job_file)
+        params = parse_params(form.get("params"))
+        fields = {key: value for key, value in form.items() if isinstance(value, str)}
+    finally:
+        await form.close()
+    if not job_content:
+        raise InvalidInput("Champ 'job' (URL ou texte) ou 'job_file' manquant")
+    return resume_file, job_content, params, fields
+
+
+def _limit_body(request, limit: int):
+    """
+    Requête dont la lecture du corps s'interrompt au-delà de `limit` octets
+    (corps envoyé sans Content-Length, ou plus long qu'annoncé).
+    """
+    from starlette.requests import Request
+
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        received += len(message.get("body", b""))
+        if received > limit:
+            raise _UploadTooLarge(f"Requête trop volumineuse (max {limit} octets)")
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def _read_upload(upload) -> MemoryFile:
+    data = await upload.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise _UploadTooLarge(f"Fichier {upload.filename} trop volumineux (max {MAX_UPLOAD_BYTES} octets)")
+    return MemoryFile(upload.filename or "upload", data, upload.content_type)
+
+
+def _record_stage(stages: Dict[str, float], event: Dict[str, Any]) -> None:
+    if 'duration' in event:
+        stages[event['stage']] = round(event['duration'], 3)
+
+
+async def _stream_letter(state, resume_file, job_content, params: Dict[str, Any]) -> AsyncIterator[str]:
+    """
+    Événements SSE d'une génération: progress (étapes), delta (texte), puis done ou error.
+    """
+    stats: Dict[str, Any] = {}
+    parts = []
+    try:
+        async for kind, value in events.stream_with_events(
+            lambda on_event: stream_cover_letter_request(
+                resume_file, job_content, state.openai_client, state.firecrawl_client,
+                stats=stats, on_event=on_event, **params
+            )
+        ):
+            if kind == "delta":
+                parts.append(value)
+                yield _sse("delta", {'text': value})
+            else:
+                yield _sse("progress", value)
+    except Exception as e:
+        # Les en-têtes (200) sont déjà partis: l'erreur est signalée dans le flux
+        REQUESTS.inc(status=str(_error_status(e)))
+        yield _sse("error", {'error': str(e), 'type': type(e).__name__, 'status': _error_status(e)})
+        return
+    REQUESTS.inc(status="200")
+    yield _sse("done", {'cover_letter': "".join(parts), 'stats': stats})
+
+
+def create_default_app():
+    """
+    Point d'entrée des workers uvicorn (voir serve.py): configuration depuis l'environnement.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    # Nombre de workers transmis par serve.py: métriques par processus seulement avec un worker
+    workers = int(os.getenv('COVER_LETTER_SERVICE_WORKERS', '1'))
+    return create_app(expose_metrics=workers <= 1)
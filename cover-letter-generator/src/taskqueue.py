@@ -0,0 +1,517 @@
+# src/taskqueue.py - File de tâches persistante (SQLite) pour les générations en arrière-plan
+#
+# - submit() enregistre une génération (CV, offre, options) et rend la main tout de suite;
+#   une même clé d'idempotence renvoie toujours la même tâche.
+# - Les workers (WorkerPool, lancé par worker.py) réservent les tâches pour
+#   `visibility_timeout` secondes et prolongent la réservation tant qu'ils travaillent.
+#   Une tâche dont le worker a disparu redevient visible: livraison « au moins une fois ».
+# - Après `max_attempts` échecs (ou une entrée invalide), la tâche passe en lettre
+#   morte (statut "dead"); requeue() la relance.
+# - Les tâches terminées ou mortes (et la lettre produite) sont supprimées après
+#   `COVER_LETTER_QUEUE_RETENTION` secondes, avec les CV et offres qu'aucune tâche ne
+#   référence plus (purge(), lancée par WorkerPool au démarrage puis toutes les heures).
+#   Leur clé d'idempotence est alors libérée.
+#
+# Configuration:
+# - COVER_LETTER_QUEUE_PATH: fichier SQLite (défaut: <cache>/tasks.sqlite)
+# - COVER_LETTER_QUEUE_WORKERS: générations simultanées par processus worker (défaut 4)
+# - COVER_LETTER_QUEUE_VISIBILITY_TIMEOUT: durée d'une réservation (défaut 300 s)
+# - COVER_LETTER_QUEUE_MAX_ATTEMPTS: tentatives avant lettre morte (défaut 5)
+# - COVER_LETTER_QUEUE_RETENTION: conservation des tâches terminées (défaut 7 jours, 0: illimitée)
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from . import telemetry
+from .cache import default_cache_dir
+from .core import process_cover_letter_request
+from .files import MemoryFile
+from .params import InvalidInput, validate_params
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+STATUSES = (QUEUED, RUNNING, DONE, DEAD)
+
+WORKERS = int(os.getenv('COVER_LETTER_QUEUE_WORKERS', '4'))
+VISIBILITY_TIMEOUT = float(os.getenv('COVER_LETTER_QUEUE_VISIBILITY_TIMEOUT', '300'))
+MAX_ATTEMPTS = int(os.getenv('COVER_LETTER_QUEUE_MAX_ATTEMPTS', '5'))
+RETENTION = float(os.getenv('COVER_LETTER_QUEUE_RETENTION', str(7 * 24 * 3600)))
+POLL_INTERVAL = 0.5
+PURGE_INTERVAL = 3600.0
+# Délai avant une nouvelle tentative: RETRY_DELAY * 2^(tentatives - 1), plafonné
+RETRY_DELAY = 5.0
+MAX_RETRY_DELAY = 300.0
+
+QUEUE_DEPTH = telemetry.register(telemetry.Gauge(
+    "cover_letter_queue_tasks", "Tâches de la file par statut", ("status",)
+))
+WORKERS_TOTAL = telemetry.register(telemetry.Gauge(
+    "cover_letter_queue_workers", "Workers de la file dans ce processus"
+))
+WORKERS_BUSY = telemetry.register(telemetry.Gauge(
+    "cover_letter_queue_workers_busy", "Workers occupés par une tâche"
+))
+WORKER_BUSY_SECONDS = telemetry.register(telemetry.Counter(
+    "cover_letter_queue_worker_busy_seconds_total",
+    "Temps passé sur des tâches (utilisation = taux / cover_letter_queue_workers)"
+))
+TASK_OUTCOMES = telemetry.register(telemetry.Counter(
+    "cover_letter_queue_task_outcomes_total", "Fins de tentative (done, retry, dead, released)", ("outcome",)
+))
+TASK_WAIT = telemetry.register(telemetry.Histogram(
+    "cover_letter_queue_wait_seconds", "Attente entre la soumission et la première prise en charge"
+))
+
+
+class Task(NamedTuple):
+    id: str
+    status: str
+    job: Optional[str]
+    params: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    idempotency_key: Optional[str]
+    result: Optional[str]
+    error: Optional[str]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+class Lease(NamedTuple):
+    """
+    Tâche réservée par un worker. `token` identifie la réservation: une fois
+    expirée et reprise par un autre worker, l'ancienne ne peut plus conclure la tâche.
+    """
+    task: Task
+    token: str
+    resume_file: MemoryFile
+    job_file: Optional[MemoryFile]
+
+
+TASK_COLUMNS = (
+    "id, status, job, params, attempts, max_attempts, idempotency_key, "
+    "result, error, created_at, started_at, finished_at"
+)
+
+
+def _row_to_task(row) -> Task:
+    return Task(*row[:3], json.loads(row[3]), *row[4:])
+
+
+def default_queue_path() -> str:
+    return os.getenv('COVER_LETTER_QUEUE_PATH', os.path.join(default_cache_dir(), "tasks.sqlite"))
+
+
+class TaskQueue:
+    """
+    File de tâches dans une base SQLite partagée par le service HTTP et les workers
+    (plusieurs processus possibles sur une même machine).
+    """
+
+    def __init__(self, path: Optional[str] = None, visibility_timeout: float = VISIBILITY_TIMEOUT,
+                 max_attempts: int = MAX_ATTEMPTS, retention: float = RETENTION):
+        self.path = path or default_queue_path()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Fichiers (CV, offres) stockés une fois par contenu: un lot réutilise le même CV
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "digest TEXT PRIMARY KEY, name TEXT NOT NULL, content_type TEXT NOT NULL, data BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, job TEXT, params TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+            "idempotency_key TEXT UNIQUE, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "resume_digest TEXT NOT NULL, job_digest TEXT, visible_at REAL NOT NULL, lease TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_visible ON tasks (status, visible_at)")
+
+    def submit(
+        self,
+        resume_file,
+        job: Union[str, Any],
+        params: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> Task:
+        """
+        Ajoute une génération à la file. `job` est une URL, un texte ou un fichier.
+
+        Si `idempotency_key` a déjà été soumise, la tâche existante est renvoyée
+        telle quelle (les autres arguments sont ignorés).
+        """
+        params = validate_params(params or {})
+        now = time.time()
+        task_id = uuid.uuid4().hex
+        job_file = None if isinstance(job, str) else job
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if idempotency_key is not None:
+                    row = self._conn.execute(
+                        f"SELECT {TASK_COLUMNS} FROM tasks WHERE idempotency_key = ?", (idempotency_key,)
+                    ).fetchone()
+                    if row is not None:
+                        self._conn.execute("COMMIT")
+                        return _row_to_task(row)
+                resume_digest = self._store_file(resume_file)
+                job_digest = self._store_file(job_file) if job_file is not None else None
+                self._conn.execute(
+                    "INSERT INTO tasks (id, status, job, params, max_attempts, idempotency_key, "
+                    "created_at, resume_digest, job_digest, visible_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task_id, QUEUED, None if job_file is not None else job, json.dumps(params),
+                     max_attempts or self.max_attempts, idempotency_key, now, resume_digest, job_digest, now)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(task_id)
+
+    def _store_file(self, file) -> str:
+        data = file.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        self._conn.execute(
+            "INSERT OR IGNORE INTO files (digest, name, content_type, data) VALUES (?, ?, ?, ?)",
+            (digest, file.name, file.type, data)
+        )
+        return digest
+
+    def _load_file(self, digest: Optional[str]) -> Optional[MemoryFile]:
+        if digest is None:
+            return None
+        name, content_type, data = self._conn.execute(
+            "SELECT name, content_type, data FROM files WHERE digest = ?", (digest,)
+        ).fetchone()
+        return MemoryFile(name, data, content_type)
+
+    def get(self, task_id: str) -> Optional[Task]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _row_to_task(row) if row else None
+
+    def get_by_key(self, idempotency_key: str) -> Optional[Task]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {TASK_COLUMNS} FROM tasks WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        return _row_to_task(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Task]:
+        query = f"SELECT {TASK_COLUMNS} FROM tasks"
+        args: tuple = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            args = (status,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at DESC LIMIT ?", args + (limit,)).fetchall()
+        return [_row_to_task(row) for row in rows]
+
+    def claim(self) -> Optional[Lease]:
+        """
+        Réserve la plus ancienne tâche visible (en attente, ou en cours avec une
+        réservation expirée). Renvoie None si aucune tâche n'est disponible.
+        """
+        while True:
+            now = time.time()
+            token = uuid.uuid4().hex
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute(
+                        "SELECT id, status, attempts, max_attempts, resume_digest, job_digest FROM tasks "
+                        "WHERE status IN (?, ?) AND visible_at <= ? ORDER BY visible_at LIMIT 1",
+                        (QUEUED, RUNNING, now)
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    task_id, status, attempts, max_attempts, resume_digest, job_digest = row
+                    if status == RUNNING and attempts >= max_attempts:
+                        # Le worker a disparu à la dernière tentative
+                        self._conn.execute(
+                            "UPDATE tasks SET status = ?, error = ?, finished_at = ?, lease = NULL WHERE id = ?",
+                            (DEAD, "Réservation expirée (worker arrêté ou bloqué)", now, task_id)
+                        )
+                        self._conn.execute("COMMIT")
+                        TASK_OUTCOMES.inc(outcome=DEAD)
+                        continue
+                    self._conn.execute(
+                        "UPDATE tasks SET status = ?, attempts = attempts + 1, lease = ?, visible_at = ?, "
+                        "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                        (RUNNING, token, now + self.visibility_timeout, now, task_id)
+                    )
+                    task_row = self._conn.execute(
+                        f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?", (task_id,)
+                    ).fetchone()
+                    resume_file = self._load_file(resume_digest)
+                    job_file = self._load_file(job_digest)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            task = _row_to_task(task_row)
+            if task.started_at == now:
+                TASK_WAIT.observe(now - task.created_at)
+            return Lease(task, token, resume_file, job_file)
+
+    def _update_leased(self, lease: Lease, sql: str, args: tuple) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE tasks SET {sql} WHERE id = ? AND status = ? AND lease = ?",
+                args + (lease.task.id, RUNNING, lease.token)
+            )
+        return cursor.rowcount == 1
+
+    def extend(self, lease: Lease) -> bool:
+        """
+        Prolonge la réservation; False si elle a été perdue (expirée puis reprise).
+        """
+        return self._update_leased(lease, "visible_at = ?", (time.time() + self.visibility_timeout,))
+
+    def complete(self, lease: Lease, result: str) -> bool:
+        now = time.time()
+        ok = self._update_leased(
+            lease, "status = ?, result = ?, error = NULL, finished_at = ?, lease = NULL", (DONE, result, now)
+        )
+        if ok:
+            TASK_OUTCOMES.inc(outcome=DONE)
+        return ok
+
+    def fail(self, lease: Lease, error: str, retry: bool = True) -> Optional[str]:
+        """
+        Enregistre l'échec d'une tentative: la tâche est replanifiée avec un délai
+        croissant, ou passe en lettre morte si `retry` est faux ou les tentatives épuisées.
+        Renvoie le nouveau statut (None si la réservation avait été perdue).
+        """
+        now = time.time()
+        if retry and lease.task.attempts < lease.task.max_attempts:
+            delay = min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (lease.task.attempts - 1))
+            status, sql, args = QUEUED, "status = ?, error = ?, visible_at = ?, lease = NULL", (QUEUED, error, now + delay)
+        else:
+            status, sql, args = DEAD, "status = ?, error = ?, finished_at = ?, lease = NULL", (DEAD, error, now)
+        if not self._update_leased(lease, sql, args):
+            return None
+        TASK_OUTCOMES.inc(outcome="retry" if status == QUEUED else DEAD)
+        return status
+
+    def release(self, lease: Lease) -> bool:
+        """
+        Rend une tâche interrompue (arrêt du worker) sans compter la tentative.
+        """
+        ok = self._update_leased(
+            lease, "status = ?, attempts = attempts - 1, visible_at = ?, lease = NULL", (QUEUED, time.time())
+        )
+        if ok:
+            TASK_OUTCOMES.inc(outcome="released")
+        return ok
+
+    def requeue(self, task_id: str) -> bool:
+        """
+        Relance une tâche en lettre morte, avec un nouveau compteur de tentatives.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = ?, attempts = 0, error = NULL, finished_at = NULL, visible_at = ? "
+                "WHERE id = ? AND status = ?",
+                (QUEUED, time.time(), task_id, DEAD)
+            )
+        return cursor.rowcount == 1
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """
+        Supprime les tâches terminées ou mortes depuis plus de `retention` secondes,
+        puis les fichiers qu'aucune tâche ne référence. Renvoie le nombre de tâches supprimées.
+        """
+        if not self.retention:
+            return 0
+        cutoff = (now if now is not None else time.time()) - self.retention
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "DELETE FROM tasks WHERE status IN (?, ?) AND finished_at < ?", (DONE, DEAD, cutoff)
+                )
+                self._conn.execute(
+                    "DELETE FROM files WHERE digest NOT IN (SELECT resume_digest FROM tasks) "
+                    "AND digest NOT IN (SELECT job_digest FROM tasks WHERE job_digest IS NOT NULL)"
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if cursor.rowcount:
+            logger.info("File de tâches: %d tâches expirées supprimées", cursor.rowcount)
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+    def refresh_metrics(self) -> Dict[str, int]:
+        counts = self.counts()
+        for status, count in counts.items():
+            QUEUE_DEPTH.set(count, status=status)
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class WorkerPool:
+    """
+    `concurrency` workers asynchrones qui exécutent les tâches de la file avec
+    process_cover_letter_request. Plusieurs processus peuvent partager une même file.
+    """
+
+    def __init__(self, queue: TaskQueue, openai_client, firecrawl_client, concurrency: int = WORKERS,
+                 poll_interval: float = POLL_INTERVAL):
+        self.queue = queue
+        self.openai_client = openai_client
+        self.firecrawl_client = firecrawl_client
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.busy = 0
+
+    async def run(self, stop: asyncio.Event, drain_timeout: float = VISIBILITY_TIMEOUT) -> None:
+        """
+        Traite les tâches jusqu'à ce que `stop` soit levé. Les tâches en cours ont
+        alors `drain_timeout` secondes pour finir; au-delà elles sont rendues à la file.
+        """
+        WORKERS_TOTAL.set(self.concurrency)
+        workers = [asyncio.ensure_future(self._worker(stop)) for _ in range(self.concurrency)]
+        reporter = asyncio.ensure_future(self._report_metrics(stop))
+        purger = asyncio.ensure_future(self._purge_expired(stop))
+        try:
+            await stop.wait()
+            done, pending = await asyncio.wait(workers, timeout=drain_timeout or None)
+            for worker in pending:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            reporter.cancel()
+            purger.cancel()
+            WORKERS_TOTAL.set(0)
+            await asyncio.to_thread(self.queue.refresh_metrics)
+
+    async def _worker(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            lease = await asyncio.to_thread(self.queue.claim)
+            if lease is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.execute(lease)
+
+    async def execute(self, lease: Lease) -> None:
+        task = lease.task
+        self.busy += 1
+        WORKERS_BUSY.set(self.busy)
+        started = time.perf_counter()
+        heartbeat = asyncio.ensure_future(self._heartbeat(lease))
+        try:
+            with telemetry.span("task", attempt=task.attempts):
+                result = await process_cover_letter_request(
+                    lease.resume_file,
+                    lease.job_file if lease.job_file is not None else task.job,
+                    self.openai_client,
+                    self.firecrawl_client,
+                    **task.params
+                )
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.queue.release, lease)
+            raise
+        except Exception as e:
+            # Entrée invalide (format, paramètres): inutile de réessayer; les autres
+            # erreurs (offre introuvable, modèle indisponible...) peuvent être passagères
+            retry = not isinstance(e, InvalidInput)
+            status = await asyncio.to_thread(self.queue.fail, lease, f"{type(e).__name__}: {e}", retry)
+            logger.warning("Tâche %s, tentative %d en échec (%s): %s", task.id, task.attempts, status, e)
+        else:
+            if not await asyncio.to_thread(self.queue.complete, lease, result):
+                logger.warning("Tâche %s: réservation perdue, résultat ignoré", task.id)
+        finally:
+            heartbeat.cancel()
+            self.busy -= 1
+            WORKERS_BUSY.set(self.busy)
+            WORKER_BUSY_SECONDS.inc(time.perf_counter() - started)
+
+    async def _heartbeat(self, lease: Lease) -> None:
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.queue.extend, lease):
+                logger.warning("Tâche %s: réservation perdue", lease.task.id)
+                return
+
+    async def _report_metrics(self, stop: asyncio.Event, interval: float = 5.0) -> None:
+        while not stop.is_set():
+            await asyncio.to_thread(self.queue.refresh_metrics)
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+    async def _purge_expired(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                await asyncio.to_thread(self.queue.purge)
+            except Exception as e:
+                logger.warning("Purge de la file de tâches impossible: %s", e)
+            try:
+                await asyncio.wait_for(stop.wait(), PURGE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+_task_queue: Optional[TaskQueue] = None
+_task_queue_lock = threading.Lock()
+
+
+def get_task_queue() -> TaskQueue:
+    """
+    Renvoie la file partagée du processus (COVER_LETTER_QUEUE_PATH).
+    """
+    global _task_queue
+    with _task_queue_lock:
+        if _task_queue is None:
+            _task_queue = TaskQueue()
+        return _task_queue
+
+
+def set_task_queue(queue: Optional[TaskQueue]) -> None:
+    global _task_queue
+    with _task_queue_lock:
+        _task_queue = queue
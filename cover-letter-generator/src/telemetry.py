@@ -0,0 +1,336 @@
+# src/telemetry.py - Spans par étape et métriques au format texte Prometheus
+#
+# - Les spans passent par OpenTelemetry si le paquet opentelemetry-api est installé
+#   (sans SDK configuré, son traceur ne fait rien); sinon seules les métriques sont tenues.
+# - Les métriques sont gardées en mémoire et exportées au format texte Prometheus
+#   (render_metrics, write_metrics, start_metrics_server).
+# - COVER_LETTER_TELEMETRY=0 désactive tout: span() ne fait alors presque rien.
+import bisect
+import contextlib
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv('COVER_LETTER_TELEMETRY', '1').lower() not in ("0", "false", "no", "off")
+
+# Bornes des histogrammes (secondes, caractères)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+SIZE_BUCKETS = (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Par série: comptes par intervalle (non cumulés), somme, total
+        self._series: Dict[LabelValues, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labels + ("le",), key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+STAGE_DURATION = Histogram(
+    "cover_letter_stage_duration_seconds", "Durée de chaque étape du pipeline", ("stage",)
+)
+STAGE_ERRORS = Counter(
+    "cover_letter_stage_errors_total", "Étapes terminées en erreur", ("stage", "error")
+)
+TIME_TO_FIRST_TOKEN = Histogram(
+    "cover_letter_time_to_first_token_seconds", "Délai avant le premier token généré", ("model",)
+)
+TOKENS = Counter(
+    "cover_letter_tokens_total", "Tokens consommés (prompt, cached, completion)", ("model", "kind")
+)
+INPUT_SIZE = Histogram(
+    "cover_letter_input_chars", "Taille des entrées extraites (caractères)", ("input",), SIZE_BUCKETS
+)
+METRICS = [STAGE_DURATION, STAGE_ERRORS, TIME_TO_FIRST_TOKEN, TOKENS, INPUT_SIZE]
+
+
+def register(metric):
+    """
+    Ajoute une métrique définie dans un autre module (service, file de tâches...) à l'export.
+    """
+    METRICS.append(metric)
+    return metric
+
+
+class Span:
+    """
+    Étape en cours: ses attributs sont transmis au span OpenTelemetry s'il existe.
+    """
+
+    __slots__ = ("name", "attributes", "_otel")
+
+    def __init__(self, name: str, attributes: Dict[str, Any], otel_span: Any = None):
+        self.name = name
+        self.attributes = attributes
+        self._otel = otel_span
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(f"cover_letter.{key}", value)
+
+    def set_attributes(self, **attributes) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_tracer: Any = None
+_tracer_loaded = False
+
+
+def _get_tracer():
+    global _tracer, _tracer_loaded
+    if not _tracer_loaded:
+        try:
+            from opentelemetry import trace
+            _tracer = trace.get_tracer("cover_letter_generator")
+        except ImportError:
+            _tracer = None
+        _tracer_loaded = True
+    return _tracer
+
+
+@contextlib.contextmanager
+def span(name: str, attach: bool = True, **attributes) -> Iterator[Any]:
+    """
+    Mesure une étape: durée dans cover_letter_stage_duration_seconds, erreurs dans
+    cover_letter_stage_errors_total, et span OpenTelemetry "cover_letter.<name>".
+
+    `attach=False` crée un span sans le rendre courant: à utiliser dans les
+    générateurs asynchrones, dont le contexte change d'une reprise à l'autre.
+    """
+    if not ENABLED:
+        yield NOOP_SPAN
+        return
+
+    tracer = _get_tracer()
+    attributes = {key: value for key, value in attributes.items() if value is not None}
+    otel_attributes = {f"cover_letter.{key}": value for key, value in attributes.items()}
+    started = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        otel_span = None
+        if tracer is not None:
+            if attach:
+                otel_span = stack.enter_context(tracer.start_as_current_span(
+                    f"cover_letter.{name}", attributes=otel_attributes,
+                    record_exception=True, set_status_on_exception=True
+                ))
+            else:
+                otel_span = tracer.start_span(f"cover_letter.{name}", attributes=otel_attributes)
+                stack.callback(otel_span.end)
+        current = Span(name, attributes, otel_span)
+        try:
+            yield current
+        except BaseException as e:
+            if isinstance(e, Exception):
+                STAGE_ERRORS.inc(stage=name, error=type(e).__name__)
+                if otel_span is not None and not attach:
+                    # Comme start_as_current_span(set_status_on_exception=True) en mode attaché
+                    from opentelemetry.trace import Status, StatusCode
+
+                    otel_span.record_exception(e)
+                    otel_span.set_status(Status(StatusCode.ERROR, f"{type(e).__name__}: {e}"))
+            raise
+        finally:
+            STAGE_DURATION.observe(time.perf_counter() - started, stage=name)
+
+
+def record_first_token(model: str, seconds: float) -> None:
+    if ENABLED:
+        TIME_TO_FIRST_TOKEN.observe(seconds, model=model)
+
+
+def record_usage(model: str, usage: Any) -> None:
+    """
+    Compte les tokens d'une réponse (usage de l'API OpenAI).
+    """
+    if not ENABLED or usage is None:
+        return
+    details = getattr(usage, 'prompt_tokens_details', None)
+    TOKENS.inc(getattr(usage, 'prompt_tokens', 0) or 0, model=model, kind="prompt")
+    TOKENS.inc(getattr(details, 'cached_tokens', 0) or 0, model=model, kind="cached")
+    TOKENS.inc(getattr(usage, 'completion_tokens', 0) or 0, model=model, kind="completion")
+
+
+def record_input_size(name: str, text: str) -> None:
+    if ENABLED and text:
+        INPUT_SIZE.observe(len(text), input=name)
+
+
+def render_metrics() -> str:
+    """
+    Toutes les métriques au format texte d'exposition Prometheus.
+    """
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str) -> None:
+    """
+    Écrit les métriques dans un fichier (collecteur textfile de node_exporter par exemple).
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(render_metrics())
+    os.replace(temporary, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        data = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """
+    Expose /metrics sur `port` (COVER_LETTER_METRICS_PORT par défaut) dans un
+    thread dédié. Ne fait rien si aucun port n'est configuré; un seul serveur par processus.
+    """
+    global _metrics_server
+    port = port if port is not None else int(os.getenv('COVER_LETTER_METRICS_PORT', '0'))
+    if not port or not ENABLED:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Serveur de métriques indisponible sur le port %d: %s", port, e)
+                return None
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+            logger.info("Métriques exposées sur http://%s:%d/metrics", host, port)
+        return _metrics_server
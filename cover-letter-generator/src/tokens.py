@@ -0,0 +1,142 @@
+# src/tokens.py - Comptage de tokens et réduction du prompt à un budget
+import functools
+import re
+from typing import List, Tuple
+
+# Approximation utilisée quand tiktoken n'est pas installé
+CHARS_PER_TOKEN = 4
+
+# Marqueur ajouté à la fin d'un texte tronqué (et sa taille en tokens, arrondie)
+TRUNCATION_MARKER = "\n[...]"
+TRUNCATION_MARKER_TOKENS = 4
+
+# Titres de sections d'une offre qui décrivent les exigences du poste
+REQUIREMENT_HEADINGS = re.compile(
+    r"(profil|exigences|requis|compétences|competences|qualifications|prérequis|"
+    r"requirements|skills|you have|must have|what we.re looking for|"
+    r"expérience|experience|missions|responsabilités|responsibilities)",
+    re.IGNORECASE
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """
+    Compte les tokens d'un texte avec le tokenizer du modèle (tiktoken),
+    ou une estimation à partir du nombre de caractères.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4") -> str:
+    """
+    Coupe un texte à au plus `max_tokens` tokens, de préférence sur une fin de ligne.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    max_tokens = max(1, max_tokens - TRUNCATION_MARKER_TOKENS)
+    encoding = _get_encoding(model)
+    if encoding is None:
+        truncated = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        truncated = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+    cut = truncated.rfind("\n")
+    if cut > len(truncated) // 2:
+        truncated = truncated[:cut]
+    return truncated.rstrip() + TRUNCATION_MARKER
+
+
+def split_requirements(job_description: str) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]:
+    """
+    Sépare une offre en blocs (paragraphes) prioritaires - ceux qui suivent un titre
+    de type "Profil recherché" / "Requirements" - et blocs secondaires.
+
+    Chaque bloc est renvoyé avec sa position pour pouvoir reconstituer l'ordre d'origine.
+    """
+    blocks = [block for block in re.split(r"\n\s*\n", job_description) if block.strip()]
+    priority, secondary = [], []
+    in_requirements = False
+    for position, block in enumerate(blocks):
+        first_line = block.strip().splitlines()[0]
+        if len(first_line) < 80 and REQUIREMENT_HEADINGS.search(first_line):
+            in_requirements = True
+        elif len(first_line) < 60 and first_line.rstrip().endswith(":"):
+            # Nouveau titre qui n'est pas une section d'exigences
+            in_requirements = False
+        (priority if in_requirements else secondary).append((position, block))
+    return priority, secondary
+
+
+def _fill_blocks(blocks: List[Tuple[int, str]], budget: int, model: str) -> Tuple[List[Tuple[int, str]], int]:
+    """
+    Garde les blocs dans l'ordre tant qu'ils tiennent dans le budget; le premier
+    bloc qui dépasse est tronqué. Renvoie les blocs gardés et les tokens utilisés.
+    """
+    kept, used = [], 0
+    for position, block in blocks:
+        tokens = count_tokens(block, model)
+        if used + tokens <= budget:
+            kept.append((position, block))
+            used += tokens
+            continue
+        remaining = budget - used
+        if remaining > 20:
+            kept.append((position, truncate_to_tokens(block, remaining, model)))
+            used = budget
+        break
+    return kept, used
+
+
+def fit_to_budget(
+    resume_content: str,
+    job_description: str,
+    available_tokens: int,
+    model: str = "gpt-4"
+) -> Tuple[str, str]:
+    """
+    Réduit le CV et l'offre pour qu'ils tiennent ensemble dans `available_tokens`.
+
+    Le résultat est déterministe. Ordre de priorité:
+    1. les sections d'exigences de l'offre (jusqu'à la moitié du budget),
+    2. le CV (jusqu'aux trois quarts du reste, plus ce que l'offre n'utilise pas),
+    3. le reste de l'offre.
+    """
+    resume_tokens = count_tokens(resume_content, model)
+    job_tokens = count_tokens(job_description, model)
+    if resume_tokens + job_tokens <= available_tokens:
+        return resume_content, job_description
+
+    priority, secondary = split_requirements(job_description)
+    kept_priority, priority_used = _fill_blocks(priority, available_tokens // 2, model)
+    remaining = available_tokens - priority_used
+
+    secondary_tokens = sum(count_tokens(block, model) for _, block in secondary)
+    secondary_budget = min(secondary_tokens, remaining // 4)
+    resume_budget = min(resume_tokens, remaining - secondary_budget)
+    secondary_budget = remaining - resume_budget
+
+    kept_secondary, _ = _fill_blocks(secondary, secondary_budget, model)
+    job_blocks = sorted(kept_priority + kept_secondary)
+    trimmed_job = "\n\n".join(block for _, block in job_blocks)
+
+    return truncate_to_tokens(resume_content, resume_budget, model), trimmed_job
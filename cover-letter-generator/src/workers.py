@@ -0,0 +1,111 @@
+# src/workers.py - Pool de workers pour les traitements bloquants
+import asyncio
+import atexit
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Configuration par défaut, surchargeable par variables d'environnement:
+# - COVER_LETTER_EXECUTOR: "thread" (défaut) ou "process"
+# - COVER_LETTER_WORKERS: nombre de workers (défaut: dérivé du nombre de CPU)
+# - COVER_LETTER_PROCESS_THRESHOLD: taille (octets) à partir de laquelle un
+#   document part dans le pool de processus même en mode "thread" (0 = jamais)
+_config: Dict[str, Any] = {
+    'kind': os.getenv('COVER_LETTER_EXECUTOR', 'thread'),
+    'max_workers': int(os.getenv('COVER_LETTER_WORKERS', '0')) or None,
+    'process_threshold': int(os.getenv('COVER_LETTER_PROCESS_THRESHOLD', '0')),
+}
+
+_executors: Dict[str, Executor] = {}
+_lock = threading.Lock()
+
+
+def default_max_workers(kind: str) -> int:
+    """
+    Calcule la taille du pool à partir du nombre de CPU disponibles.
+    """
+    cpu_count = os.cpu_count() or 1
+    if kind == 'process':
+        return cpu_count
+    # Les threads passent une partie du temps hors du GIL (I/O, zlib), on en prévoit plus
+    return min(32, cpu_count + 4)
+
+
+def configure_executor(
+    kind: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    process_threshold: Optional[int] = None
+) -> None:
+    """
+    Modifie la configuration des pools. Les pools existants sont arrêtés et
+    seront recréés à la prochaine utilisation.
+    """
+    if kind is not None and kind not in ('thread', 'process'):
+        raise ValueError(f"Type d'exécuteur non supporté: {kind}")
+
+    with _lock:
+        if kind is not None:
+            _config['kind'] = kind
+        if max_workers is not None:
+            _config['max_workers'] = max_workers
+        if process_threshold is not None:
+            _config['process_threshold'] = process_threshold
+        executors = list(_executors.values())
+        _executors.clear()
+
+    for executor in executors:
+        executor.shutdown(wait=False)
+
+
+def get_executor(kind: Optional[str] = None) -> Executor:
+    """
+    Renvoie le pool partagé du type demandé, en le créant au besoin.
+    """
+    kind = kind or _config['kind']
+    with _lock:
+        executor = _executors.get(kind)
+        if executor is None:
+            max_workers = _config['max_workers'] or default_max_workers(kind)
+            if kind == 'process':
+                executor = ProcessPoolExecutor(max_workers=max_workers)
+            else:
+                executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix="cover-letter-worker"
+                )
+            _executors[kind] = executor
+        return executor
+
+
+async def run_in_worker(func: Callable[..., Any], *args, size_hint: int = 0) -> Any:
+    """
+    Exécute une fonction bloquante dans le pool sans bloquer la boucle d'événements.
+
+    Args:
+        func: Fonction à exécuter (doit être picklable pour le pool de processus)
+        size_hint: Taille de l'entrée, utilisée pour router les gros documents
+                   vers le pool de processus
+    """
+    kind = _config['kind']
+    threshold = _config['process_threshold']
+    if threshold and size_hint >= threshold:
+        kind = 'process'
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(kind), functools.partial(func, *args))
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    """
+    Arrête tous les pools (appelé automatiquement à la fin du processus).
+    """
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
+
+
+atexit.register(shutdown_executors)
@@ -0,0 +1,21 @@
+# tests/conftest.py - Rend le paquet `src` importable depuis les tests
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """
+    Caches partagés dans un répertoire temporaire, recréés pour chaque test.
+    """
+    from src import cache
+
+    monkeypatch.setenv('COVER_LETTER_CACHE_DIR', str(tmp_path / "cache"))
+    yield
+    cache.set_resume_cache(None)
+    cache.set_scrape_cache(None)
+    cache.set_generation_cache(None)
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+
+from src.cache import ScrapeCache, normalize_url
+
+URL = "https://exemple.com/offres/42?utm_source=newsletter"
+
+
+class CountingFetch:
+    def __init__(self, content: str = "Offre à jour", delay: float = 0.0):
+        self.content = content
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.content
+
+
+def _seed(cache: ScrapeCache, content: str, age: float) -> None:
+    cache._store.set(normalize_url(URL), content.encode("utf-8"), created_at=time.time() - age)
+
+
+def test_fresh_entry_is_served_without_fetching(tmp_path):
+    cache = ScrapeCache(str(tmp_path / "scrapes.sqlite3"), ttl=60, stale_ttl=60)
+    _seed(cache, "Offre en cache", age=10)
+    fetch = CountingFetch()
+    assert asyncio.run(cache.get_or_fetch(URL, fetch)) == "Offre en cache"
+    assert fetch.calls == 0
+    assert cache.stats()['hits'] == 1
+
+
+def test_stale_entry_is_served_then_revalidated(tmp_path):
+    cache = ScrapeCache(str(tmp_path / "scrapes.sqlite3"), ttl=60, stale_ttl=60)
+    _seed(cache, "Offre périmée", age=90)
+    fetch = CountingFetch(delay=0.01)
+
+    async def scenario():
+        content = await cache.get_or_fetch(URL, fetch)
+        await asyncio.sleep(0.05)
+        return content
+
+    assert asyncio.run(scenario()) == "Offre périmée"
+    assert fetch.calls == 1
+    assert cache.lookup(URL)[0] == "Offre à jour"
+    assert cache.stats()['revalidations'] == 1
+
+
+def test_expired_entry_waits_for_fetch(tmp_path):
+    cache = ScrapeCache(str(tmp_path / "scrapes.sqlite3"), ttl=60, stale_ttl=60)
+    _seed(cache, "Offre expirée", age=200)
+    fetch = CountingFetch()
+    assert asyncio.run(cache.get_or_fetch(URL, fetch)) == "Offre à jour"
+    assert cache.stats()['misses'] == 1
+
+
+def test_concurrent_requests_share_one_fetch(tmp_path):
+    cache = ScrapeCache(str(tmp_path / "scrapes.sqlite3"))
+    fetch = CountingFetch(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_fetch(URL, fetch) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["Offre à jour"] * 5
+    assert fetch.calls == 1
+    assert cache.stats()['coalesced'] == 4
+
+
+def test_event_loops_in_other_threads_keep_their_own_inflight_fetches(tmp_path):
+    cache = ScrapeCache(str(tmp_path / "scrapes.sqlite3"))
+    # Contenu vide: rien n'est mis en cache, la seconde requête doit rejoindre le scraping en cours
+    fast, slow = CountingFetch("", delay=0.05), CountingFetch(delay=0.3)
+    results, errors = [], []
+
+    def run(scenario):
+        try:
+            results.append(asyncio.run(scenario()))
+        except Exception as e:
+            errors.append(e)
+
+    async def first_loop():
+        return await cache.get_or_fetch(URL, fast)
+
+    async def second_loop():
+        await asyncio.sleep(0.01)
+        first = asyncio.ensure_future(cache.get_or_fetch(URL, slow))
+        # Le scraping de l'autre boucle se termine pendant celui-ci
+        await asyncio.sleep(0.15)
+        second = await cache.get_or_fetch(URL, slow)
+        return [await first, second]
+
+    threads = [threading.Thread(target=run, args=(scenario,)) for scenario in (first_loop, second_loop)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert fast.calls == 1
+    assert slow.calls == 1
+    assert cache.stats()['coalesced'] == 1
+
+
+def test_resume_survives_restart_and_parser_bump_misses(tmp_path, monkeypatch):
+    from src import core
+    from src.cache import ResumeCache, set_resume_cache
+    from src.files import MemoryFile
+
+    path = str(tmp_path / "resumes.sqlite3")
+    resume = MemoryFile("cv.txt", "Jeanne Martin, développeuse Python".encode(), "text/plain")
+    set_resume_cache(ResumeCache(path))
+    try:
+        assert asyncio.run(core.extract_resume_content(resume)) == "Jeanne Martin, développeuse Python"
+
+        # Redémarrage: nouveau processus, même fichier SQLite
+        restarted = ResumeCache(path)
+        set_resume_cache(restarted)
+        asyncio.run(core.extract_resume_content(resume))
+        assert restarted.stats()['disk_hits'] == 1
+
+        monkeypatch.setattr(core, "RESUME_PARSER_VERSION", core.RESUME_PARSER_VERSION + "-next")
+        asyncio.run(core.extract_resume_content(resume))
+        assert restarted.stats()['misses'] == 1
+    finally:
+        set_resume_cache(None)
+
+
+def test_resume_memory_cache_evicts_least_recently_used(tmp_path):
+    from src.cache import ResumeCache
+
+    cache = ResumeCache(str(tmp_path / "resumes.sqlite3"), max_memory_bytes=25)
+    cache.set("a", "a" * 10)
+    cache.set("b", "b" * 10)
+    assert cache.get("a") == "a" * 10
+    cache.set("c", "c" * 10)
+
+    assert cache.stats()['memory_entries'] == 2
+    assert cache.get("b") == "b" * 10
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_resume_disk_cache_evicts_least_recently_used(tmp_path):
+    from src.cache import ResumeCache
+
+    # Mémoire réduite à une entrée: les lectures passent par SQLite
+    cache = ResumeCache(str(tmp_path / "resumes.sqlite3"), max_memory_bytes=0, max_disk_bytes=25)
+    cache.set("a", "a" * 10)
+    time.sleep(0.01)
+    cache.set("b", "b" * 10)
+    time.sleep(0.01)
+    assert cache.get("a") == "a" * 10
+    time.sleep(0.01)
+    cache.set("c", "c" * 10)
+
+    assert cache.stats()['evictions'] == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 10
+
+
+class _ModelNotFound(Exception):
+    status_code = 404
+
+
+class _FallbackClient:
+    """
+    Client OpenAI minimal: le premier modèle est introuvable, le second répond.
+    """
+
+    def __init__(self, missing_model: str):
+        self.missing_model = missing_model
+        self.chat = self.completions = self
+
+    async def create(self, model, **kwargs):
+        from types import SimpleNamespace
+
+        if model == self.missing_model:
+            raise _ModelNotFound(model)
+        message = SimpleNamespace(content=f"Lettre rédigée par {model}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def test_fallback_letter_is_cached_under_the_model_that_wrote_it(tmp_path):
+    from src import core
+    from src.cache import GenerationCache, set_generation_cache
+    from src.routing import ModelRouter, ModelTier, set_router
+
+    premium = ModelTier("premium", "gpt-4", 1000, 10.0)
+    fast = ModelTier("fast", "gpt-3.5-turbo", 1000, 5.0)
+    cache = GenerationCache(str(tmp_path / "generations.sqlite3"))
+    params = core.build_generation_params(company_name="Acme")
+    set_router(ModelRouter([premium, fast]))
+    set_generation_cache(cache)
+    try:
+        letter = asyncio.run(core.generate_personalized_cover_letter(
+            "CV", "Offre", _FallbackClient(premium.model), params
+        ))
+        assert letter == "Lettre rédigée par gpt-3.5-turbo"
+        requested = GenerationCache.make_key("CV", "Offre", params, premium.model, core.TEMPERATURE)
+        answered = GenerationCache.make_key("CV", "Offre", params, fast.model, core.TEMPERATURE)
+        assert cache.get(requested) is None
+        assert cache.get(answered) == letter
+    finally:
+        set_router(None)
+        set_generation_cache(None)
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from src.core import ConcurrentStageError, run_concurrently
+from src.params import InvalidInput
+
+
+async def _fail(error: BaseException):
+    raise error
+
+
+def test_single_failure_is_raised_as_is():
+    async def scenario():
+        await run_concurrently(asyncio.sleep(0, "ok"), _fail(KeyError("offre")))
+
+    with pytest.raises(KeyError):
+        asyncio.run(scenario())
+
+
+def test_invalid_input_wins_over_other_stage_errors():
+    async def scenario():
+        await run_concurrently(_fail(RuntimeError("offre introuvable")), _fail(InvalidInput("format")))
+
+    with pytest.raises(InvalidInput) as info:
+        asyncio.run(scenario())
+    assert isinstance(info.value.__cause__, ConcurrentStageError)
+    assert len(info.value.__cause__.errors) == 2
+
+
+def test_other_stage_errors_are_grouped():
+    async def scenario():
+        await run_concurrently(_fail(RuntimeError("a")), _fail(ValueError("b")))
+
+    with pytest.raises(ConcurrentStageError):
+        asyncio.run(scenario())
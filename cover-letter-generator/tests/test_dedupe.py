@@ -0,0 +1,107 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from src.batch import run_batch
+from src.dedupe import NearDuplicateIndex, jaccard, shingles
+from src.files import MemoryFile
+
+POSTING = (
+    "Acme recrute un développeur Python confirmé pour rejoindre son équipe plateforme à Lyon. "
+    "Vous concevrez des API REST avec Django et PostgreSQL, participerez aux revues de code, "
+    "améliorerez la supervision des services en production et accompagnerez deux développeurs juniors. "
+    "Profil: cinq ans d'expérience, bonne connaissance de Docker et de Kubernetes, anglais professionnel. "
+    "Télétravail deux jours par semaine, mutuelle prise en charge à cent pour cent."
+)
+# Même annonce sur un autre site: mise en forme, lien et mention de candidature
+REPOST = POSTING.replace("Profil:", "\nPROFIL -").replace("REST", "« REST »") + " Postulez sur https://jobs.exemple.com/42"
+OTHER = (
+    "Boulangerie artisanale cherche un apprenti boulanger motivé pour la fabrication du pain, "
+    "des viennoiseries et la mise en place de la vitrine chaque matin dès quatre heures, "
+    "formation assurée par le maître boulanger, contrat d'apprentissage de deux ans en alternance."
+)
+
+
+def test_reposted_offer_matches_original():
+    index = NearDuplicateIndex()
+    assert index.match_or_add("original", POSTING) is None
+    match = index.match_or_add("repost", REPOST)
+    assert match.key == "original"
+    assert match.similarity == jaccard(shingles(POSTING), shingles(REPOST))
+    assert index.match_or_add("other", OTHER) is None
+    assert len(index) == 2
+
+
+def test_lsh_candidates_are_confirmed_with_exact_jaccard():
+    edited = POSTING.replace("confirmé", "senior").replace("deux jours", "trois jours")
+    similarity = jaccard(shingles(POSTING), shingles(edited))
+    assert 0.5 < similarity < 0.9
+
+    strict = NearDuplicateIndex(threshold=0.9)
+    strict.add("original", POSTING)
+    assert strict.query(edited) is None
+
+    lenient = NearDuplicateIndex(threshold=0.5)
+    lenient.add("original", POSTING)
+    assert lenient.query(edited) == ("original", similarity)
+
+
+def test_empty_and_short_texts_never_match():
+    index = NearDuplicateIndex()
+    assert index.match_or_add("empty", "") is None
+    assert index.match_or_add("empty again", "   ") is None
+    assert index.match_or_add("short", "Développeur Python") is None
+    assert index.match_or_add("short again", "Développeur Python") is None
+    assert len(index) == 0
+
+
+class _CountingClient:
+    def __init__(self):
+        self.calls = 0
+        self.chat = self.completions = self
+
+    async def create(self, model, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=f"Madame, Monsieur, je souhaite rejoindre Acme. Lettre {self.calls}.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _run(tmp_path, jobs, output_name="letters.jsonl", **options):
+    output = tmp_path / output_name
+    client = _CountingClient()
+    resume = MemoryFile("cv.txt", "Jeanne Martin, développeuse Python".encode(), "text/plain")
+    summary = asyncio.run(run_batch(resume, jobs, str(output), client, None, **options))
+    records = {record['id']: record for record in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    return summary, records, client
+
+
+def test_batch_reuses_letter_for_reposted_offer(tmp_path):
+    jobs = [{'id': "a", 'job': POSTING}, {'id': "b", 'job': REPOST}, {'id': "c", 'job': OTHER}]
+    summary, records, client = _run(tmp_path, jobs)
+    assert summary['reused'] == 1
+    assert client.calls == 2
+    assert records["b"]['duplicate_of'] == "a"
+    assert records["b"]['cover_letter'] == records["a"]['cover_letter']
+    assert "duplicate_of" not in records["c"]
+
+
+def test_batch_substitutes_company_name_when_allowed(tmp_path):
+    jobs = [
+        {'id': "a", 'job': POSTING, 'company_name': "Acme"},
+        {'id': "b", 'job': REPOST, 'company_name': "Globex"},
+    ]
+    summary, records, client = _run(tmp_path, jobs, substitute_company=True)
+    assert client.calls == 1
+    assert "Globex" in records["b"]['cover_letter']
+    assert "Acme" not in records["b"]['cover_letter']
+
+    summary, records, client = _run(tmp_path, jobs, "sans_substitution.jsonl")
+    assert summary['reused'] == 0
+    assert "duplicate_of" not in records["b"]
+
+
+def test_batch_does_not_reuse_letters_between_short_postings(tmp_path):
+    jobs = [{'id': "a", 'job': "Développeur Python"}, {'id': "b", 'job': "Développeur Python"}]
+    summary, records, client = _run(tmp_path, jobs)
+    assert summary['reused'] == 0
+    assert client.calls == 2
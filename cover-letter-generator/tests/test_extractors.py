@@ -0,0 +1,152 @@
+import asyncio
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+from src import extractors  # noqa: E402
+from src.extractors import (  # noqa: E402
+    ExtractionInsufficient, LocalExtractor, html_to_text, job_posting_from_json_ld, resolve_public_address
+)
+
+DESCRIPTION = "Vous développerez des API Python pour notre plateforme de recrutement. " * 6
+
+PAGE = f"""<html><head><title>Développeur Python - Acme</title></head><body>
+<nav><a href="/">Accueil</a><a href="/offres">Offres</a></nav>
+<div class="cookie-banner">Nous utilisons des cookies.</div>
+<main><h1>Développeur Python</h1><div class="job-description"><p>{DESCRIPTION}</p>
+<ul><li>Django</li><li>PostgreSQL</li></ul></div></main>
+<aside>Offres similaires</aside><footer>Mentions légales</footer>
+</body></html>"""
+
+
+def test_html_boilerplate_is_stripped():
+    text = html_to_text(PAGE)
+    assert "Vous développerez des API Python" in text
+    assert "- Django" in text
+    for boilerplate in ("Accueil", "cookies", "Offres similaires", "Mentions légales"):
+        assert boilerplate not in text
+
+
+def test_json_ld_job_posting():
+    block = json.dumps({
+        "@context": "https://schema.org",
+        "@graph": [{"@type": "Organization", "name": "Acme"}, {
+            "@type": "JobPosting",
+            "title": "Développeur Python",
+            "hiringOrganization": {"@type": "Organization", "name": "Acme"},
+            "jobLocation": {"address": {"addressLocality": "Lyon", "addressCountry": "FR"}},
+            "employmentType": ["FULL_TIME"],
+            "description": "<p>Vous développerez des <b>API</b>.</p>",
+        }],
+    })
+    text = job_posting_from_json_ld(["{pas du json", block])
+    assert text.splitlines() == [
+        "Développeur Python", "Entreprise: Acme", "Lieu: Lyon, FR", "Contrat: FULL_TIME",
+        "Vous développerez des API.",
+    ]
+
+
+def _resolving_to(monkeypatch, address: str) -> None:
+    async def getaddrinfo(self, host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+    monkeypatch.setattr(asyncio.base_events.BaseEventLoop, "getaddrinfo", getaddrinfo)
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "169.254.169.254", "10.0.0.5"])
+def test_hostname_resolving_to_private_address_is_refused(monkeypatch, address):
+    _resolving_to(monkeypatch, address)
+    # Un proxy de l'environnement ne doit pas contourner la vérification
+    monkeypatch.setenv("HTTP_PROXY", "http://127.0.0.1:9")
+    with pytest.raises(ExtractionInsufficient):
+        asyncio.run(resolve_public_address("offres.exemple.com", 80))
+
+    async def fetch():
+        extractor = LocalExtractor(min_chars=0)
+        try:
+            return await extractor.extract("http://offres.exemple.com/42")
+        finally:
+            await extractor.aclose()
+
+    with pytest.raises(ExtractionInsufficient, match="non publique"):
+        asyncio.run(fetch())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        port = self.server.server_address[1]
+        if self.path.startswith("/redirect/"):
+            target = {
+                "metadata": "http://169.254.169.254/latest/meta-data/",
+                "localhost": f"http://localhost:{port}/offre",
+                "public": "/offre",
+            }[self.path.rsplit("/", 1)[1]]
+            self.send_response(302)
+            self.send_header("Location", target)
+            self.end_headers()
+            return
+        if self.path == "/texte":
+            body, content_type = ("é" * 5000).encode("utf-8"), "text/plain; charset=utf-8"
+        else:
+            body, content_type = PAGE.encode("utf-8"), "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def posting_server(monkeypatch):
+    """
+    Serveur local joignable sous le nom offres.test, traité comme une adresse publique.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    original = extractors.resolve_public_address
+
+    async def resolve(host, port):
+        return "127.0.0.1" if host == "offres.test" else await original(host, port)
+
+    monkeypatch.setattr(extractors, "resolve_public_address", resolve)
+    yield f"http://offres.test:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _extract(url: str, **kwargs) -> str:
+    async def run():
+        extractor = LocalExtractor(**kwargs)
+        try:
+            return await extractor.extract(url)
+        finally:
+            await extractor.aclose()
+
+    return asyncio.run(run())
+
+
+def test_local_extractor_follows_public_redirects(posting_server):
+    text = _extract(f"{posting_server}/redirect/public")
+    assert text.startswith("Développeur Python")
+    assert "cookies" not in text
+
+
+@pytest.mark.parametrize("target", ["metadata", "localhost"])
+def test_redirects_to_private_addresses_are_checked_again(posting_server, target):
+    with pytest.raises(ExtractionInsufficient, match="non publique"):
+        _extract(f"{posting_server}/redirect/{target}")
+
+
+def test_local_extractor_stops_at_byte_cap(posting_server):
+    text = _extract(f"{posting_server}/texte", min_chars=0, max_bytes=1001)
+    # 2 octets par caractère: le caractère coupé par la limite est remplacé
+    assert len(text) == 501
+    assert text[:500] == "é" * 500
@@ -0,0 +1,34 @@
+from src.ranking import select_relevant_content
+from src.tokens import count_tokens
+
+RESUME = """Jeanne Martin - jeanne@example.com
+
+EXPÉRIENCE:
+- Développement d'API Python avec Django et PostgreSQL
+- Animation d'ateliers de pâtisserie pour enfants
+- Gestion d'un potager partagé de quartier
+
+LANGUES:
+- Anglais courant, espagnol professionnel
+"""
+
+
+def test_resume_under_budget_is_kept_whole():
+    assert select_relevant_content(RESUME, "Chef de projet marketing", 10_000) == RESUME.strip()
+
+
+def test_zero_overlap_units_backfill_remaining_budget():
+    budget = count_tokens(RESUME) - 5
+    selected = select_relevant_content(RESUME, "Chef de projet marketing", budget)
+    # Aucun terme commun avec l'offre: le budget est rempli dans l'ordre du CV
+    assert selected.startswith("Jeanne Martin")
+    assert "Django" in selected
+    assert "pâtisserie" in selected
+    assert count_tokens(selected) <= budget
+
+
+def test_scored_units_come_before_backfill():
+    budget = count_tokens("Jeanne Martin - jeanne@example.com\n- Gestion d'un potager partagé de quartier") + 4
+    selected = select_relevant_content(RESUME, "Responsable potager urbain", budget)
+    assert "potager" in selected
+    assert "Django" not in selected
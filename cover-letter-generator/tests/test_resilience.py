@@ -0,0 +1,76 @@
+import asyncio
+import email.utils
+import time
+
+import pytest
+
+from src.resilience import hedged, retry_after_seconds
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class FakeError(Exception):
+    def __init__(self, headers):
+        super().__init__("rate limited")
+        self.response = FakeResponse(headers)
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(FakeError({'retry-after': "3"})) == 3.0
+    assert retry_after_seconds(FakeError({'retry-after-ms': "1500"})) == 1.5
+
+
+def test_retry_after_http_date():
+    value = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= retry_after_seconds(FakeError({'retry-after': value})) <= 30
+
+
+def test_malformed_retry_after_is_ignored():
+    assert retry_after_seconds(FakeError({'retry-after': "bientôt"})) is None
+    assert retry_after_seconds(FakeError({'retry-after-ms': "n/a"})) is None
+
+
+def test_hedged_cancels_pending_calls_when_caller_is_cancelled():
+    started, cancelled = [], []
+
+    async def slow_call():
+        started.append(True)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario(hedge_after):
+        caller = asyncio.ensure_future(hedged(slow_call, hedge_after))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        # Vérifié avant la fin de la boucle (asyncio.run annule les tâches restantes)
+        assert started and len(cancelled) == len(started)
+
+    for hedge_after in (1.0, None):
+        started.clear()
+        cancelled.clear()
+        asyncio.run(scenario(hedge_after))
+
+
+def test_hedged_returns_fastest_call():
+
+    async def scenario():
+        calls = []
+
+        async def call():
+            calls.append(len(calls))
+            # Le premier appel est lent, le second répond tout de suite
+            await asyncio.sleep(0.2 if len(calls) == 1 else 0)
+            return f"flux {len(calls)}"
+
+        return await hedged(call, 0.05)
+
+    assert asyncio.run(scenario()) == "flux 2"
@@ -0,0 +1,57 @@
+from src.routing import LATENCY_WINDOW, ModelRouter, ModelTier
+
+PREMIUM = ModelTier("premium", "gpt-4", 1000, 10.0)
+FAST = ModelTier("fast", "gpt-3.5-turbo", 1000, 5.0)
+FINAL = {'length': "Moyenne (350-400 mots)", 'template': "Classique"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_slow_premium_is_demoted_then_comes_back():
+    clock = FakeClock()
+    router = ModelRouter([PREMIUM, FAST], clock=clock)
+    assert router.route(FINAL)[0] is PREMIUM
+
+    for _ in range(30):
+        router.record_success(PREMIUM.model, 30.0)
+    assert router.route(FINAL)[0] is FAST
+
+    # Plus de trafic sur le premium: ses mesures lentes expirent avec la fenêtre
+    clock.now += LATENCY_WINDOW + 1
+    assert router.route(FINAL)[0] is PREMIUM
+
+
+def test_error_demotion_ends_after_cooldown():
+    clock = FakeClock()
+    router = ModelRouter([PREMIUM, FAST], clock=clock)
+    for _ in range(3):
+        router.record_error(PREMIUM.model)
+    assert router.route(FINAL)[0] is FAST
+
+    clock.now += 61
+    assert router.route(FINAL)[0] is PREMIUM
+
+
+def test_stream_success_does_not_record_completion_latency():
+    router = ModelRouter([PREMIUM, FAST], clock=FakeClock())
+    for _ in range(30):
+        router.record_first_chunk(FAST.model, 0.5)
+        router.record_success(FAST.model)
+    stats = router.stats_for(FAST.model).snapshot()
+    assert stats['requests'] == 30
+    assert stats['latency_p95'] is None
+    assert stats['first_chunk_p95'] == 0.5
+    assert router.route({}, draft=True)[0] is FAST
+
+
+def test_slow_first_chunk_demotes_tier():
+    router = ModelRouter([PREMIUM, FAST], clock=FakeClock())
+    for _ in range(30):
+        router.record_first_chunk(FAST.model, 8.0)
+    assert router.route({}, draft=True)[0] is PREMIUM
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+pytest.importorskip("starlette")
+from starlette.testclient import TestClient  # noqa: E402
+
+from src.service import AdmissionControl, create_app  # noqa: E402
+
+FORM = {'data': {'job': "Développeur Python"}, 'files': {'resume': ("cv.txt", b"Jeanne Martin", "text/plain")}}
+
+
+def _client(**kwargs) -> TestClient:
+    return TestClient(create_app(openai_client=object(), firecrawl_client=object(), **kwargs))
+
+
+def test_full_queue_answers_503_with_retry_after():
+    with _client(max_concurrency=1, max_queue=0) as client:
+        admission = client.app.state.admission
+        client.portal.call(admission.acquire)
+        response = client.post("/generate", **FORM)
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert response.json()['reason'] == "queue_full"
+        admission.release()
+
+
+def test_draining_refuses_requests_and_fails_healthz():
+    with _client() as client:
+        assert client.get("/healthz").status_code == 200
+        client.app.state.admission.draining = True
+        health = client.get("/healthz")
+        assert health.status_code == 503
+        assert health.json()['status'] == "draining"
+        response = client.post("/generate", **FORM)
+        assert response.status_code == 503
+        assert response.json()['reason'] == "draining"
+        assert "retry-after" in response.headers
+
+
+def test_metrics_route_only_for_single_worker():
+    with _client() as client:
+        assert client.get("/metrics").status_code == 200
+    with _client(expose_metrics=False) as client:
+        assert client.get("/metrics").status_code == 404
+
+
+def test_sigterm_drains_before_forwarding_the_signal():
+    forwarded = []
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: forwarded.append(signum))
+
+    async def scenario():
+        admission = AdmissionControl()
+        restore = admission.install_drain_signal(delay=0.1)
+        try:
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0.02)
+            assert admission.draining
+            assert forwarded == []
+            await asyncio.sleep(0.15)
+            assert forwarded == [signal.SIGTERM]
+        finally:
+            restore()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+
+from src.files import MemoryFile
+from src.taskqueue import DEAD, DONE, QUEUED, RUNNING, TaskQueue, WorkerPool
+
+RESUME = MemoryFile("cv.txt", "Jeanne Martin, développeuse Python".encode(), "text/plain")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = TaskQueue(str(tmp_path / "tasks.sqlite"), visibility_timeout=0.05, max_attempts=3)
+    yield queue
+    queue.close()
+
+
+def test_idempotency_key_returns_existing_task(queue):
+    first = queue.submit(RESUME, "https://exemple.com/offre", {}, idempotency_key="ats-1")
+    second = queue.submit(RESUME, "Une autre offre", {}, idempotency_key="ats-1")
+    assert second.id == first.id
+    assert second.job == "https://exemple.com/offre"
+    assert queue.counts()[QUEUED] == 1
+
+
+def test_expired_lease_is_claimed_again(queue):
+    task = queue.submit(RESUME, "Offre", {})
+    lease = queue.claim()
+    assert lease.task.id == task.id
+    assert queue.claim() is None
+
+    time.sleep(0.06)
+    retry = queue.claim()
+    assert retry.task.id == task.id
+    assert retry.task.attempts == 2
+    assert retry.resume_file.getvalue() == RESUME.getvalue()
+    # L'ancienne réservation ne peut plus conclure la tâche
+    assert not queue.complete(lease, "lettre périmée")
+    assert queue.complete(retry, "lettre")
+    assert queue.get(task.id).status == DONE
+    assert queue.get(task.id).result == "lettre"
+
+
+def test_extend_keeps_lease_until_lost(queue):
+    queue.submit(RESUME, "Offre", {})
+    lease = queue.claim()
+    for _ in range(3):
+        time.sleep(0.03)
+        assert queue.extend(lease)
+        assert queue.claim() is None
+
+    time.sleep(0.06)
+    retry = queue.claim()
+    assert retry is not None
+    assert not queue.extend(lease)
+    assert queue.extend(retry)
+
+
+def test_failures_end_in_dead_letter(queue):
+    task = queue.submit(RESUME, "Offre", {})
+    lease = queue.claim()
+    assert queue.fail(lease, "ValueError: passagère") == QUEUED
+    # Nouvelle tentative après le délai de reprise
+    queue._conn.execute("UPDATE tasks SET visible_at = 0 WHERE id = ?", (task.id,))
+    lease = queue.claim()
+    assert lease.task.attempts == 2
+    assert queue.fail(lease, "InvalidInput: format", retry=False) == DEAD
+    assert [dead.id for dead in queue.list(DEAD)] == [task.id]
+
+    assert queue.requeue(task.id)
+    lease = queue.claim()
+    assert lease.task.attempts == 1
+    assert lease.task.status == RUNNING
+
+
+def test_last_attempt_with_expired_lease_is_dead_lettered(tmp_path):
+    queue = TaskQueue(str(tmp_path / "tasks.sqlite"), visibility_timeout=0.01, max_attempts=1)
+    task = queue.submit(RESUME, "Offre", {})
+    assert queue.claim() is not None
+    time.sleep(0.02)
+    assert queue.claim() is None
+    assert queue.get(task.id).status == DEAD
+    queue.close()
+
+
+def test_purge_removes_expired_tasks_and_orphaned_files(tmp_path):
+    queue = TaskQueue(str(tmp_path / "tasks.sqlite"), retention=60)
+    other_resume = MemoryFile("autre.txt", b"Autre CV", "text/plain")
+    done = queue.submit(RESUME, "Offre", {})
+    queue.complete(queue.claim(), "lettre")
+    kept = queue.submit(RESUME, "Offre", {})
+    orphan = queue.submit(other_resume, "Offre", {})
+    queue.fail(queue.claim(), "ValueError", retry=False)
+    queue.fail(queue.claim(), "ValueError", retry=False)
+    queue.requeue(kept.id)
+
+    finished_at = queue.get(done.id).finished_at
+    assert queue.purge(now=finished_at + 30) == 0
+    assert queue.purge(now=finished_at + 120) == 2
+
+    assert queue.get(done.id) is None
+    assert queue.get(orphan.id) is None
+    assert queue.get(kept.id).status == QUEUED
+    names = [row[0] for row in queue._conn.execute("SELECT name FROM files")]
+    assert names == ["cv.txt"]
+    queue.close()
+
+
+def test_worker_dead_letters_invalid_input_without_retry(queue):
+    task = queue.submit(MemoryFile("photo.png", b"\x89PNG", "image/png"), "Offre d'emploi", {})
+    pool = WorkerPool(queue, openai_client=None, firecrawl_client=None, concurrency=1)
+    asyncio.run(pool.execute(queue.claim()))
+    task = queue.get(task.id)
+    assert task.status == DEAD
+    assert task.attempts == 1
+    assert task.error.startswith("InvalidInput")
@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter  # noqa: E402
+from opentelemetry.trace import StatusCode  # noqa: E402
+
+from src import telemetry  # noqa: E402
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(telemetry, "ENABLED", True)
+    monkeypatch.setattr(telemetry, "_tracer", provider.get_tracer("tests"))
+    monkeypatch.setattr(telemetry, "_tracer_loaded", True)
+    return exporter
+
+
+@pytest.mark.parametrize("attach", [True, False])
+def test_failed_span_has_error_status(exporter, attach):
+    with pytest.raises(ValueError):
+        with telemetry.span("generate", attach=attach, draft=True):
+            raise ValueError("modèle indisponible")
+
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "cover_letter.generate"
+    assert span.attributes["cover_letter.draft"] is True
+    assert span.status.status_code == StatusCode.ERROR
+    assert span.status.description == "ValueError: modèle indisponible"
+    assert [event.name for event in span.events] == ["exception"]
+
+
+@pytest.mark.parametrize("attach", [True, False])
+def test_successful_span_is_not_marked_as_error(exporter, attach):
+    with telemetry.span("generate", attach=attach):
+        pass
+    (span,) = exporter.get_finished_spans()
+    assert span.status.status_code == StatusCode.UNSET
@@ -0,0 +1,69 @@
+import pytest
+
+from src import tokens
+from src.tokens import TRUNCATION_MARKER, count_tokens, fit_to_budget, split_requirements, truncate_to_tokens
+
+REQUIREMENTS = "Profil recherché:\n- Cinq ans d'expérience en Python\n- Django et PostgreSQL\n- Anglais professionnel"
+POSTING = "\n\n".join([
+    "À propos de nous:\n" + "Acme conçoit des logiciels de gestion pour les PME depuis vingt ans. " * 8,
+    REQUIREMENTS,
+    "Avantages:\n" + "Télétravail partiel, mutuelle, tickets restaurant et prime annuelle. " * 8,
+])
+RESUME = "\n".join(f"- Projet {index}: développement d'une API Python pour un client du secteur bancaire" for index in range(40))
+
+
+@pytest.fixture(params=["estimation", "tiktoken"])
+def tokenizer(request, monkeypatch):
+    """
+    Comptage par tiktoken s'il est disponible, sinon estimation (4 caractères par token).
+    """
+    get_encoding = tokens._get_encoding
+    get_encoding.cache_clear()
+    if request.param == "estimation":
+        monkeypatch.setattr(tokens, "_get_encoding", lambda model: None)
+    else:
+        pytest.importorskip("tiktoken")
+        try:
+            tokens._get_encoding("gpt-4").encode("test")
+        except Exception as e:
+            pytest.skip(f"encodage tiktoken indisponible: {e}")
+    yield request.param
+    get_encoding.cache_clear()
+
+
+def test_estimation_counts_four_characters_per_token(monkeypatch):
+    monkeypatch.setattr(tokens, "_get_encoding", lambda model: None)
+    assert count_tokens("") == 0
+    assert count_tokens("abcd") == 1
+    assert count_tokens("abcde") == 2
+
+
+def test_split_requirements_keeps_requirement_sections_first():
+    priority, secondary = split_requirements(POSTING)
+    assert [block for _, block in priority] == [REQUIREMENTS]
+    assert [position for position, _ in secondary] == [0, 2]
+
+
+def test_truncate_to_tokens_stays_within_budget(tokenizer):
+    truncated = truncate_to_tokens(RESUME, 50)
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert count_tokens(truncated) <= 50
+    # Coupé sur une fin de ligne
+    assert truncated[:-len(TRUNCATION_MARKER)].endswith("bancaire")
+
+
+def test_fit_to_budget_returns_inputs_that_fit_unchanged(tokenizer):
+    budget = count_tokens(RESUME) + count_tokens(POSTING)
+    assert fit_to_budget(RESUME, POSTING, budget) == (RESUME, POSTING)
+
+
+def test_fit_to_budget_keeps_requirements_when_posting_is_cut(tokenizer):
+    budget = (count_tokens(RESUME) + count_tokens(POSTING)) // 3
+    resume, posting = fit_to_budget(RESUME, POSTING, budget)
+    assert len(posting) < len(POSTING)
+    assert REQUIREMENTS in posting
+    assert posting.index("À propos") < posting.index(REQUIREMENTS)
+    assert resume.startswith("- Projet 0")
+    # Quelques tokens de marge pour les séparateurs entre blocs
+    assert count_tokens(resume) + count_tokens(posting) <= budget + 5
+    assert fit_to_budget(RESUME, POSTING, budget) == (resume, posting)
@@ -0,0 +1,100 @@
+# worker.py - Workers et administration de la file de tâches (voir src/taskqueue.py)
+#
+# Exemples:
+#   python worker.py run --workers 8                     # traite la file jusqu'à Ctrl+C / SIGTERM
+#   python worker.py submit mon_cv.pdf https://exemple.com/offre --key ats-1234 --params '{"tone": "Confiant"}'
+#   python worker.py status <id>                          # statut et lettre d'une tâche
+#   python worker.py dead                                 # tâches en lettre morte
+#   python worker.py requeue <id>
+#   python worker.py purge                                # supprime les tâches expirées (COVER_LETTER_QUEUE_RETENTION)
+import argparse
+import asyncio
+import json
+import signal
+import sys
+
+from dotenv import load_dotenv
+
+from src.clients import create_firecrawl_client, create_openai_client
+from src.files import LocalFile
+from src.taskqueue import DEAD, WORKERS, TaskQueue, WorkerPool
+from src.telemetry import start_metrics_server, write_metrics
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="File de tâches de génération de lettres de motivation.")
+    parser.add_argument("--queue", help="Fichier SQLite de la file (COVER_LETTER_QUEUE_PATH par défaut)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Traite les tâches de la file")
+    run.add_argument("-w", "--workers", type=int, default=WORKERS, help="Générations simultanées")
+    run.add_argument("--metrics-file", help="Fichier où écrire les métriques à l'arrêt (format Prometheus)")
+
+    submit = commands.add_parser("submit", help="Ajoute une génération à la file")
+    submit.add_argument("resume", help="CV (PDF, DOCX ou TXT)")
+    submit.add_argument("job", help="URL ou texte de l'offre")
+    submit.add_argument("--key", help="Clé d'idempotence")
+    submit.add_argument("--params", default="{}", help="Options JSON (tone, company_name, draft...)")
+
+    status = commands.add_parser("status", help="Statut d'une tâche")
+    status.add_argument("task_id")
+
+    commands.add_parser("dead", help="Liste les tâches en lettre morte")
+
+    requeue = commands.add_parser("requeue", help="Relance une tâche en lettre morte")
+    requeue.add_argument("task_id")
+
+    commands.add_parser("purge", help="Supprime les tâches terminées au-delà de la durée de conservation")
+    return parser.parse_args(argv)
+
+
+async def run_workers(queue: TaskQueue, workers: int) -> None:
+    openai_client = create_openai_client()
+    if openai_client is None:
+        raise SystemExit("❌ OPENAI_API_KEY manquante")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    pool = WorkerPool(queue, openai_client, create_firecrawl_client(), concurrency=workers)
+    print(f"▶️ {workers} workers sur {queue.path}", file=sys.stderr)
+    try:
+        await pool.run(stop)
+    finally:
+        await openai_client.close()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    load_dotenv()
+    queue = TaskQueue(args.queue)
+
+    if args.command == "run":
+        start_metrics_server()
+        asyncio.run(run_workers(queue, args.workers))
+        if args.metrics_file:
+            write_metrics(args.metrics_file)
+    elif args.command == "submit":
+        task = queue.submit(LocalFile(args.resume), args.job, json.loads(args.params), args.key)
+        print(json.dumps(task.to_dict(), ensure_ascii=False, indent=2))
+    elif args.command == "status":
+        task = queue.get(args.task_id)
+        if task is None:
+            print(f"❌ Tâche inconnue: {args.task_id}", file=sys.stderr)
+            return 1
+        print(json.dumps(task.to_dict(), ensure_ascii=False, indent=2))
+    elif args.command == "dead":
+        for task in queue.list(DEAD):
+            print(f"{task.id}  {task.attempts} tentatives  {task.error}")
+    elif args.command == "requeue":
+        if not queue.requeue(args.task_id):
+            print(f"❌ Pas de tâche en lettre morte: {args.task_id}", file=sys.stderr)
+            return 1
+    elif args.command == "purge":
+        print(f"🗑️ {queue.purge()} tâches supprimées", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())